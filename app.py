@@ -1,9 +1,16 @@
 import streamlit as st
 from src.utils.intent_parser import IntentParser
+from utils.api_client import AssistantClient
+from config.settings import ASSISTANT_API_URL
 import json
 
-# Initialize the intent parser
-parser = IntentParser()
+# Built once per Streamlit server rather than on every rerun; with ASSISTANT_API_URL set the
+# parsing happens in server.py and this app is only a client
+@st.cache_resource
+def get_parser():
+    return AssistantClient(ASSISTANT_API_URL) if ASSISTANT_API_URL else IntentParser()
+
+parser = get_parser()
 
 # Streamlit app configuration
 st.set_page_config(page_title="Quaint Assistant", page_icon="📜", layout="centered")
@@ -0,0 +1,136 @@
+"""Micro-benchmark for normalize_date against the original implementation.
+
+Usage:
+    python -m benchmarks.bench_normalize_date [--rounds 20000]
+
+Checks that both implementations agree on every input they share, then reports the time per
+call for the original, the rewrite with a cold memo cache and the rewrite with a warm one.
+"""
+import argparse
+import json
+import re
+import time
+from datetime import datetime, timedelta
+
+from utils.date_utils import _normalize_date, normalize_date
+
+# Dates as the entity extraction prompt tends to return them
+SAMPLE_DATES = [
+    "today", "tonight", "Tomorrow", "tmrw", "tonite", "a week from now", "next week", "yesterday",
+    "next Friday", "next monday evening", "February 23, 2030", "23 February 2030", "febuary 23rd 2030",
+    "2030-02-23", "23-02-2030", "02-23-2030", "23/02/2030", "2030/02/23", "March 1st, 2020", "sometime soon",
+]
+# Expressions only the rewrite understands, timed but not compared
+NEW_EXPRESSIONS = ["in 3 days", "in two weeks", "this friday", "saturday", "this weekend", "next weekend",
+                   "day after tomorrow"]
+
+
+def legacy_normalize_date(date_str: str, current_date: datetime) -> str:
+    """The pre-rewrite normalize_date, kept verbatim as the benchmark baseline."""
+    date_str = date_str.lower().strip()
+    # Correct common misspellings
+    misspellings = {
+        "tonite": "tonight",
+        "tmrw": "tomorrow",
+        "tommorow": "tomorrow",
+        "restraunt": "restaurant",
+        "itlian": "Italian",
+        "febuary": "february"
+    }
+    for misspelled, correct in misspellings.items():
+        date_str = date_str.replace(misspelled, correct)
+
+    # Resolve relative dates
+    today = current_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    if date_str in ["today", "tonight"]:
+        return today.strftime("%Y-%m-%d")
+    elif date_str == "tomorrow":
+        return (today + timedelta(days=1)).strftime("%Y-%m-%d")
+    elif date_str == "a week from now":
+        return (today + timedelta(days=7)).strftime("%Y-%m-%d")
+    elif date_str == "next week":
+        return "ambiguous_next_week"  # Flag for follow-up
+    elif date_str == "yesterday":
+        return "invalid_past_date"  # Flag for follow-up
+    elif "next" in date_str:
+        # Handle "next Monday", "next Tuesday", etc.
+        days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+        for day in days:
+            if f"next {day}" in date_str:
+                current_dow = today.weekday()
+                target_dow = days.index(day)
+                days_ahead = (target_dow - current_dow + 7) % 7 or 7
+                return (today + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
+    
+    # Validate specific dates
+    try:
+        # Clean up the date string
+        date_str = re.sub(r'(\d+)(st|nd|rd|th)', r'\1', date_str)  # Remove ordinal indicators
+        
+        # Try parsing common date formats
+        date_formats = [
+            "%B %d %Y",  # February 23 2025
+            "%d %B %Y",  # 23 February 2025
+            "%B %d, %Y",  # February 23, 2025
+            "%d %B, %Y",  # 23 February, 2025
+            "%Y-%m-%d",  # 2025-02-23
+            "%d-%m-%Y",  # 23-02-2025
+            "%m-%d-%Y",  # 02-23-2025
+            "%d/%m/%Y",  # 23/02/2025
+            "%m/%d/%Y",  # 02/23/2025
+            "%Y/%m/%d"   # 2025/02/23
+        ]
+        
+        for fmt in date_formats:
+            try:
+                parsed_date = datetime.strptime(date_str, fmt)
+                if parsed_date < today:
+                    return "invalid_past_date"
+                return parsed_date.strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+                
+        return "invalid_date"  # Flag for follow-up if no format matches
+    except Exception:
+        return "invalid_date"  # Flag for follow-up if any other error occurs
+
+
+def _time_per_call(func, inputs, current_date, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for date_str in inputs:
+            func(date_str, current_date)
+    return (time.perf_counter() - started) / (rounds * len(inputs))
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark normalize_date.")
+    arg_parser.add_argument("--rounds", type=int, default=20000)
+    args = arg_parser.parse_args(argv)
+
+    current_date = datetime(2025, 5, 22, 17, 36)
+    for offset in range(7):
+        day = current_date + timedelta(days=offset)
+        for date_str in SAMPLE_DATES:
+            expected, actual = legacy_normalize_date(date_str, day), normalize_date(date_str, day)
+            assert expected == actual, f"{date_str!r} on {day:%A}: expected {expected}, got {actual}"
+
+    def uncached(date_str, day):
+        _normalize_date.cache_clear()
+        return normalize_date(date_str, day)
+
+    inputs = SAMPLE_DATES + NEW_EXPRESSIONS
+    legacy = _time_per_call(legacy_normalize_date, SAMPLE_DATES, current_date, args.rounds)
+    cold = _time_per_call(uncached, SAMPLE_DATES, current_date, max(1, args.rounds // 10))
+    warm = _time_per_call(normalize_date, inputs, current_date, args.rounds)
+    print(json.dumps({
+        "legacy_us_per_call": round(legacy * 1e6, 3),
+        "rewrite_cold_us_per_call": round(cold * 1e6, 3),
+        "rewrite_warm_us_per_call": round(warm * 1e6, 3),
+        "cold_speedup": round(legacy / cold, 1),
+        "warm_speedup": round(legacy / warm, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""End-to-end IntentParser benchmark against fake LLM and search backends.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--llm-latency 0.2] [--search-latency 0.3] [--concurrency 1,8,32]
+    python -m benchmarks.bench_pipeline --output bench_results/today.json --compare bench_results/last.json
+
+Runs every input in the corpus sequentially (latency percentiles, overall and per input kind,
+plus the per-node breakdown from the tracer), then as concurrent batches (throughput). The fakes
+draw latency and failures from the seed, so two runs of the same tree give the same call pattern
+and differences in the results come from the code. The JSON written to --output records the
+settings and git commit alongside the numbers.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from services.fakes import FakeLLMService, FakeSearchService, FakeTieredLLMService
+from utils.intent_parser import IntentParser
+from utils.tracing import Tracer, QUANTILES, percentile
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "corpus.jsonl")
+
+
+def load_corpus(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def latency_stats(seconds):
+    values = sorted(seconds)
+    stats = {f"p{int(q * 100)}_ms": round(percentile(values, q) * 1000, 3) for q in QUANTILES}
+    stats["mean_ms"] = round(sum(values) / len(values) * 1000, 3) if values else 0.0
+    stats["count"] = len(values)
+    return stats
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _is_error(result) -> bool:
+    return bool(result) and isinstance(result[0], dict) and "error" in result[0]
+
+
+def _is_degraded(result) -> bool:
+    return any(isinstance(item, dict) and item.get("degraded") for item in result)
+
+
+def build_llm(args):
+    shared = dict(jitter=args.llm_jitter, failure_rate=args.llm_failure_rate, malformed_rate=args.malformed_rate,
+                  seed=args.seed, use_cache=args.cache, capacity=args.llm_capacity)
+    if not args.tier_latencies:
+        return FakeLLMService(latency=args.llm_latency, chunk_delay=args.llm_latency / 16, **shared)
+    latencies = [float(value) for value in args.tier_latencies.split(",") if value.strip()]
+    # Only the tiers below the largest are unsure of themselves
+    tiers = [
+        {"latency": latency, "chunk_delay": latency / 16,
+         "low_confidence_rate": args.tier_low_confidence_rate if index < len(latencies) - 1 else 0.0}
+        for index, latency in enumerate(latencies)
+    ]
+    return FakeTieredLLMService(tiers, **shared)
+
+
+def _throttled(llm) -> int:
+    return sum(service.model.throttled for service in getattr(llm, "tiers", [llm]))
+
+
+def build_parser(args, tracer: Tracer) -> IntentParser:
+    llm = build_llm(args)
+    search = FakeSearchService(latency=args.search_latency, jitter=args.search_jitter,
+                               failure_rate=args.search_failure_rate, seed=args.seed, use_cache=args.cache)
+    return IntentParser(mode=args.mode, fast_path=not args.no_fast_path, classifier_path=args.classifier,
+                        streaming=args.streaming, llm_service=llm, search_service=search, tracer=tracer,
+                        similarity_cache=args.cache, follow_up_cache=args.cache)
+
+
+def run_sequential(parser: IntentParser, corpus, rounds: int, deadline: float = None) -> dict:
+    by_kind = defaultdict(list)
+    errors = degraded = 0
+    for _ in range(rounds):
+        for item in corpus:
+            started = time.perf_counter()
+            try:
+                result = parser.process_input(item["user_input"], deadline=deadline)
+            except Exception as e:
+                result = [{"error": str(e)}]  # Counted like process_batch does, rather than ending the run
+            by_kind[item.get("kind", "unknown")].append(time.perf_counter() - started)
+            errors += _is_error(result)
+            degraded += _is_degraded(result)
+    overall = [seconds for values in by_kind.values() for seconds in values]
+    return {
+        "overall": latency_stats(overall),
+        "by_kind": {kind: latency_stats(values) for kind, values in sorted(by_kind.items())},
+        "error_results": errors,
+        "degraded_results": degraded,
+    }
+
+
+def run_concurrent(parser: IntentParser, corpus, concurrency: int, requests: int, deadline: float = None) -> dict:
+    inputs = [corpus[i % len(corpus)]["user_input"] for i in range(requests)]
+    started = time.perf_counter()
+    results = parser.process_batch(inputs, concurrency=concurrency, deadline=deadline)
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 2) if elapsed > 0 else 0.0,
+        "error_results": sum(_is_error(result) for result in results),
+        "degraded_results": sum(_is_degraded(result) for result in results),
+    }
+
+
+def compare(current: dict, previous: dict) -> dict:
+    """Relative change (current / previous - 1) of the headline numbers."""
+    def change(now, before):
+        return round(now / before - 1, 4) if before else None
+
+    deltas = {
+        f"latency_{key}": change(current["latency"]["overall"][key], previous["latency"]["overall"][key])
+        for key in ("p50_ms", "p95_ms", "p99_ms")
+    }
+    deltas["llm_calls_per_request"] = change(current["llm_calls_per_request"], previous["llm_calls_per_request"])
+    before = {run["concurrency"]: run for run in previous.get("throughput", [])}
+    for run in current["throughput"]:
+        if run["concurrency"] in before:
+            deltas[f"throughput_c{run['concurrency']}"] = change(
+                run["requests_per_second"], before[run["concurrency"]]["requests_per_second"])
+    return deltas
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark IntentParser offline with fake backends.")
+    arg_parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSONL of {kind, user_input}")
+    arg_parser.add_argument("--rounds", type=int, default=3, help="Sequential passes over the corpus")
+    arg_parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated batch concurrency levels")
+    arg_parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    arg_parser.add_argument("--llm-latency", type=float, default=0.05)
+    arg_parser.add_argument("--llm-jitter", type=float, default=0.0)
+    arg_parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    arg_parser.add_argument("--llm-capacity", type=int, default=None, help="Concurrent LLM calls before the fake throttles")
+    arg_parser.add_argument("--tier-latencies", default=None,
+                            help="Comma-separated latencies of fake model tiers, smallest first; replaces --llm-latency")
+    arg_parser.add_argument("--tier-low-confidence-rate", type=float, default=0.0,
+                            help="Share of answers from the tiers below the largest that are escalated for low confidence")
+    arg_parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of LLM responses cut short")
+    arg_parser.add_argument("--search-latency", type=float, default=0.1)
+    arg_parser.add_argument("--search-jitter", type=float, default=0.0)
+    arg_parser.add_argument("--search-failure-rate", type=float, default=0.0)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--mode", default="multi_call", help="Pipeline mode passed to IntentParser")
+    arg_parser.add_argument("--no-fast-path", action="store_true")
+    arg_parser.add_argument("--classifier", default=None, help="Local intent classifier model to load")
+    arg_parser.add_argument("--streaming", action="store_true")
+    arg_parser.add_argument("--deadline", type=float, default=None, help="Per-request latency budget in seconds")
+    arg_parser.add_argument("--cache", action="store_true", help="Keep the LLM, search, near-duplicate input and follow-up question caches on")
+    arg_parser.add_argument("--output", default=None, help="JSON file to write the results to")
+    arg_parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    args = arg_parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    tracer = Tracer()
+    parser = build_parser(args, tracer)
+
+    latency = run_sequential(parser, corpus, args.rounds, args.deadline)
+    sequential_requests = args.rounds * len(corpus)
+    metrics = tracer.summary()
+    llm_calls = parser.llm_service.calls
+    search_calls = parser.search_service.calls
+
+    throughput = [
+        run_concurrent(parser, corpus, int(level), args.requests, args.deadline)
+        for level in args.concurrency.split(",") if level.strip()
+    ]
+
+    results = {
+        "benchmark": "pipeline",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "corpus_size": len(corpus),
+        "latency": latency,
+        "throughput": throughput,
+        "llm_calls_per_request": round(llm_calls / sequential_requests, 3),
+        "search_calls_per_request": round(search_calls / sequential_requests, 3),
+        "json_fallback_rate": metrics["json_fallback_rate"],
+        "llm_flow_control": {**parser.llm_service.flow_control_stats(), "throttled": _throttled(parser.llm_service)},
+        "model_tiers": parser.model_tier_stats(),
+        "similarity_cache": parser.similarity_cache_stats(),
+        "follow_up_cache": parser.follow_up_cache_stats(),
+        "nodes": metrics["spans"].get("node", {}),
+    }
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            results["compared_to"] = {"path": args.compare, "changes": compare(results, json.load(f))}
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
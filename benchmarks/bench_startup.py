@@ -0,0 +1,110 @@
+"""Cold-start benchmark: import time, parser construction and first requests, each in a fresh interpreter.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--output bench_results/startup.json] [--compare old.json]
+
+Every run starts a new Python process, so nothing is cached in sys.modules or in the shared graph
+cache. Reported per stage (median over the runs, in milliseconds):
+    import_settings     import config.settings
+    import_parser       import utils.intent_parser
+    construct_parser    the first IntentParser(...), with fake services
+    construct_second    a second parser, which should reuse everything
+    first_rule_request  a request answered by the fast path
+    first_llm_request   a request that goes through the LLM nodes (fake, no latency)
+    warm_request        the same LLM request again
+plus which heavy modules had been imported after import_parser.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+from benchmarks.bench_pipeline import _git_commit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("langgraph", "langchain_core", "google.generativeai", "duckduckgo_search")
+STAGES = ("import_settings", "import_parser", "construct_parser", "construct_second", "first_rule_request",
+          "first_llm_request", "warm_request")
+
+# Runs in the child process; prints one JSON object
+CHILD = """
+import json, sys, time
+timings = {}
+def timed(stage, func):
+    started = time.perf_counter()
+    result = func()
+    timings[stage] = (time.perf_counter() - started) * 1000
+    return result
+timed("import_settings", lambda: __import__("config.settings"))
+timed("import_parser", lambda: __import__("utils.intent_parser"))
+loaded = {name: name in sys.modules for name in HEAVY_MODULES}
+from utils.intent_parser import IntentParser
+from services.fakes import FakeLLMService, FakeSearchService
+build = lambda: IntentParser(llm_service=FakeLLMService(), search_service=FakeSearchService(), classifier_path=None)
+parser = timed("construct_parser", build)
+timed("construct_second", build)
+timed("first_rule_request", lambda: parser.process_input("Book a cab to the airport"))
+timed("first_llm_request", lambda: parser.process_input("Plan a weekend trip to Goa with a dinner for four"))
+timed("warm_request", lambda: parser.process_input("Plan a weekend trip to Goa with a dinner for four"))
+print(json.dumps({"timings": timings, "heavy_modules_after_import": loaded}))
+"""
+
+
+def run_once() -> dict:
+    code = f"HEAVY_MODULES = {HEAVY_MODULES!r}\n" + CHILD
+    completed = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=ROOT, capture_output=True,
+                               text=True, timeout=300)
+    if completed.returncode != 0:
+        raise RuntimeError(f"startup run failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(current: dict, previous: dict) -> dict:
+    """Relative change (current / previous - 1) of each stage's median."""
+    return {
+        stage: round(current["stages"][stage]["median_ms"] / previous["stages"][stage]["median_ms"] - 1, 4)
+        for stage in STAGES
+        if previous.get("stages", {}).get(stage, {}).get("median_ms")
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Measure IntentParser cold-start costs in fresh interpreters.")
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--output", default=None, help="JSON file to write the results to")
+    arg_parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    args = arg_parser.parse_args(argv)
+
+    runs = [run_once() for _ in range(max(1, args.runs))]
+    stages = {}
+    for stage in STAGES:
+        values = [run["timings"][stage] for run in runs]
+        stages[stage] = {"median_ms": round(statistics.median(values), 3), "min_ms": round(min(values), 3),
+                         "max_ms": round(max(values), 3)}
+    results = {
+        "benchmark": "startup",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "runs": len(runs),
+        "stages": stages,
+        "heavy_modules_after_import": runs[-1]["heavy_modules_after_import"],
+    }
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            results["compared_to"] = {"path": args.compare, "changes": compare(results, json.load(f))}
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,147 @@
 import os
 from dotenv import load_dotenv
-import google.generativeai as genai
 
 #def load_config():
-    #Please enter the configuration of your LLM model here
\ No newline at end of file
+    #Please enter the configuration of your LLM model here
+    #Import google.generativeai inside this function: it takes about a second to import, and importing
+    #the settings should stay cheap for CLI jobs and cold starts
+
+# Entity extraction
+# Extract entities for multi-intent inputs concurrently, with at most
+# ENTITY_EXTRACTION_MAX_WORKERS LLM calls in flight per request.
+CONCURRENT_ENTITY_EXTRACTION = True
+ENTITY_EXTRACTION_MAX_WORKERS = 4
+
+# Intent pipeline
+# "multi_call" classifies intents, then extracts entities per intent in separate LLM calls.
+# "fused" does both in one structured call and falls back to "multi_call" if the output cannot be parsed.
+PIPELINE_MODE = "multi_call"
+
+# LLM response cache
+# Set LLM_CACHE_PATH to a file (e.g. ".cache/llm_responses.sqlite3") to keep responses across restarts.
+LLM_CACHE_ENABLED = True
+LLM_CACHE_MAX_SIZE = 1024
+LLM_CACHE_TTL_SECONDS = 24 * 60 * 60
+LLM_CACHE_PATH = None
+
+# Web search cache
+# Errors are never cached. Set SEARCH_CACHE_PATH to a file to keep results across restarts.
+SEARCH_CACHE_ENABLED = True
+SEARCH_CACHE_MAX_SIZE = 512
+SEARCH_CACHE_TTL_SECONDS = 6 * 60 * 60
+SEARCH_CACHE_PATH = None
+
+# Batch processing
+# Default number of inputs processed concurrently by IntentParser.process_batch and utils.batch_runner.
+BATCH_CONCURRENCY = 8
+
+# Rule-based fast path
+# Short, unambiguous inputs are classified by keyword rules without an LLM call.
+FAST_PATH_ENABLED = True
+FAST_PATH_MAX_WORDS = 12
+
+# Local intent classifier
+# Model trained with `python -m utils.intent_classifier train`; when the file exists, parse_intent
+# only calls the LLM if the model's probability is below the threshold.
+INTENT_CLASSIFIER_PATH = "models/intent_classifier.json"
+INTENT_CLASSIFIER_THRESHOLD = 0.85
+
+# Screening term lists
+# Files with one term per line ('#' starts a comment), added to the parser's inline lists.
+# IntentParser.reload_terms() picks up edits without rebuilding the parser.
+OFFENSIVE_TERMS_PATHS = []
+INVALID_LOCATIONS_PATHS = []
+
+# LLM response streaming
+# Stream the parse_intent response and start entity extraction as soon as each intent object is complete.
+LLM_STREAMING = False
+
+# Tracing
+# Time every graph node, LLM call and search, keeping the last TRACE_MAX_RECORDS request records and up to
+# TRACE_MAX_SAMPLES durations per span for percentiles. Set TRACE_LOG_PATH to also append records as JSONL.
+TRACING_ENABLED = False
+TRACE_MAX_RECORDS = 1000
+TRACE_MAX_SAMPLES = 10000
+TRACE_LOG_PATH = None
+
+# Record/replay cassettes
+# "record" writes every LLM response and search result, with its latency, to CASSETTE_PATH; "replay" serves
+# them back without network access and fails anything unrecorded. CASSETTE_REPLAY_LATENCY sleeps for the
+# recorded latency on replay; leave it off to measure the pipeline's own overhead.
+CASSETTE_MODE = None
+CASSETTE_PATH = "cassettes/traffic.sqlite"
+CASSETTE_REPLAY_LATENCY = False
+
+# Request coalescing
+# Concurrent process_input/aprocess_input calls with the same input (whitespace-normalized), date and
+# parser configuration share one pipeline run; each caller gets its own copy of the result.
+REQUEST_COALESCING = True
+
+# Near-duplicate input cache
+# process_input/aprocess_input reuse the result of a recent input that says the same thing: identical after
+# dropping case, punctuation and filler words, or a near-duplicate (character-trigram Jaccard similarity of
+# at least SIMILARITY_CACHE_THRESHOLD, same numbers, dates and negations, same words in the same order except
+# for misspelled or inflected known request words; place names must match exactly). Relative dates are re-resolved when the day has changed. Degraded results are never cached.
+SIMILARITY_CACHE_ENABLED = True
+SIMILARITY_CACHE_THRESHOLD = 0.8
+SIMILARITY_CACHE_MAX_SIZE = 2048
+SIMILARITY_CACHE_TTL_SECONDS = 60 * 60
+
+# Follow-up questions
+# The rules live in utils/follow_up_rules.FOLLOW_UP_RULES; FOLLOW_UP_RULES_PATH may point to a JSON file in the
+# same format whose categories and topics are merged over them. Questions the LLM writes for unfamiliar
+# "other" topics are cached by topic, so a recurring topic costs one LLM call rather than one per request;
+# set FOLLOW_UP_CACHE_PATH to a file (e.g. ".cache/follow_up_questions.sqlite3") to keep them across restarts.
+FOLLOW_UP_RULES_PATH = None
+FOLLOW_UP_CACHE_ENABLED = True
+FOLLOW_UP_CACHE_MAX_SIZE = 4096
+FOLLOW_UP_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+FOLLOW_UP_CACHE_PATH = None
+
+# LLM flow control
+# Client-side token bucket (calls per second, burst) and an adaptive (AIMD) limit on calls in flight that
+# halves on 429s and grows back on success; None disables either. Retryable errors (429, 5xx, timeouts)
+# are retried LLM_MAX_RETRIES times with jittered exponential backoff. Each call times out after
+# LLM_TIMEOUT_SECONDS.
+LLM_RATE_LIMIT_PER_SECOND = None
+LLM_RATE_LIMIT_BURST = 10
+LLM_MAX_CONCURRENCY = 32
+LLM_MIN_CONCURRENCY = 1
+LLM_INITIAL_CONCURRENCY = 8
+LLM_MAX_RETRIES = 3
+LLM_RETRY_BASE_DELAY = 0.5
+LLM_RETRY_MAX_DELAY = 8.0
+LLM_TIMEOUT_SECONDS = 30.0
+
+# Model tiers
+# Model names from the smallest/fastest to the most capable, e.g. ["gemini-1.5-flash-8b", "gemini-1.5-pro"];
+# None uses load_config()["model_name"] for every call. Each graph node starts on its tier in LLM_NODE_TIERS
+# (an index into LLM_MODEL_TIERS, 0 when not listed) and moves up a tier when the answer is malformed, has a
+# confidence below LLM_ESCALATION_CONFIDENCE or flags a conflict or contradictions, or the call fails.
+LLM_MODEL_TIERS = None
+LLM_NODE_TIERS = {"parse_intent": 0, "fused_parse": 0, "extract_entities": 0, "generate_follow_ups": 0}
+LLM_ESCALATION_CONFIDENCE = 0.6
+
+# Request deadline
+# Default latency budget in seconds for process_input and friends; None waits for every step. When it runs
+# out, the parser returns what it has (intents, finished extractions, local follow-ups) with each result's
+# "degraded" list naming the steps that were cut short and "timed_out" set.
+REQUEST_DEADLINE_SECONDS = None
+
+# HTTP server (server.py)
+# Each of SERVER_WORKERS processes keeps one warm IntentParser and works on at most
+# SERVER_MAX_CONCURRENCY requests at a time, with up to SERVER_MAX_QUEUE more waiting; requests beyond
+# that get a 503 so a load balancer can send them elsewhere.
+SERVER_HOST = "0.0.0.0"
+SERVER_PORT = 8000
+SERVER_WORKERS = 2
+SERVER_MAX_CONCURRENCY = 32
+SERVER_MAX_QUEUE = 64
+SERVER_MAX_BATCH_SIZE = 100
+SERVER_MAX_BODY_BYTES = 1024 * 1024
+
+# Streamlit frontend
+# Set ASSISTANT_API_URL (e.g. "http://localhost:8000") to have the Streamlit apps call server.py
+# instead of running a parser in the Streamlit process.
+ASSISTANT_API_URL = os.getenv("ASSISTANT_API_URL")
+ASSISTANT_API_TIMEOUT_SECONDS = 60
@@ -7,10 +7,17 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
 
 from utils.intent_parser import IntentParser
+from utils.api_client import AssistantClient
+from config.settings import ASSISTANT_API_URL
 import json
 
-# Initialize the intent parser
-parser = IntentParser()
+# Built once per Streamlit server rather than on every rerun; with ASSISTANT_API_URL set the
+# parsing happens in server.py and this app is only a client
+@st.cache_resource
+def get_parser():
+    return AssistantClient(ASSISTANT_API_URL) if ASSISTANT_API_URL else IntentParser()
+
+parser = get_parser()
 
 # Streamlit app configuration
 st.set_page_config(page_title="Personal Assistant", layout="centered")
@@ -38,73 +45,113 @@ with st.form(key="user_input_form"):
     )
     submit_button = st.form_submit_button(label="Submit")
 
-# Process input and display output
+def render_entities(placeholder, event):
+    with placeholder.container():
+        # Display key entities
+        if event['key_entities']:
+            st.markdown("<h4>Key Entities</h4>", unsafe_allow_html=True)
+            entities_str = json.dumps(event['key_entities'], indent=2)
+            st.markdown(f"<pre class='output-box'>{entities_str}</pre>", unsafe_allow_html=True)
+
+        # Display validation errors
+        if event.get('validation_errors'):
+            st.markdown("<h4>Validation Issues</h4>", unsafe_allow_html=True)
+            for error in event['validation_errors']:
+                st.markdown(f"<div class='output-box'><p>⚠️ {error}</p></div>", unsafe_allow_html=True)
+
+
+def render_follow_ups(placeholder, display_category, questions):
+    # Display follow-up questions (intent-specific)
+    if questions:
+        with placeholder.container():
+            st.markdown(f"<h4>Follow-Up Questions for {display_category}</h4>", unsafe_allow_html=True)
+            for question in questions:
+                st.markdown(f"<div class='output-box'><p>🔍 {question}</p></div>", unsafe_allow_html=True)
+
+
+def render_web_results(placeholder, web_results):
+    # Display web search results for non-standard requests
+    if web_results and isinstance(web_results, list):
+        with placeholder.container():
+            st.markdown("<h4>Web Search Results</h4>", unsafe_allow_html=True)
+            for web_result in web_results:
+                st.markdown(
+                    f"""
+                    <div class='output-box'>
+                        <h5>{web_result['title']}</h5>
+                        <p>{web_result['snippet']}</p>
+                        <a href='{web_result['url']}' target='_blank'>Visit Link</a>
+                    </div>
+                    """,
+                    unsafe_allow_html=True
+                )
+
+
+# Process input and display output as each pipeline step finishes
 if submit_button and user_input:
-    with st.spinner("Processing your request..."):
-        try:
-            results = parser.process_input(user_input)
-            if results and "error" in results[0]:
-                st.error(results[0]["error"])
+    status = st.empty()
+    status.info("Processing your request...")
+    try:
+        intent_slots = []
+        results = []
+        for event in parser.stream_input(user_input):
+            if event["event"] == "error":
+                status.empty()
+                st.error(event["error"])
                 st.stop()
 
-            # Handle multiple intents
-            for idx, result in enumerate(results, 1):
-                # Capitalize category for display
-                display_category = result['intent_category'].replace("_", " ").title()
-                st.markdown(f"### Intent {idx}: {display_category}")
-                
-                # Display intent and confidence
-                st.markdown(f"""
-                <div class="output-box">
-                    <h4>Intent Category</h4>
-                    <p>{display_category}</p>
-                    <h4>Confidence Score</h4>
-                    <p>{result['confidence_score']:.2f}</p>
-                </div>
-                """, unsafe_allow_html=True)
-
-                # Display key entities
-                if result['key_entities']:
-                    st.markdown("<h4>Key Entities</h4>", unsafe_allow_html=True)
-                    entities_str = json.dumps(result['key_entities'], indent=2)
-                    st.markdown(f"<pre class='output-box'>{entities_str}</pre>", unsafe_allow_html=True)
-
-                # Display conflicts
-                if result.get('conflict'):
-                    st.markdown("<h4>Intent Conflict</h4>", unsafe_allow_html=True)
-                    st.markdown(f"<div class='output-box'><p>⚠️ {result['conflict']}</p></div>", unsafe_allow_html=True)
-
-                # Display validation errors
-                if result.get('validation_errors'):
-                    st.markdown("<h4>Validation Issues</h4>", unsafe_allow_html=True)
-                    for error in result['validation_errors']:
-                        st.markdown(f"<div class='output-box'><p>⚠️ {error}</p></div>", unsafe_allow_html=True)
-
-                # Display follow-up questions (intent-specific)
-                if result['follow_up_questions']:
-                    st.markdown(f"<h4>Follow-Up Questions for {display_category}</h4>", unsafe_allow_html=True)
-                    for question in result['follow_up_questions']:
-                        st.markdown(f"<div class='output-box'><p>🔍 {question}</p></div>", unsafe_allow_html=True)
-
-                # Display web search results for non-standard requests
-                if result['web_search_results']:
-                    st.markdown("<h4>Web Search Results</h4>", unsafe_allow_html=True)
-                    for web_result in result['web_search_results']:
-                        st.markdown(
-                            f"""
-                            <div class='output-box'>
-                                <h5>{web_result['title']}</h5>
-                                <p>{web_result['snippet']}</p>
-                                <a href='{web_result['url']}' target='_blank'>Visit Link</a>
-                            </div>
-                            """,
-                            unsafe_allow_html=True
-                        )
-
-            # Display JSON output with copy button
-            st.markdown("<h4>JSON Output</h4>", unsafe_allow_html=True)
-            json_output = json.dumps(results, indent=2)
-            st.code(json_output, language="json")
-
-        except Exception as e:
-            st.error(f"Error processing request: {e}")
\ No newline at end of file
+            elif event["event"] == "intents":
+                # Handle multiple intents
+                for idx, intent in enumerate(event["intents"], 1):
+                    # Capitalize category for display
+                    display_category = intent['intent_category'].replace("_", " ").title()
+                    st.markdown(f"### Intent {idx}: {display_category}")
+
+                    # Display intent and confidence
+                    st.markdown(f"""
+                    <div class="output-box">
+                        <h4>Intent Category</h4>
+                        <p>{display_category}</p>
+                        <h4>Confidence Score</h4>
+                        <p>{intent['confidence_score']:.2f}</p>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+                    # Display conflicts
+                    if intent.get('conflict'):
+                        st.markdown("<h4>Intent Conflict</h4>", unsafe_allow_html=True)
+                        st.markdown(f"<div class='output-box'><p>⚠️ {intent['conflict']}</p></div>", unsafe_allow_html=True)
+
+                    # Later events fill these placeholders in place
+                    intent_slots.append({
+                        "category": intent['intent_category'],
+                        "display_category": display_category,
+                        "entities": st.empty(),
+                        "follow_ups": st.empty(),
+                        "web_search_results": st.empty(),
+                    })
+
+            elif event["event"] == "entities":
+                render_entities(intent_slots[event["index"]]["entities"], event)
+
+            elif event["event"] == "follow_ups":
+                slot = intent_slots[event["index"]]
+                render_follow_ups(slot["follow_ups"], slot["display_category"], event["follow_up_questions"])
+
+            elif event["event"] == "web_search_results":
+                for slot in intent_slots:
+                    if slot["category"] == "other":
+                        render_web_results(slot["web_search_results"], event["web_search_results"])
+
+            elif event["event"] == "done":
+                results = event["results"]
+        status.empty()
+
+        # Display JSON output with copy button
+        st.markdown("<h4>JSON Output</h4>", unsafe_allow_html=True)
+        json_output = json.dumps(results, indent=2)
+        st.code(json_output, language="json")
+
+    except Exception as e:
+        status.empty()
+        st.error(f"Error processing request: {e}")
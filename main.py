@@ -10,9 +10,9 @@ def main():
         "Update my Aadhar address"
     ]
 
-    for user_input in test_inputs:
+    results = parser.process_batch(test_inputs)
+    for user_input, result in zip(test_inputs, results):
         print(f"\nProcessing input: {user_input}")
-        result = parser.process_input(user_input)
         print(json.dumps(result, indent=2))
 
 if __name__ == "__main__":
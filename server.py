@@ -0,0 +1,279 @@
+"""Headless HTTP service for IntentParser.
+
+    python server.py                      # SERVER_WORKERS processes on SERVER_HOST:SERVER_PORT
+    uvicorn server:app --workers 4
+
+Each worker process builds one IntentParser when it starts and keeps it, with its compiled
+graph, caches and service clients, for every request it serves. Run several workers, or several
+machines behind a load balancer, to scale out; /health turns 503 while a worker is saturated.
+
+Endpoints (JSON in and out):
+    POST /process_input  {"user_input": "...", "deadline": 0.8}  -> process_input's result list
+    POST /process_batch  {"inputs": ["...", ...], "deadline": 0.8} -> {"results": [...]}
+    POST /stream         {"user_input": "..."}  -> stream_input's events as NDJSON, one per line
+    GET  /health         -> {"status": "ok" | "overloaded", ...}
+    GET  /metrics        -> Prometheus text, or JSON with ?format=json
+"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs
+
+from config.settings import (
+    SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_MAX_CONCURRENCY, SERVER_MAX_QUEUE, SERVER_MAX_BATCH_SIZE,
+    SERVER_MAX_BODY_BYTES, BATCH_CONCURRENCY,
+)
+from utils.intent_parser import IntentParser
+from utils.tracing import Tracer
+
+
+class Overloaded(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class Backpressure:
+    """At most `concurrency` requests processed at once and `max_queue` waiting for a turn; the rest are refused."""
+
+    def __init__(self, concurrency: int, max_queue: int):
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, max_queue)
+        self._semaphore = None  # Created on first use, inside the worker's event loop
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def saturated(self) -> bool:
+        return self.active >= self.concurrency and self.waiting >= self.max_queue
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self.saturated():
+            self.rejected += 1
+            raise Overloaded()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {"active": self.active, "waiting": self.waiting, "rejected": self.rejected,
+                "max_concurrency": self.concurrency, "max_queue": self.max_queue}
+
+
+def _json_bytes(value) -> bytes:
+    return json.dumps(value, default=str).encode("utf-8")
+
+
+async def _send(send, status: int, body: bytes, content_type: str = "application/json", headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode()), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_json(receive) -> dict:
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise BadRequest("client disconnected")
+        body.extend(message.get("body", b""))
+        if len(body) > SERVER_MAX_BODY_BYTES:
+            raise BadRequest("request body too large", status=413)
+        if not message.get("more_body"):
+            break
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise BadRequest("request body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise BadRequest("request body must be a JSON object")
+    return payload
+
+
+def _deadline(payload: dict) -> dict:
+    """The deadline keyword for the parser; absent means the parser's default (REQUEST_DEADLINE_SECONDS)."""
+    if payload.get("deadline") is None:
+        return {}
+    deadline = payload["deadline"]
+    if isinstance(deadline, bool) or not isinstance(deadline, (int, float)) or deadline <= 0:
+        raise BadRequest("deadline must be a positive number of seconds")
+    return {"deadline": float(deadline)}
+
+
+class AssistantServer:
+    """ASGI application wrapping one warm IntentParser per worker process."""
+
+    def __init__(self, parser_factory=None, max_concurrency: int = SERVER_MAX_CONCURRENCY,
+                 max_queue: int = SERVER_MAX_QUEUE):
+        # Tracing is always on here, since /metrics is built from it
+        self.parser_factory = parser_factory or (lambda: IntentParser(tracer=Tracer()))
+        self.parser = None
+        self.backpressure = Backpressure(max_concurrency, max_queue)
+        self.routes = {
+            ("POST", "/process_input"): self.process_input,
+            ("POST", "/process_batch"): self.process_batch,
+            ("POST", "/stream"): self.stream,
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+        }
+
+    def get_parser(self) -> IntentParser:
+        if self.parser is None:
+            self.parser = self.parser_factory()
+        return self.parser
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self.get_parser().warm_up()  # Build everything before the first request rather than during it
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        path = scope["path"].rstrip("/") or "/"
+        handler = self.routes.get((scope["method"], path))
+        if handler is None:
+            allowed = [method for method, route in self.routes if route == path]
+            if allowed:
+                await _send(send, 405, _json_bytes({"error": "method not allowed"}), headers=[(b"allow", ", ".join(allowed).encode())])
+            else:
+                await _send(send, 404, _json_bytes({"error": "not found"}))
+            return
+        try:
+            await handler(scope, receive, send)
+        except BadRequest as e:
+            await _send(send, e.status, _json_bytes({"error": str(e)}))
+        except Overloaded:
+            await _send(send, 503, _json_bytes({"error": "server overloaded, retry shortly"}), headers=[(b"retry-after", b"1")])
+
+    async def process_input(self, scope, receive, send):
+        payload = await _read_json(receive)
+        user_input = payload.get("user_input")
+        if not isinstance(user_input, str):
+            raise BadRequest("user_input must be a string")
+        deadline = _deadline(payload)
+        async with self.backpressure.slot():
+            try:
+                results = await self.get_parser().aprocess_input(user_input, **deadline)
+            except Exception as e:
+                results = [{"error": f"Error processing request: {e}"}]
+        await _send(send, 200, _json_bytes(results))
+
+    async def process_batch(self, scope, receive, send):
+        payload = await _read_json(receive)
+        inputs = payload.get("inputs")
+        if not isinstance(inputs, list) or not all(isinstance(item, str) for item in inputs):
+            raise BadRequest("inputs must be a list of strings")
+        if len(inputs) > SERVER_MAX_BATCH_SIZE:
+            raise BadRequest(f"at most {SERVER_MAX_BATCH_SIZE} inputs per batch", status=413)
+        concurrency = payload.get("concurrency", BATCH_CONCURRENCY)
+        if isinstance(concurrency, bool) or not isinstance(concurrency, int) or concurrency < 1:
+            raise BadRequest("concurrency must be a positive integer")
+        deadline = _deadline(payload)
+        # A batch takes one slot, so its inputs share that slot's capacity instead of crowding out other requests
+        async with self.backpressure.slot():
+            results = await self.get_parser().aprocess_batch(inputs, concurrency=min(concurrency, BATCH_CONCURRENCY), **deadline)
+        await _send(send, 200, _json_bytes({"results": results}))
+
+    async def stream(self, scope, receive, send):
+        payload = await _read_json(receive)
+        user_input = payload.get("user_input")
+        if not isinstance(user_input, str):
+            raise BadRequest("user_input must be a string")
+        deadline = _deadline(payload)
+        async with self.backpressure.slot():
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/x-ndjson"), (b"cache-control", b"no-cache")]})
+            try:
+                async for event in self.get_parser().astream_input(user_input, **deadline):
+                    await send({"type": "http.response.body", "body": _json_bytes(event) + b"\n", "more_body": True})
+            except Exception as e:
+                # Headers are already sent, so the failure is reported as the last event
+                error = f"Error processing request: {e}"
+                await send({"type": "http.response.body", "body": _json_bytes({"event": "error", "error": error}) + b"\n",
+                            "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+
+    async def health(self, scope, receive, send):
+        saturated = self.backpressure.saturated()
+        body = {"status": "overloaded" if saturated else "ok", "parser_ready": self.parser is not None,
+                **self.backpressure.stats()}
+        await _send(send, 503 if saturated else 200, _json_bytes(body))
+
+    def server_stats(self) -> dict:
+        parser = self.get_parser()
+        llm = parser.llm_service
+        return {
+            "server": self.backpressure.stats(),
+            "coalescing": parser.coalescing_stats(),
+            "similarity_cache": parser.similarity_cache_stats(),
+            "follow_up_cache": parser.follow_up_cache_stats(),
+            "llm_flow_control": llm.flow_control_stats() if hasattr(llm, "flow_control_stats") else {},
+            "llm_cache": llm.cache_stats(),
+            "model_tiers": parser.model_tier_stats(),
+            "search_cache": parser.search_service.cache_stats(),
+        }
+
+    def _prometheus_gauges(self) -> str:
+        stats = self.backpressure.stats()
+        lines = []
+        for name, help_text in (("active", "Requests being processed"), ("waiting", "Requests queued for a slot"),
+                                ("rejected", "Requests refused because the queue was full")):
+            metric = f"intent_parser_server_{name}" + ("_total" if name == "rejected" else "")
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {'counter' if name == 'rejected' else 'gauge'}")
+            lines.append(f"{metric} {stats[name]}")
+        return "\n".join(lines) + "\n"
+
+    async def metrics(self, scope, receive, send):
+        query = parse_qs(scope.get("query_string", b"").decode())
+        parser = self.get_parser()
+        if query.get("format", ["prometheus"])[0] == "json":
+            await _send(send, 200, _json_bytes({"pipeline": parser.metrics(), **self.server_stats()}))
+            return
+        text = parser.metrics("prometheus") + self._prometheus_gauges()
+        await _send(send, 200, text.encode("utf-8"), content_type="text/plain; version=0.0.4")
+
+
+app = AssistantServer()
+
+
+def main():
+    import uvicorn  # Only needed to run the server, not to import the app
+
+    uvicorn.run("server:app", host=SERVER_HOST, port=SERVER_PORT, workers=SERVER_WORKERS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(*parts) -> str:
+    """Build a stable cache key from whitespace-normalized string parts."""
+    normalized = "\x1f".join(" ".join(str(part).split()) for part in parts)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """Thread-safe in-memory LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._data)}
+
+
+class SQLiteCache:
+    """On-disk key/value store for JSON-serializable values that survives restarts.
+
+    Holds at most `max_size` entries; the least recently written ones are pruned first.
+    """
+
+    _PRUNE_EVERY = 64
+
+    def __init__(self, path: str, max_size: int = 10000, ttl: float = 3600):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.evictions = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, written_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_written_at ON cache (written_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, written_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl, now)
+            )
+            self._writes += 1
+            if self._writes % self._PRUNE_EVERY == 0:
+                self._prune(now)
+            self._conn.commit()
+
+    def _prune(self, now: float):
+        self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        excess = count - self.max_size
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY written_at ASC LIMIT ?)", (excess,)
+            )
+            self.evictions += excess
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """Two-tier cache: an in-memory TTL/LRU in front of an optional SQLite store."""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600, path: str = None, disk_max_size: int = 10000):
+        self.memory = TTLCache(max_size=max_size, ttl=ttl)
+        self.disk = SQLiteCache(path, max_size=disk_max_size, ttl=ttl) if path else None
+        self.disk_hits = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        value = self.disk.get(key)
+        if value is not None:
+            # Promote to the memory tier so the next lookup skips the disk
+            self.disk_hits += 1
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        memory = self.memory.stats()
+        return {
+            "hits": memory["hits"],
+            "disk_hits": self.disk_hits,
+            "misses": memory["misses"] - self.disk_hits,
+            "evictions": memory["evictions"],
+            "disk_evictions": self.disk.evictions if self.disk is not None else 0,
+            "size": memory["size"],
+        }
@@ -0,0 +1,229 @@
+"""Record LLM and search traffic to disk and replay it without network access.
+
+In "record" mode the wrapped model/client is called as usual and every successful
+prompt/response or query/results pair is written, with its observed latency, to a SQLite
+cassette. In "replay" mode the cassette answers instead, optionally sleeping for the recorded
+latency, and anything not on the cassette fails like a network error would.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from services.cache import make_cache_key
+
+CASSETTE_MODES = ("record", "replay")
+_REPLAY_CHUNK_SIZE = 16
+
+
+class Cassette:
+    """Indexed SQLite store of recorded LLM responses and search results."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm (key TEXT PRIMARY KEY, model TEXT NOT NULL, prompt TEXT NOT NULL, "
+            "response TEXT NOT NULL, latency REAL NOT NULL, recorded_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search (key TEXT PRIMARY KEY, query TEXT NOT NULL, max_results INTEGER NOT NULL, "
+            "results TEXT NOT NULL, latency REAL NOT NULL, recorded_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def llm_key(model_name: str, prompt: str) -> str:
+        return make_cache_key(model_name, prompt)
+
+    @staticmethod
+    def search_key(query: str, max_results: int) -> str:
+        return make_cache_key(query.lower(), max_results)
+
+    def record_llm(self, model_name: str, prompt: str, response: str, latency: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm (key, model, prompt, response, latency, recorded_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.llm_key(model_name, prompt), model_name, prompt, response, latency, time.time())
+            )
+            self._conn.commit()
+
+    def lookup_llm(self, model_name: str, prompt: str):
+        """(response, latency) recorded for this prompt, or None."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT response, latency FROM llm WHERE key = ?", (self.llm_key(model_name, prompt),)
+            ).fetchone()
+
+    def record_search(self, query: str, max_results: int, results, latency: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search (key, query, max_results, results, latency, recorded_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.search_key(query, max_results), query, max_results, json.dumps(results), latency, time.time())
+            )
+            self._conn.commit()
+
+    def lookup_search(self, query: str, max_results: int):
+        """(results, latency) recorded for this query, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT results, latency FROM search WHERE key = ?", (self.search_key(query, max_results),)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row is not None else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            (llm,) = self._conn.execute("SELECT COUNT(*) FROM llm").fetchone()
+            (search,) = self._conn.execute("SELECT COUNT(*) FROM search").fetchone()
+        return {"llm_responses": llm, "search_results": search}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_open_cassettes = {}
+_open_lock = threading.Lock()
+
+
+def open_cassette(path: str) -> Cassette:
+    """One shared Cassette per path, so the LLM and search services write through the same connection."""
+    with _open_lock:
+        if path not in _open_cassettes:
+            _open_cassettes[path] = Cassette(path)
+        return _open_cassettes[path]
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class RecordingModel:
+    """Wraps a GenerativeModel and writes every successful response to the cassette."""
+
+    def __init__(self, model, cassette: Cassette, model_name: str):
+        self.model = model
+        self.cassette = cassette
+        self.model_name = model_name
+
+    def _stream(self, prompt, started, chunks):
+        text = []
+        for chunk in chunks:
+            text.append(chunk.text)
+            yield chunk
+        self.cassette.record_llm(self.model_name, prompt, "".join(text), time.perf_counter() - started)
+
+    async def _astream(self, prompt, started, chunks):
+        text = []
+        async for chunk in chunks:
+            text.append(chunk.text)
+            yield chunk
+        self.cassette.record_llm(self.model_name, prompt, "".join(text), time.perf_counter() - started)
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        started = time.perf_counter()
+        if stream:
+            return self._stream(prompt, started, self.model.generate_content(prompt, stream=True, **kwargs))
+        response = self.model.generate_content(prompt, **kwargs)
+        self.cassette.record_llm(self.model_name, prompt, response.text, time.perf_counter() - started)
+        return response
+
+    async def generate_content_async(self, prompt, stream: bool = False, **kwargs):
+        started = time.perf_counter()
+        if stream:
+            return self._astream(prompt, started, await self.model.generate_content_async(prompt, stream=True, **kwargs))
+        response = await self.model.generate_content_async(prompt, **kwargs)
+        self.cassette.record_llm(self.model_name, prompt, response.text, time.perf_counter() - started)
+        return response
+
+
+class ReplayModel:
+    """Answers generate_content(_async) from the cassette; unrecorded prompts raise.
+
+    With `replay_latency` each response takes as long as it did when recorded; streamed
+    responses spread that time over their chunks.
+    """
+
+    def __init__(self, cassette: Cassette, model_name: str, replay_latency: bool = False):
+        self.cassette = cassette
+        self.model_name = model_name
+        self.replay_latency = replay_latency
+
+    def _lookup(self, prompt):
+        row = self.cassette.lookup_llm(self.model_name, prompt)
+        if row is None:
+            raise LookupError("no recorded response for this prompt")
+        text, latency = row
+        return text, latency if self.replay_latency else 0.0
+
+    @staticmethod
+    def _chunks(text):
+        return [text[i:i + _REPLAY_CHUNK_SIZE] for i in range(0, len(text), _REPLAY_CHUNK_SIZE)] or [""]
+
+    def _stream(self, text, latency):
+        chunks = self._chunks(text)
+        for chunk in chunks:
+            if latency:
+                time.sleep(latency / len(chunks))
+            yield _Response(chunk)
+
+    async def _astream(self, text, latency):
+        chunks = self._chunks(text)
+        for chunk in chunks:
+            if latency:
+                await asyncio.sleep(latency / len(chunks))
+            yield _Response(chunk)
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        text, latency = self._lookup(prompt)
+        if stream:
+            return self._stream(text, latency)
+        if latency:
+            time.sleep(latency)
+        return _Response(text)
+
+    async def generate_content_async(self, prompt, stream: bool = False, **kwargs):
+        text, latency = self._lookup(prompt)
+        if stream:
+            return self._astream(text, latency)
+        if latency:
+            await asyncio.sleep(latency)
+        return _Response(text)
+
+
+class RecordingSearchClient:
+    """Wraps a DDGS client and writes every successful search to the cassette."""
+
+    def __init__(self, client, cassette: Cassette):
+        self.client = client
+        self.cassette = cassette
+
+    def text(self, query, max_results=5):
+        started = time.perf_counter()
+        results = list(self.client.text(query, max_results=max_results))
+        self.cassette.record_search(query, max_results, results, time.perf_counter() - started)
+        return results
+
+
+class ReplaySearchClient:
+    """Answers DDGS.text from the cassette; unrecorded queries raise."""
+
+    def __init__(self, cassette: Cassette, replay_latency: bool = False):
+        self.cassette = cassette
+        self.replay_latency = replay_latency
+
+    def text(self, query, max_results=5):
+        row = self.cassette.lookup_search(query, max_results)
+        if row is None:
+            raise LookupError("no recorded results for this query")
+        results, latency = row
+        if self.replay_latency and latency:
+            time.sleep(latency)
+        return results
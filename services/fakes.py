@@ -0,0 +1,272 @@
+"""Local stand-ins for the Gemini model and DuckDuckGo, for tests, benchmarks and offline runs.
+
+    llm = LLMService(model=FakeModel(lambda prompt: '[{"category": "dining", "confidence": 0.9}]'), use_cache=False)
+    parser = IntentParser(llm_service=FakeLLMService(latency=0.2), search_service=FakeSearchService(latency=0.3))
+    tiered = FakeTieredLLMService([{"latency": 0.05, "low_confidence_rate": 0.3}, {"latency": 0.4}])
+
+Injected latency, jitter and failures are drawn from the seed and the prompt (or query), so the
+same input behaves the same way on every run.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+from services.llm_service import LLMService
+from services.model_tiers import TieredLLMService
+from config.settings import LLM_MAX_RETRIES
+from services.search_service import SearchService
+from utils.fast_path import extract_local_entities
+
+INPUT_PATTERN = re.compile(r"^\s*Input:\s*(.*)$", re.MULTILINE)
+CATEGORY_PATTERN = re.compile(r"intent category '([a-z_]+)'")
+# Keyword rules for the canned classifier, checked in order
+CANNED_CATEGORY_KEYWORDS = [
+    ("dining", ("dinner", "lunch", "breakfast", "table", "restaurant", "reservation")),
+    ("travel", ("flight", "train", "trip", "fly ")),
+    ("gifting", ("gift", "present")),
+    ("cab_booking", ("cab", "taxi", "ride to", "uber")),
+]
+
+
+def _draw(seed, salt: str, key: str) -> float:
+    return random.Random(f"{seed}:{salt}:{key}").random()
+
+
+def _prompt_input(prompt: str) -> str:
+    match = INPUT_PATTERN.search(prompt)
+    return match.group(1).strip() if match else ""
+
+
+def canned_categories(user_input: str):
+    """Categories a well-behaved model would return for `user_input`, by keyword."""
+    text = f" {user_input.lower()} "
+    categories = [category for category, keywords in CANNED_CATEGORY_KEYWORDS if any(k in text for k in keywords)]
+    return categories or ["other"]
+
+
+def _canned_entities(user_input: str, category: str) -> dict:
+    entities = extract_local_entities(user_input, category) if category != "other" else {}
+    if category == "other":
+        entities["topic"] = " ".join(user_input.split()[:4]).lower()
+    return entities
+
+
+def canned_response(prompt: str) -> str:
+    """Deterministic, well-formed answers for each of the parser's prompts."""
+    user_input = _prompt_input(prompt)
+    if prompt.lstrip().startswith("Identify the intents"):
+        # Fused classify + extract prompt
+        intents = [
+            {"category": category, "confidence": 0.9, "conflict": "", "entities": _canned_entities(user_input, category),
+             "contradictions": [], "validation_errors": [],
+             "follow_up_questions": ["What would you like to know?"] if category == "other" else []}
+            for category in canned_categories(user_input)
+        ]
+        return "```json\n" + json.dumps(intents) + "\n```"
+    if "Identify the primary intent" in prompt:
+        intents = [{"category": category, "confidence": 0.9, "conflict": ""} for category in canned_categories(user_input)]
+        return "```json\n" + json.dumps(intents) + "\n```"
+    if "Extract key entities" in prompt:
+        match = CATEGORY_PATTERN.search(prompt)
+        category = match.group(1) if match else "other"
+        return "```json\n" + json.dumps({
+            "entities": _canned_entities(user_input, category), "contradictions": [], "validation_errors": [],
+        }) + "\n```"
+    if "follow-up questions" in prompt:
+        return '```json\n["Could you tell me more?", "Is there a deadline?"]\n```'
+    return "{}"
+
+
+class ResourceExhausted(Exception):
+    """Stands in for google.api_core.exceptions.ResourceExhausted (HTTP 429)."""
+    code = 429
+
+
+class DeadlineExceeded(Exception):
+    """Stands in for google.api_core.exceptions.DeadlineExceeded (HTTP 504)."""
+    code = 504
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Mimics GenerativeModel.generate_content(_async), including stream=True.
+
+    `respond` maps a prompt to the response text. Streaming splits it into `chunk_size`
+    character chunks, sleeping `chunk_delay` seconds before each; non-streaming calls
+    sleep `latency` seconds plus up to `jitter`. A `failure_rate` share of prompts raise,
+    a `malformed_rate` share get their response cut in half, and a `low_confidence_rate` share
+    report confidence 0.3 instead of 0.9, like a small model unsure of its answer. With a `capacity`, calls
+    beyond that many in flight are throttled with a 429, like a provider quota. A call slower
+    than its request_options timeout gives up at the timeout, as the real client does.
+    """
+
+    def __init__(self, respond=canned_response, latency: float = 0.0, chunk_size: int = 16, chunk_delay: float = 0.0,
+                 model_name: str = "fake-model", jitter: float = 0.0, failure_rate: float = 0.0,
+                 malformed_rate: float = 0.0, seed: int = 0, capacity: int = None, low_confidence_rate: float = 0.0):
+        self.respond = respond
+        self.latency = latency
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_delay = chunk_delay
+        self.model_name = model_name
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.low_confidence_rate = low_confidence_rate
+        self.seed = seed
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+
+    def _prepare(self, prompt):
+        """Count the call and decide, from the prompt, its text and delay; raises for injected failures."""
+        with self._lock:
+            self.calls += 1
+        if self.failure_rate and _draw(self.seed, "fail", prompt) < self.failure_rate:
+            raise RuntimeError("injected failure")
+        text = self.respond(prompt)
+        if self.low_confidence_rate and _draw(self.seed, "confidence", prompt) < self.low_confidence_rate:
+            text = text.replace('"confidence": 0.9', '"confidence": 0.3')
+        if self.malformed_rate and _draw(self.seed, "malformed", prompt) < self.malformed_rate:
+            text = text[:len(text) // 2]
+        return text, self.latency + self.jitter * _draw(self.seed, "jitter", prompt)
+
+    def _enter(self):
+        with self._lock:
+            if self.capacity is not None and self._in_flight >= self.capacity:
+                self.throttled += 1
+                raise ResourceExhausted("429 Resource has been exhausted (too many concurrent requests)")
+            self._in_flight += 1
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    @staticmethod
+    def _timeout(delay, kwargs):
+        """How long the call sleeps, and whether it then times out instead of answering."""
+        timeout = (kwargs.get("request_options") or {}).get("timeout")
+        if timeout is not None and delay > timeout:
+            return timeout, True
+        return delay, False
+
+    def _chunks(self, text):
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+
+    def _stream(self, text):
+        try:
+            for chunk in self._chunks(text):
+                time.sleep(self.chunk_delay)
+                yield FakeResponse(chunk)
+        finally:
+            self._exit()
+
+    async def _astream(self, text):
+        try:
+            for chunk in self._chunks(text):
+                await asyncio.sleep(self.chunk_delay)
+                yield FakeResponse(chunk)
+        finally:
+            self._exit()
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        text, delay = self._prepare(prompt)
+        self._enter()
+        if stream:
+            return self._stream(text)
+        delay, timed_out = self._timeout(delay, kwargs)
+        try:
+            time.sleep(delay)
+        finally:
+            self._exit()
+        if timed_out:
+            raise DeadlineExceeded("504 Deadline Exceeded")
+        return FakeResponse(text)
+
+    async def generate_content_async(self, prompt, stream: bool = False, **kwargs):
+        text, delay = self._prepare(prompt)
+        self._enter()
+        if stream:
+            return self._astream(text)
+        delay, timed_out = self._timeout(delay, kwargs)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._exit()
+        if timed_out:
+            raise DeadlineExceeded("504 Deadline Exceeded")
+        return FakeResponse(text)
+
+
+class FakeSearchClient:
+    """Mimics DDGS.text with canned results, `latency` (+ up to `jitter`) seconds and a `failure_rate`."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def text(self, query, max_results=5):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency + self.jitter * _draw(self.seed, "jitter", query))
+        if self.failure_rate and _draw(self.seed, "fail", query) < self.failure_rate:
+            raise RuntimeError("injected failure")
+        return [
+            {"title": f"Result {i + 1} for {query}", "href": f"https://example.com/{i + 1}", "body": f"About {query}."}
+            for i in range(max_results)
+        ]
+
+
+class FakeLLMService(LLMService):
+    """LLMService backed by a FakeModel, so caching and tracing behave exactly as in production."""
+
+    def __init__(self, respond=canned_response, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 malformed_rate: float = 0.0, seed: int = 0, use_cache: bool = False, tracer=None,
+                 concurrency=None, max_retries: int = LLM_MAX_RETRIES, **model_kwargs):
+        model = FakeModel(respond, latency=latency, jitter=jitter, failure_rate=failure_rate,
+                          malformed_rate=malformed_rate, seed=seed, **model_kwargs)
+        super().__init__(use_cache=use_cache, model=model, tracer=tracer, concurrency=concurrency,
+                         max_retries=max_retries)
+
+    @property
+    def calls(self) -> int:
+        return self.model.calls
+
+
+class FakeTieredLLMService(TieredLLMService):
+    """TieredLLMService over FakeLLMServices, one per dict of FakeLLMService arguments, smallest tier first.
+
+    Give the small tiers low latency and some malformed_rate or low_confidence_rate to see escalation at work.
+    """
+
+    def __init__(self, tiers=({"latency": 0.02}, {"latency": 0.2}), tracer=None, **shared_kwargs):
+        services = [
+            FakeLLMService(**{"model_name": f"fake-tier-{index}", **shared_kwargs, **kwargs})
+            for index, kwargs in enumerate(tiers)
+        ]
+        super().__init__(services, tracer=tracer)
+
+
+class FakeSearchService(SearchService):
+    """SearchService backed by a FakeSearchClient."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 0,
+                 use_cache: bool = False, tracer=None):
+        client = FakeSearchClient(latency=latency, jitter=jitter, failure_rate=failure_rate, seed=seed)
+        super().__init__(use_cache=use_cache, tracer=tracer, client=client)
+
+    @property
+    def calls(self) -> int:
+        return self.ddgs.calls
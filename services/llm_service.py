@@ -1,14 +1,366 @@
-from config.settings import load_config
-import google.generativeai as genai
+from config.settings import (
+    load_config, LLM_CACHE_ENABLED, LLM_CACHE_MAX_SIZE, LLM_CACHE_TTL_SECONDS, LLM_CACHE_PATH,
+    CASSETTE_MODE, CASSETTE_PATH, CASSETTE_REPLAY_LATENCY,
+    LLM_RATE_LIMIT_PER_SECOND, LLM_RATE_LIMIT_BURST, LLM_MAX_CONCURRENCY, LLM_MIN_CONCURRENCY,
+    LLM_INITIAL_CONCURRENCY, LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY, LLM_TIMEOUT_SECONDS,
+)
+from services.cache import ResponseCache, make_cache_key
+from services.cassette import CASSETTE_MODES, Cassette, RecordingModel, ReplayModel, open_cassette
+from services.rate_limit import TokenBucket, AdaptiveConcurrencyLimit, backoff_delay
+import asyncio
+import threading
+import time
+
+# Provider exceptions (google.api_core) by name, so the classification works for any client library
+THROTTLE_ERRORS = ("ResourceExhausted", "TooManyRequests")
+TRANSIENT_ERRORS = ("ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout", "BadGateway",
+                    "Aborted", "RetryError")
+TRANSIENT_STATUS_CODES = (500, 502, 503, 504)
+
+
+class LLMError(Exception):
+    """A failed LLM call. Retryable errors (throttling, 5xx, timeouts) were already retried before being raised."""
+
+    def __init__(self, message, retryable: bool = False, throttled: bool = False):
+        super().__init__(f"LLM Error: {message}")
+        self.retryable = retryable
+        self.throttled = throttled
+
+
+def classify_error(error: Exception) -> LLMError:
+    if isinstance(error, LLMError):
+        return error
+    name = type(error).__name__
+    code = getattr(error, "code", None)
+    message = str(error) or name  # asyncio timeouts have no message
+    if name in THROTTLE_ERRORS or code == 429:
+        return LLMError(message, retryable=True, throttled=True)
+    if name in TRANSIENT_ERRORS or code in TRANSIENT_STATUS_CODES or isinstance(error, (TimeoutError, ConnectionError)):
+        return LLMError(message, retryable=True)
+    return LLMError(message)
+
 
 class LLMService:
-    def __init__(self):
-        config = load_config()
-        self.model = genai.GenerativeModel(config["model_name"])
+    def __init__(self, cache: ResponseCache = None, use_cache: bool = LLM_CACHE_ENABLED, model=None, model_name: str = None,
+                 tracer=None, cassette_mode: str = CASSETTE_MODE, cassette: Cassette = None,
+                 replay_latency: bool = CASSETTE_REPLAY_LATENCY, rate_limiter: TokenBucket = None,
+                 concurrency: AdaptiveConcurrencyLimit = None, max_retries: int = LLM_MAX_RETRIES,
+                 timeout: float = LLM_TIMEOUT_SECONDS):
+        if cassette_mode is not None and cassette_mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode '{cassette_mode}', expected one of {CASSETTE_MODES}")
+        # `model` can be any object with the GenerativeModel generate_content(_async) interface, e.g. a local fake
+        if cassette_mode == "replay":
+            # Served entirely from the cassette, so no model is created and nothing goes over the network
+            model_name = model_name or getattr(model, "model_name", None) or load_config()["model_name"]
+        elif model is None:
+            model_name = model_name or load_config()["model_name"]
+        self.model_name = model_name or getattr(model, "model_name", type(model).__name__)
+        self.cassette_mode = cassette_mode
+        self._cassette = cassette
+        self.replay_latency = replay_latency
+        # The Gemini client is only imported and created on the first call (see the model property)
+        self._model = self._wrap_model(model) if model is not None or cassette_mode == "replay" else None
+        self._model_lock = threading.Lock()
+        # Prompts are deterministic templates over the user input, so repeats are served from the cache
+        if cache is None and use_cache:
+            cache = ResponseCache(max_size=LLM_CACHE_MAX_SIZE, ttl=LLM_CACHE_TTL_SECONDS, path=LLM_CACHE_PATH)
+        self.cache = cache
+        # Optional utils.tracing.Tracer; every call is recorded as an "llm" span when set
+        self.tracer = tracer
+        if rate_limiter is None and LLM_RATE_LIMIT_PER_SECOND:
+            rate_limiter = TokenBucket(LLM_RATE_LIMIT_PER_SECOND, LLM_RATE_LIMIT_BURST)
+        self.rate_limiter = rate_limiter
+        if concurrency is None and LLM_MAX_CONCURRENCY:
+            concurrency = AdaptiveConcurrencyLimit(LLM_INITIAL_CONCURRENCY, LLM_MIN_CONCURRENCY, LLM_MAX_CONCURRENCY)
+        self.concurrency = concurrency
+        self.max_retries = max(0, max_retries)
+        self.timeout = timeout
+        self.retries = 0
+
+    def _wrap_model(self, model):
+        if self.cassette_mode is None:
+            return model
+        cassette = self._cassette = self._cassette or open_cassette(CASSETTE_PATH)
+        if self.cassette_mode == "replay":
+            return ReplayModel(cassette, self.model_name, self.replay_latency)
+        return RecordingModel(model, cassette, self.model_name)
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    import google.generativeai as genai  # Slow to import, so only when a real call needs it
+                    self._model = self._wrap_model(genai.GenerativeModel(self.model_name))
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def _cache_key(self, prompt):
+        return make_cache_key(self.model_name, prompt) if self.cache is not None else None
+
+    def _cached(self, key):
+        return self.cache.get(key) if key is not None else None
+
+    def _store(self, key, text):
+        if key is not None:
+            self.cache.set(key, text)
+
+    def _trace(self, operation, started, prompt, text, **attrs):
+        if self.tracer is not None:
+            self.tracer.record(operation, "llm", started, prompt_chars=len(prompt),
+                               response_chars=len(text) if text is not None else 0, **attrs)
+
+    def _attempt_timeout(self, deadline):
+        """Timeout for the next attempt: the per-call timeout, cut short by the caller's deadline if it has one."""
+        if deadline is None:
+            return self.timeout or None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMError("deadline exceeded")
+        return min(self.timeout, remaining) if self.timeout else remaining
+
+    @staticmethod
+    def _request_options(timeout):
+        return {"request_options": {"timeout": timeout}} if timeout else {}
+
+    @staticmethod
+    def _remaining(deadline):
+        return max(0.0, deadline - time.monotonic()) if deadline is not None else None
+
+    def _acquire(self, deadline=None):
+        """Wait for the rate limiter and a concurrency slot, no longer than the caller's deadline."""
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(self._remaining(deadline)):
+            raise LLMError("deadline exceeded waiting for the rate limiter")
+        if self.concurrency is not None and not self.concurrency.acquire(self._remaining(deadline)):
+            raise LLMError("deadline exceeded waiting for a concurrency slot")
 
-    def generate_response(self, prompt):
+    async def _aacquire(self, deadline=None):
+        if self.rate_limiter is not None and not await self.rate_limiter.aacquire(self._remaining(deadline)):
+            raise LLMError("deadline exceeded waiting for the rate limiter")
+        if self.concurrency is not None and not await self.concurrency.aacquire(self._remaining(deadline)):
+            raise LLMError("deadline exceeded waiting for a concurrency slot")
+
+    def _release(self, error: LLMError = None):
+        if self.concurrency is None:
+            return
+        if error is None:
+            self.concurrency.on_success()
+        elif error.throttled:
+            self.concurrency.on_throttle()
+        self.concurrency.release()
+
+    def _retry(self, attempt: int, error: LLMError, deadline=None, started_streaming: bool = False) -> float:
+        """Seconds to back off before the next attempt; raises `error` if it should not be retried."""
+        if started_streaming or not error.retryable or attempt >= self.max_retries:
+            raise error
+        delay = backoff_delay(attempt, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            raise error  # No time left for another attempt
+        self.retries += 1
+        if self.tracer is not None:
+            self.tracer.event("llm_retries", error=str(error))
+        return delay
+
+    def _call(self, prompt, deadline=None):
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout(deadline)
+            self._acquire(deadline)
+            try:
+                text = self.model.generate_content(prompt, **self._request_options(timeout)).text
+            except Exception as e:
+                error = classify_error(e)
+                self._release(error)
+                delay = self._retry(attempt, error, deadline)
+            else:
+                self._release()
+                return text
+            time.sleep(delay)
+            attempt += 1
+
+    async def _acall(self, prompt, deadline=None):
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout(deadline)
+            await self._aacquire(deadline)
+            try:
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, **self._request_options(timeout)), timeout
+                )
+                text = response.text
+            except Exception as e:
+                error = classify_error(e)
+                self._release(error)
+                delay = self._retry(attempt, error, deadline)
+            else:
+                self._release()
+                return text
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _close(chunks):
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+    def _stream(self, prompt, deadline=None):
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout(deadline)
+            self._acquire(deadline)
+            started_streaming = False
+            chunks = None
+            try:
+                chunks = self.model.generate_content(prompt, stream=True, **self._request_options(timeout))
+                for chunk in chunks:
+                    # A blocking iterator cannot be cut short mid-chunk, so the deadline is checked around each one
+                    self._attempt_timeout(deadline)
+                    started_streaming = True
+                    yield chunk.text
+                    self._attempt_timeout(deadline)
+            except Exception as e:
+                self._close(chunks)
+                error = classify_error(e)
+                self._release(error)
+                # Chunks already handed to the caller cannot be taken back, so a stream is only retried before them
+                delay = self._retry(attempt, error, deadline, started_streaming)
+            except BaseException:
+                self._close(chunks)
+                self._release()  # The caller stopped consuming the stream
+                raise
+            else:
+                self._release()
+                return
+            time.sleep(delay)
+            attempt += 1
+
+    async def _astream(self, prompt, deadline=None):
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout(deadline)
+            await self._aacquire(deadline)
+            started_streaming = False
+            try:
+                chunks = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, stream=True, **self._request_options(timeout)), timeout
+                )
+                chunks = chunks.__aiter__()
+                while True:
+                    # Each chunk has to arrive within what is left of the attempt's timeout
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), self._attempt_timeout(deadline))
+                    except StopAsyncIteration:
+                        break
+                    started_streaming = True
+                    yield chunk.text
+            except Exception as e:
+                error = classify_error(e)
+                self._release(error)
+                delay = self._retry(attempt, error, deadline, started_streaming)
+            except BaseException:
+                self._release()
+                raise
+            else:
+                self._release()
+                return
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    def _deadline(timeout):
+        return time.monotonic() + timeout if timeout is not None else None
+
+    def generate_response(self, prompt, timeout: float = None):
+        """Response text for `prompt`. `timeout` bounds the whole call in seconds, retries included."""
+        started = time.perf_counter()
+        key = self._cache_key(prompt)
+        cached = self._cached(key)
+        if cached is not None:
+            self._trace("generate_response", started, prompt, cached, cached=True)
+            return cached
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            raise Exception(f"LLM Error: {e}")
\ No newline at end of file
+            text = self._call(prompt, self._deadline(timeout))
+        except LLMError as e:
+            self._trace("generate_response", started, prompt, None, error=str(e))
+            raise
+        self._store(key, text)
+        self._trace("generate_response", started, prompt, text)
+        return text
+
+    async def agenerate_response(self, prompt, timeout: float = None):
+        """Non-blocking variant of generate_response for use on an event loop."""
+        started = time.perf_counter()
+        key = self._cache_key(prompt)
+        cached = self._cached(key)
+        if cached is not None:
+            self._trace("generate_response", started, prompt, cached, cached=True)
+            return cached
+        try:
+            text = await self._acall(prompt, self._deadline(timeout))
+        except LLMError as e:
+            self._trace("generate_response", started, prompt, None, error=str(e))
+            raise
+        self._store(key, text)
+        self._trace("generate_response", started, prompt, text)
+        return text
+
+    def stream_response(self, prompt, timeout: float = None):
+        """Yield the response text chunk by chunk as the model produces it."""
+        started = time.perf_counter()
+        key = self._cache_key(prompt)
+        cached = self._cached(key)
+        if cached is not None:
+            self._trace("stream_response", started, prompt, cached, cached=True)
+            yield cached
+            return
+        chunks = []
+        try:
+            for text in self._stream(prompt, self._deadline(timeout)):
+                chunks.append(text)
+                yield text
+        except LLMError as e:
+            self._trace("stream_response", started, prompt, "".join(chunks), error=str(e))
+            raise
+        text = "".join(chunks)
+        self._store(key, text)
+        self._trace("stream_response", started, prompt, text)
+
+    async def astream_response(self, prompt, timeout: float = None):
+        """Async counterpart of stream_response."""
+        started = time.perf_counter()
+        key = self._cache_key(prompt)
+        cached = self._cached(key)
+        if cached is not None:
+            self._trace("stream_response", started, prompt, cached, cached=True)
+            yield cached
+            return
+        chunks = []
+        try:
+            async for text in self._astream(prompt, self._deadline(timeout)):
+                chunks.append(text)
+                yield text
+        except LLMError as e:
+            self._trace("stream_response", started, prompt, "".join(chunks), error=str(e))
+            raise
+        text = "".join(chunks)
+        self._store(key, text)
+        self._trace("stream_response", started, prompt, text)
+
+    def flow_control_stats(self) -> dict:
+        """Retries so far, the adaptive concurrency limit and time spent waiting on the rate limiter."""
+        return {
+            "retries": self.retries,
+            "concurrency": self.concurrency.stats() if self.concurrency is not None else {},
+            "rate_limit_wait_seconds": round(self.rate_limiter.waited_seconds, 3) if self.rate_limiter is not None else 0.0,
+        }
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def clear_cache(self):
+        if self.cache is not None:
+            self.cache.clear()
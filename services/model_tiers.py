@@ -0,0 +1,201 @@
+"""A cascade of LLM tiers, from a small fast model up to larger ones.
+
+Each call starts on the tier its caller picks (IntentParser picks one per graph node). When the
+caller's `check(text)` finds the answer unusable, for example malformed JSON, low confidence or a
+flagged conflict, the same prompt goes to the next tier up. This repeats until an answer passes
+or the largest tier has answered. Errors on a lower tier escalate the same way.
+"""
+import time
+from collections import Counter
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+from config.settings import LLM_CACHE_ENABLED, LLM_CACHE_MAX_SIZE, LLM_CACHE_TTL_SECONDS, LLM_CACHE_PATH
+from services.cache import ResponseCache
+from services.llm_service import LLMService, LLMError
+
+
+class TieredLLMService:
+    """Drop-in for LLMService over several models, cheapest first. `tier` is an index into `tiers`."""
+
+    def __init__(self, tiers: List[LLMService], tracer=None):
+        if not tiers:
+            raise ValueError("TieredLLMService needs at least one tier")
+        self.tiers = list(tiers)
+        self._tracer = None
+        self.tracer = tracer
+        self._lock = Lock()
+        self._calls = [0] * len(self.tiers)
+        self._errors = [0] * len(self.tiers)
+        self._escalations = [0] * len(self.tiers)
+        self._reasons = Counter()
+        self._escalations_by_node = Counter()
+
+    @classmethod
+    def from_model_names(cls, model_names: List[str], tracer=None) -> "TieredLLMService":
+        # One response cache for every tier; its keys include the model name
+        cache = ResponseCache(max_size=LLM_CACHE_MAX_SIZE, ttl=LLM_CACHE_TTL_SECONDS, path=LLM_CACHE_PATH) \
+            if LLM_CACHE_ENABLED else None
+        return cls([LLMService(cache=cache, use_cache=False, model_name=name, tracer=tracer) for name in model_names],
+                   tracer)
+
+    @property
+    def tracer(self):
+        return self._tracer
+
+    @tracer.setter
+    def tracer(self, tracer):
+        self._tracer = tracer
+        if tracer is not None:
+            for service in self.tiers:
+                service.tracer = tracer
+
+    @property
+    def model_name(self) -> str:
+        return " > ".join(service.model_name for service in self.tiers)
+
+    @property
+    def calls(self) -> int:
+        return sum(getattr(service, "calls", 0) for service in self.tiers)
+
+    def _tier(self, tier: int) -> int:
+        return min(max(0, tier), len(self.tiers) - 1)
+
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        return max(0.0, deadline - time.monotonic()) if deadline is not None else None
+
+    def _count_call(self, tier: int, error: bool = False):
+        with self._lock:
+            self._calls[tier] += 1
+            self._errors[tier] += error
+
+    def _escalate(self, tier: int, reason: str, node: str, deadline: Optional[float]) -> bool:
+        """Record moving a call up from `tier`; False when there is no tier above or no time left for it."""
+        if tier + 1 >= len(self.tiers) or (deadline is not None and time.monotonic() >= deadline):
+            return False
+        with self._lock:
+            self._escalations[tier] += 1
+            self._reasons[reason] += 1
+            self._escalations_by_node[node or "unknown"] += 1
+        if self.tracer is not None:
+            self.tracer.event("llm_escalations", node=node or "unknown", reason=reason,
+                              model=self.tiers[tier + 1].model_name)
+        return True
+
+    def _cascade(self, prompt, deadline, tier, check, node, text=None):
+        """Call tiers from `tier` up until an answer passes `check`. `text`, a lower tier's rejected
+        answer, is returned if the tiers above fail, since a weak answer beats none."""
+        while True:
+            try:
+                answer = self.tiers[tier].generate_response(prompt, timeout=self._remaining(deadline))
+            except LLMError:
+                self._count_call(tier, error=True)
+                if not self._escalate(tier, "error", node, deadline):
+                    if text is not None:
+                        return text
+                    raise
+                tier += 1
+                continue
+            self._count_call(tier)
+            text = answer
+            reason = check(text) if check is not None else None
+            if reason is None or not self._escalate(tier, reason, node, deadline):
+                return text
+            tier += 1
+
+    async def _acascade(self, prompt, deadline, tier, check, node, text=None):
+        while True:
+            try:
+                answer = await self.tiers[tier].agenerate_response(prompt, timeout=self._remaining(deadline))
+            except LLMError:
+                self._count_call(tier, error=True)
+                if not self._escalate(tier, "error", node, deadline):
+                    if text is not None:
+                        return text
+                    raise
+                tier += 1
+                continue
+            self._count_call(tier)
+            text = answer
+            reason = check(text) if check is not None else None
+            if reason is None or not self._escalate(tier, reason, node, deadline):
+                return text
+            tier += 1
+
+    def generate_response(self, prompt, timeout: float = None, tier: int = 0, check: Callable = None, node: str = None):
+        """Response text from `tier`, or from a tier above it if `check(text)` returns a reason to escalate.
+
+        `timeout` bounds the whole cascade, escalations included.
+        """
+        return self._cascade(prompt, LLMService._deadline(timeout), self._tier(tier), check, node)
+
+    async def agenerate_response(self, prompt, timeout: float = None, tier: int = 0, check: Callable = None,
+                                 node: str = None):
+        return await self._acascade(prompt, LLMService._deadline(timeout), self._tier(tier), check, node)
+
+    def stream_response(self, prompt, timeout: float = None, tier: int = 0, check: Callable = None, node: str = None):
+        """Stream one tier's response. Streamed chunks cannot be taken back, so `check` is applied by the
+        caller once the stream is complete, through escalate_streamed."""
+        tier = self._tier(tier)
+        try:
+            yield from self.tiers[tier].stream_response(prompt, timeout=timeout)
+        except LLMError:
+            self._count_call(tier, error=True)
+            raise
+        self._count_call(tier)
+
+    async def astream_response(self, prompt, timeout: float = None, tier: int = 0, check: Callable = None,
+                               node: str = None):
+        tier = self._tier(tier)
+        try:
+            async for text in self.tiers[tier].astream_response(prompt, timeout=timeout):
+                yield text
+        except LLMError:
+            self._count_call(tier, error=True)
+            raise
+        self._count_call(tier)
+
+    def escalate_streamed(self, prompt, text: str, timeout: float = None, tier: int = 0, check: Callable = None,
+                          node: str = None) -> str:
+        """`text`, streamed from `tier`, or the answer of the tiers above if `check(text)` rejects it."""
+        deadline = LLMService._deadline(timeout)
+        tier = self._tier(tier)
+        reason = check(text) if check is not None else None
+        if reason is None or not self._escalate(tier, reason, node, deadline):
+            return text
+        return self._cascade(prompt, deadline, tier + 1, check, node, text)
+
+    async def aescalate_streamed(self, prompt, text: str, timeout: float = None, tier: int = 0, check: Callable = None,
+                                 node: str = None) -> str:
+        deadline = LLMService._deadline(timeout)
+        tier = self._tier(tier)
+        reason = check(text) if check is not None else None
+        if reason is None or not self._escalate(tier, reason, node, deadline):
+            return text
+        return await self._acascade(prompt, deadline, tier + 1, check, node, text)
+
+    def tier_stats(self) -> Dict:
+        """Calls, errors and escalations per tier, why calls were escalated, and from which nodes."""
+        with self._lock:
+            tiers = [
+                {"tier": index, "model": service.model_name, "calls": self._calls[index], "errors": self._errors[index],
+                 "escalations": self._escalations[index],
+                 "escalation_rate": round(self._escalations[index] / self._calls[index], 4) if self._calls[index] else 0.0}
+                for index, service in enumerate(self.tiers)
+            ]
+            return {"tiers": tiers, "escalation_reasons": dict(self._reasons),
+                    "escalations_by_node": dict(self._escalations_by_node)}
+
+    def flow_control_stats(self) -> Dict:
+        return {service.model_name: service.flow_control_stats() for service in self.tiers}
+
+    def cache_stats(self) -> Dict:
+        caches = {id(service.cache): service for service in self.tiers if service.cache is not None}
+        if len(caches) == 1:
+            return next(iter(caches.values())).cache_stats()  # Shared by every tier
+        return {service.model_name: service.cache_stats() for service in self.tiers}
+
+    def clear_cache(self):
+        for service in self.tiers:
+            service.clear_cache()
@@ -0,0 +1,147 @@
+"""Client-side flow control for provider calls: a token-bucket rate limiter, an AIMD
+concurrency limit, and jittered exponential backoff.
+
+Both limiters can be shared by threads and event loops at the same time; async waiters
+are woken with call_soon_threadsafe, so nothing blocks a loop.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def _reserve(self, timeout: float = None):
+        """Take a token, going into debt if needed; returns how long the caller must wait for it, or
+        None without taking one when that is longer than `timeout`."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if timeout is not None and wait > timeout:
+                return None
+            self._tokens -= 1
+            self.waited_seconds += wait
+            return wait
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Wait for a token; False, without one, if it would take longer than `timeout` seconds."""
+        wait = self._reserve(timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    async def aacquire(self, timeout: float = None) -> bool:
+        wait = self._reserve(timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+
+class AdaptiveConcurrencyLimit:
+    """AIMD limit on calls in flight: +1 per limit's worth of successes, times `decrease` on throttling."""
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = 64, decrease: float = 0.5):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.decrease = decrease
+        self._limit = float(min(self.maximum, max(self.minimum, initial)))
+        self._in_flight = 0
+        self._waiters = deque()  # Callables that wake one waiting thread or task
+        self._lock = threading.Lock()
+        self.throttles = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _try_acquire(self, wake) -> bool:
+        with self._lock:
+            if self._in_flight < int(self._limit):
+                self._in_flight += 1
+                return True
+            self._waiters.append(wake)
+            return False
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Wait for a slot; False, without one, if none frees up within `timeout` seconds."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        event = threading.Event()
+        while not self._try_acquire(event.set):
+            remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            if not event.wait(remaining):
+                self._abandon(event.set)
+                return False
+            event.clear()
+        return True
+
+    async def aacquire(self, timeout: float = None) -> bool:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        event = asyncio.Event()
+        wake = lambda: loop.call_soon_threadsafe(event.set)
+        while not self._try_acquire(wake):
+            try:
+                await asyncio.wait_for(event.wait(), max(0.0, deadline - loop.time()) if deadline is not None else None)
+            except asyncio.TimeoutError:
+                self._abandon(wake)
+                return False
+            except asyncio.CancelledError:
+                self._abandon(wake)
+                raise
+            event.clear()
+        return True
+
+    def _abandon(self, wake):
+        """Withdraw a waiter that gives up. If release already woke it, the wake-up is passed to the
+        next waiter, or the slot it was meant for would be lost while others wait."""
+        with self._lock:
+            if wake in self._waiters:
+                self._waiters.remove(wake)
+                return
+            handoff = self._waiters.popleft() if self._waiters and self._in_flight < int(self._limit) else None
+        if handoff is not None:
+            handoff()
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            # Wake as many waiters as there are free slots; each retries and re-queues if it loses the race
+            wake = [self._waiters.popleft() for _ in range(min(len(self._waiters), int(self._limit) - self._in_flight))]
+        for waiter in wake:
+            waiter()
+
+    def on_success(self):
+        with self._lock:
+            self._limit = min(self.maximum, self._limit + 1 / self._limit)
+
+    def on_throttle(self):
+        with self._lock:
+            self._limit = max(self.minimum, self._limit * self.decrease)
+            self.throttles += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"limit": int(self._limit), "in_flight": self._in_flight, "waiting": len(self._waiters),
+                    "throttles": self.throttles}
+
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(maximum, base * 2**attempt)]."""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
@@ -1,12 +1,102 @@
-from duckduckgo_search import DDGS
+from config.settings import (
+    SEARCH_CACHE_ENABLED, SEARCH_CACHE_MAX_SIZE, SEARCH_CACHE_TTL_SECONDS, SEARCH_CACHE_PATH,
+    CASSETTE_MODE, CASSETTE_PATH, CASSETTE_REPLAY_LATENCY,
+)
+from services.cache import ResponseCache, make_cache_key
+from services.cassette import CASSETTE_MODES, Cassette, RecordingSearchClient, ReplaySearchClient, open_cassette
+import asyncio
+import copy
+import threading
+import time
 
 class SearchService:
-    def __init__(self):
-        self.ddgs = DDGS()
+    def __init__(self, cache: ResponseCache = None, use_cache: bool = SEARCH_CACHE_ENABLED, tracer=None, client=None,
+                 cassette_mode: str = CASSETTE_MODE, cassette: Cassette = None,
+                 replay_latency: bool = CASSETTE_REPLAY_LATENCY):
+        if cassette_mode is not None and cassette_mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode '{cassette_mode}', expected one of {CASSETTE_MODES}")
+        self.cassette_mode = cassette_mode
+        self._cassette = cassette
+        self.replay_latency = replay_latency
+        # `client` can be any object with the DDGS text(query, max_results) interface, e.g. a local fake.
+        # The default DDGS client is only imported and created on the first search (see the ddgs property).
+        self._client = self._wrap_client(client) if client is not None or cassette_mode == "replay" else None
+        self._client_lock = threading.Lock()
+        if cache is None and use_cache:
+            cache = ResponseCache(max_size=SEARCH_CACHE_MAX_SIZE, ttl=SEARCH_CACHE_TTL_SECONDS, path=SEARCH_CACHE_PATH)
+        self.cache = cache
+        # Optional utils.tracing.Tracer; every search is recorded as a "search" span when set
+        self.tracer = tracer
 
-    def search_web(self, query, max_results=5):
+    def _wrap_client(self, client):
+        if self.cassette_mode is None:
+            return client
+        cassette = self._cassette = self._cassette or open_cassette(CASSETTE_PATH)
+        if self.cassette_mode == "replay":
+            return ReplaySearchClient(cassette, self.replay_latency)
+        return RecordingSearchClient(client, cassette)
+
+    @property
+    def ddgs(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from duckduckgo_search import DDGS
+                    self._client = self._wrap_client(DDGS())
+        return self._client
+
+    @ddgs.setter
+    def ddgs(self, client):
+        self._client = client
+
+    def _cache_key(self, query, max_results):
+        return make_cache_key(query.lower(), max_results) if self.cache is not None else None
+
+    def _trace(self, operation, started, results, **attrs):
+        if self.tracer is not None:
+            if isinstance(results, dict) and "error" in results:
+                attrs["error"] = results["error"]
+            self.tracer.record(operation, "search", started, results=len(results) if isinstance(results, list) else 0, **attrs)
+
+    def _fetch(self, query, max_results, key):
         try:
             results = self.ddgs.text(query, max_results=max_results)
-            return [{"title": r["title"], "url": r["href"], "snippet": r["body"]} for r in results]
+            results = [{"title": r["title"], "url": r["href"], "snippet": r["body"]} for r in results]
         except Exception as e:
-            return {"error": f"Search Error: {e}"}
\ No newline at end of file
+            # Errors are returned but never cached, so the next call retries
+            return {"error": f"Search Error: {e}"}
+        if key is not None:
+            self.cache.set(key, copy.deepcopy(results))
+        return results
+
+    def search_web(self, query, max_results=5):
+        started = time.perf_counter()
+        key = self._cache_key(query, max_results)
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            self._trace("search_web", started, cached, cached=True)
+            # Callers own their result; a copy keeps their edits out of the cache
+            return copy.deepcopy(cached)
+        results = self._fetch(query, max_results, key)
+        self._trace("search_web", started, results)
+        return results
+
+    async def asearch_web(self, query, max_results=5):
+        """Non-blocking variant of search_web; the DuckDuckGo client is synchronous, so it runs in a thread."""
+        started = time.perf_counter()
+        key = self._cache_key(query, max_results)
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            self._trace("search_web", started, cached, cached=True)
+            # Callers own their result; a copy keeps their edits out of the cache
+            return copy.deepcopy(cached)
+        results = await asyncio.to_thread(self._fetch, query, max_results, key)
+        self._trace("search_web", started, results)
+        return results
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def clear_cache(self):
+        if self.cache is not None:
+            self.cache.clear()
@@ -9,7 +9,9 @@ setup(
         "python-dotenv",
         "google-generativeai",
         "langgraph",
+        "langchain-core",
         "duckduckgo-search",
-        "streamlit"
+        "streamlit",
+        "uvicorn"
     ],
 ) 
\ No newline at end of file
@@ -0,0 +1,10 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config.settings
+
+# load_config is filled in per deployment; the fakes only need a model name
+if not hasattr(config.settings, "load_config"):
+    config.settings.load_config = lambda: {"model_name": "fake-model"}
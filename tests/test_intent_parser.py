@@ -0,0 +1,108 @@
+import asyncio
+import datetime
+import threading
+
+import utils.intent_parser
+from services.fakes import FakeLLMService, FakeSearchService, FakeTieredLLMService
+from utils.intent_parser import IntentParser
+
+ROUTE = "Book a table for 4 tomorrow at 8pm in Indiranagar and a cab to the airport"
+
+
+class Tomorrow(datetime.datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime.datetime.now(tz) + datetime.timedelta(days=1)
+
+
+def make_parser(llm=None, **kwargs):
+    options = {"classifier_path": None, "fast_path": False, "similarity_cache": False, "coalesce": False, **kwargs}
+    return IntentParser(llm_service=llm or FakeLLMService(), search_service=FakeSearchService(), **options)
+
+
+def dates(results):
+    return [result["key_entities"].get("date") for result in results]
+
+
+def test_similarity_cache_reuses_rephrased_input():
+    llm = FakeLLMService()
+    parser = make_parser(llm, similarity_cache=True)
+    first = parser.process_input(ROUTE)
+    calls = llm.calls
+    assert parser.process_input(ROUTE.replace("airport", "airports")) == first
+    assert llm.calls == calls
+    assert parser.similarity_cache_stats()["near_hits"] == 1
+
+
+def test_similarity_cache_keeps_word_order():
+    parser = make_parser(similarity_cache=True)
+    parser.process_input("Book a cab from Indiranagar to the airport")
+    parser.process_input("Book a cab from the airport to Indiranagar")
+    stats = parser.similarity_cache_stats()
+    assert stats["exact_hits"] == 0 and stats["near_hits"] == 0
+
+
+def test_similarity_cache_resolves_dates_on_the_day_of_the_request(monkeypatch):
+    parser = make_parser(similarity_cache=True)
+    today = dates(parser.process_input(ROUTE))
+    monkeypatch.setattr(utils.intent_parser, "datetime", Tomorrow)
+    later = dates(parser.process_input(ROUTE))
+    expected = (datetime.date.today() + datetime.timedelta(days=2)).isoformat()
+    assert today != later and expected in later
+    assert parser.similarity_cache_stats()["exact_hits"] == 1
+
+
+def test_warm_parser_resolves_dates_per_request(monkeypatch):
+    parser = make_parser()
+    parser.process_input(ROUTE)
+    monkeypatch.setattr(utils.intent_parser, "datetime", Tomorrow)
+    expected = (datetime.date.today() + datetime.timedelta(days=2)).isoformat()
+    assert expected in dates(parser.process_input(ROUTE))
+    assert expected in dates(asyncio.run(parser.aprocess_input(ROUTE)))
+
+
+def test_identical_concurrent_inputs_share_one_run():
+    llm = FakeLLMService(latency=0.2)
+    parser = make_parser(llm, coalesce=True)
+    parser.graph
+    barrier = threading.Barrier(8)
+    results = []
+
+    def request():
+        barrier.wait()
+        results.append(parser.process_input(ROUTE))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(result == results[0] for result in results)
+    assert parser.coalescing_stats()["sync"]["shared"] > 0
+    assert llm.calls < 8 * 3
+
+
+def test_identical_concurrent_async_inputs_share_one_run():
+    llm = FakeLLMService(latency=0.2)
+    parser = make_parser(llm, coalesce=True)
+
+    async def requests():
+        return await asyncio.gather(*(parser.aprocess_input(ROUTE) for _ in range(8)))
+
+    results = asyncio.run(requests())
+    assert all(result == results[0] for result in results)
+    assert parser.coalescing_stats()["async"] == {"calls": 1, "shared": 7, "in_flight": 0}
+
+    # Each caller gets its own copy of the shared result
+    results[0][0]["key_entities"]["party_size"] = 99
+    assert results[1][0]["key_entities"]["party_size"] != 99
+
+
+def test_cascade_escalates_low_confidence_answers():
+    llm = FakeTieredLLMService([{"low_confidence_rate": 1.0}, {}])
+    parser = make_parser(llm, streaming=False)
+    results = parser.process_input("Book a table for 4 tomorrow")
+    assert [result["intent_category"] for result in results] == ["dining"]
+    stats = parser.model_tier_stats()
+    assert stats["escalations_by_node"]["parse_intent"] == 1
+    assert stats["tiers"][1]["calls"] >= 1
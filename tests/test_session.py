@@ -0,0 +1,38 @@
+from services.fakes import FakeLLMService, FakeSearchService, canned_response
+from utils.intent_parser import IntentParser
+from utils.session import ConversationSession
+
+REGION_QUESTION = "Do you need information for a specific region or state?"
+
+
+def respond(prompt):
+    if "completing" in prompt:
+        return '{"entities": {"location": "Karnataka"}}'
+    return canned_response(prompt)
+
+
+def make_session():
+    parser = IntentParser(llm_service=FakeLLMService(respond=respond), search_service=FakeSearchService(),
+                          classifier_path=None, fast_path=False, similarity_cache=False)
+    return ConversationSession(parser)
+
+
+def test_answer_drops_the_answered_rule_question():
+    session = make_session()
+    results = session.start("Help me renew my fishing license")
+    assert REGION_QUESTION in results[0]["follow_up_questions"]
+
+    results = session.answer("I am in Karnataka")
+    assert results[0]["key_entities"]["location"] == "Karnataka"
+    assert REGION_QUESTION not in results[0]["follow_up_questions"]
+
+
+def test_answering_every_question_leaves_none_pending():
+    session = make_session()
+    session.start("Help me renew my fishing license")
+    session.answer("I am in Karnataka")
+    for _ in range(5):
+        if session.pending_index() is None:
+            break
+        session.answer("no")
+    assert session.results()[0]["follow_up_questions"] == []
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+
+from services.fakes import FakeLLMService, FakeSearchService
+from services.llm_service import LLMError
+from utils.intent_parser import IntentParser
+
+INPUT = "Book a table for 4 tomorrow and a cab to the airport"
+
+
+def slow_stream_parser():
+    llm = FakeLLMService(chunk_size=4, chunk_delay=0.05, latency=0.3)
+    parser = IntentParser(llm_service=llm, search_service=FakeSearchService(), classifier_path=None, fast_path=False,
+                          streaming=True, similarity_cache=False, coalesce=False)
+    parser.graph
+    return parser
+
+
+def test_stream_response_stops_between_chunks_at_deadline():
+    llm = FakeLLMService(chunk_size=4, chunk_delay=0.05)
+    started = time.monotonic()
+    with pytest.raises(LLMError):
+        for _ in llm.stream_response("Identify the primary intent\nInput: " + INPUT, timeout=0.2):
+            pass
+    assert time.monotonic() - started < 0.5
+
+
+def test_process_input_returns_partial_results_at_deadline():
+    parser = slow_stream_parser()
+    started = time.monotonic()
+    results = parser.process_input(INPUT, deadline=0.5)
+    assert time.monotonic() - started < 0.8
+    assert "parse_intent" in results[0]["degraded"]
+
+
+def test_aprocess_input_returns_partial_results_at_deadline():
+    parser = slow_stream_parser()
+    started = time.monotonic()
+    results = asyncio.run(parser.aprocess_input(INPUT, deadline=0.5))
+    assert time.monotonic() - started < 0.8
+    assert "parse_intent" in results[0]["degraded"]
+
+
+def test_streaming_without_deadline_matches_blocking_calls():
+    streamed = IntentParser(llm_service=FakeLLMService(chunk_size=4), search_service=FakeSearchService(),
+                            classifier_path=None, fast_path=False, streaming=True, similarity_cache=False)
+    blocking = IntentParser(llm_service=FakeLLMService(), search_service=FakeSearchService(),
+                            classifier_path=None, fast_path=False, streaming=False, similarity_cache=False)
+    assert streamed.process_input(INPUT) == blocking.process_input(INPUT)
@@ -0,0 +1,62 @@
+"""Minimal client for server.py, so a frontend can use a remote parser like a local one."""
+import json
+import urllib.error
+import urllib.request
+from typing import Dict, Iterator, List
+
+from config.settings import ASSISTANT_API_TIMEOUT_SECONDS
+
+
+class AssistantClient:
+    """process_input, process_batch and stream_input over HTTP, with the same return values as IntentParser."""
+
+    def __init__(self, base_url: str, timeout: float = ASSISTANT_API_TIMEOUT_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _post(self, path: str, payload: Dict):
+        request = urllib.request.Request(
+            self.base_url + path, data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST",
+        )
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def _call(self, path: str, payload: Dict):
+        try:
+            with self._post(path, payload) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e).get("error", str(e))
+            except ValueError:
+                message = str(e)
+            return {"error": message}
+        except (urllib.error.URLError, OSError) as e:
+            return {"error": f"Assistant service unavailable: {e}"}
+
+    def process_input(self, user_input: str, deadline: float = None) -> List[Dict]:
+        payload = {"user_input": user_input}
+        if deadline is not None:
+            payload["deadline"] = deadline
+        result = self._call("/process_input", payload)
+        return [result] if isinstance(result, dict) else result  # Errors come back as one {"error"} result
+
+    def process_batch(self, inputs: List[str], deadline: float = None) -> List[List[Dict]]:
+        payload = {"inputs": list(inputs)}
+        if deadline is not None:
+            payload["deadline"] = deadline
+        result = self._call("/process_batch", payload)
+        if "error" in result:
+            return [[{"error": result["error"]}] for _ in payload["inputs"]]
+        return result["results"]
+
+    def stream_input(self, user_input: str) -> Iterator[Dict]:
+        try:
+            with self._post("/stream", {"user_input": user_input}) as response:
+                for line in response:
+                    if line.strip():
+                        yield json.loads(line)
+        except (urllib.error.URLError, OSError) as e:
+            error = f"Assistant service unavailable: {e}"
+            yield {"event": "error", "error": error}
+            yield {"event": "done", "results": [{"error": error}]}
@@ -0,0 +1,164 @@
+"""Stream a JSONL file of inputs through IntentParser into a JSONL file of results.
+
+Usage:
+    python -m utils.batch_runner inputs.jsonl results.jsonl --field body --concurrency 16
+    python -m utils.batch_runner inputs.jsonl results.jsonl --field body --resume
+
+Each input line is a JSON object (the text is read from --field) or a bare JSON string.
+Results are written in input order, one line per input. A checkpoint next to the output
+records how many input lines are done and the matching output offset, so --resume
+continues after a crash without duplicating or losing lines.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+
+from config.settings import BATCH_CONCURRENCY, REQUEST_DEADLINE_SECONDS
+
+
+def _read_checkpoint(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"lines_done": 0, "output_offset": 0}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_checkpoint(path: str, lines_done: int, output_offset: int):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"lines_done": lines_done, "output_offset": output_offset}, f)
+    os.replace(tmp_path, path)  # Atomic, so a crash never leaves a half-written checkpoint
+
+
+def _input_text(record, field: str):
+    if isinstance(record, dict):
+        return record.get(field)
+    return record
+
+
+class BatchStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.processed = 0
+        self.errors = 0
+
+    def record(self, result):
+        self.processed += 1
+        if result and isinstance(result[0], dict) and "error" in result[0]:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_per_second": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+
+async def run_batch(parser, input_path: str, output_path: str, field: str = "user_input", id_field: str = None,
+                    concurrency: int = BATCH_CONCURRENCY, resume: bool = False, checkpoint_every: int = 100,
+                    progress_every: int = 100, deadline: float = REQUEST_DEADLINE_SECONDS, log=sys.stderr) -> dict:
+    """Process `input_path` into `output_path` with bounded concurrency and constant memory.
+
+    `deadline` is each input's latency budget in seconds, counted from when it starts processing.
+    `checkpoint_every` of 0 writes the checkpoint only at the end.
+    """
+    if checkpoint_every < 0:
+        raise ValueError(f"checkpoint_every must be 0 or more, got {checkpoint_every}")
+    checkpoint_path = f"{output_path}.checkpoint"
+    checkpoint = _read_checkpoint(checkpoint_path) if resume else {"lines_done": 0, "output_offset": 0}
+    if resume and os.path.exists(output_path):
+        # Drop results written after the last checkpoint; they are recomputed below
+        os.truncate(output_path, checkpoint["output_offset"])
+    lines_done = checkpoint["lines_done"]
+
+    concurrency = max(1, concurrency)
+    limit = asyncio.Semaphore(concurrency)
+    # Tasks are awaited in input order; capping the window keeps memory constant
+    window = deque()
+    max_window = concurrency * 4
+    stats = BatchStats()
+
+    async def process(line: str):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            return None, [{"error": f"Invalid JSON input: {e}"}]
+        text = _input_text(record, field)
+        if not isinstance(text, str):
+            return record, [{"error": f"Input has no text field '{field}'"}]
+        return record, await parser.aprocess_isolated(text, limit, deadline)
+
+    with open(input_path) as src, open(output_path, "a" if resume else "w") as dst:
+        async def flush_one():
+            nonlocal lines_done
+            line_no, task = window.popleft()
+            if task is not None:
+                record, result = await task
+                output = {"line": line_no, "result": result}
+                text = _input_text(record, field)
+                if isinstance(text, str):
+                    # Keeping the input makes the output usable as intent classifier training data
+                    output["user_input"] = text
+                if id_field and isinstance(record, dict) and id_field in record:
+                    output["id"] = record[id_field]
+                dst.write(json.dumps(output) + "\n")
+                stats.record(result)
+                if progress_every and stats.processed % progress_every == 0:
+                    print(f"processed {stats.processed} lines ({stats.summary()['throughput_per_second']}/s, "
+                          f"{stats.errors} errors)", file=log)
+            lines_done = line_no + 1
+            if checkpoint_every and lines_done % checkpoint_every == 0:
+                dst.flush()
+                _write_checkpoint(checkpoint_path, lines_done, dst.tell())
+
+        for line_no, line in enumerate(src):
+            if line_no < lines_done:
+                continue
+            # Blank lines produce no output but still count towards the checkpoint
+            window.append((line_no, asyncio.ensure_future(process(line)) if line.strip() else None))
+            if len(window) >= max_window:
+                await flush_one()
+        while window:
+            await flush_one()
+        dst.flush()
+        _write_checkpoint(checkpoint_path, lines_done, dst.tell())
+
+    summary = stats.summary()
+    print(json.dumps(summary), file=log)
+    return summary
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Run a JSONL file of inputs through the intent parser.")
+    arg_parser.add_argument("input", help="JSONL file of inputs")
+    arg_parser.add_argument("output", help="JSONL file to write results to")
+    arg_parser.add_argument("--field", default="user_input", help="JSON field holding the input text")
+    arg_parser.add_argument("--id-field", default=None, help="JSON field copied to each result as 'id'")
+    arg_parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    arg_parser.add_argument("--mode", default=None, help="Pipeline mode passed to IntentParser")
+    arg_parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint")
+    arg_parser.add_argument("--checkpoint-every", type=int, default=100,
+                            help="Input lines between checkpoints; 0 checkpoints only at the end")
+    arg_parser.add_argument("--progress-every", type=int, default=100)
+    arg_parser.add_argument("--deadline", type=float, default=REQUEST_DEADLINE_SECONDS,
+                            help="Latency budget per input in seconds; partial results are written when it runs out")
+    args = arg_parser.parse_args(argv)
+
+    from utils.intent_parser import IntentParser
+    parser = IntentParser(mode=args.mode) if args.mode else IntentParser()
+    asyncio.run(run_batch(
+        parser, args.input, args.output, field=args.field, id_field=args.id_field,
+        concurrency=args.concurrency, resume=args.resume, checkpoint_every=args.checkpoint_every,
+        progress_every=args.progress_every, deadline=args.deadline,
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import re
+
+# Correct common misspellings in one pass
+MISSPELLINGS = {
+    "tonite": "tonight",
+    "tmrw": "tomorrow",
+    "tommorow": "tomorrow",
+    "restraunt": "restaurant",
+    "itlian": "Italian",
+    "febuary": "february"
+}
+MISSPELLING_PATTERN = re.compile("|".join(map(re.escape, MISSPELLINGS)))
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = {
+    name: index for index, names in enumerate([
+        ("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"), ("may",), ("june", "jun"),
+        ("july", "jul"), ("august", "aug"), ("september", "sep", "sept"), ("october", "oct"),
+        ("november", "nov"), ("december", "dec"),
+    ], 1) for name in names
+}
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "couple of": 2, "a couple of": 2,
+}
+
+# Relative expressions with a fixed offset in days (None means a flag rather than a date)
+FIXED_OFFSETS = {
+    "today": 0,
+    "tonight": 0,
+    "tomorrow": 1,
+    "day after tomorrow": 2,
+    "the day after tomorrow": 2,
+    "a week from now": 7,
+}
+FLAGS = {
+    "next week": "ambiguous_next_week",  # Flag for follow-up
+    "yesterday": "invalid_past_date",  # Flag for follow-up
+}
+
+NEXT_WEEKDAY_PATTERN = re.compile(r"next (" + "|".join(WEEKDAYS) + r")")
+THIS_WEEKDAY_PATTERN = re.compile(r"(?:this |on |this coming |coming )?(" + "|".join(WEEKDAYS) + r")")
+WEEKEND_PATTERN = re.compile(r"(this |next |the |on the |this coming )?weekend")
+IN_PATTERN = re.compile(r"in (\d+|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True)) + r") (days?|weeks?)")
+ORDINAL_PATTERN = re.compile(r"(\d+)(st|nd|rd|th)")
+# Shapes of explicit dates, checked before any parsing is attempted
+YMD_PATTERN = re.compile(r"(\d{4})([-/])(\d{1,2})\2(\d{1,2})")
+DMY_PATTERN = re.compile(r"(\d{1,2})([-/])(\d{1,2})\2(\d{4})")
+MONTH_FIRST_PATTERN = re.compile(r"([a-z]+)\.?\s+(\d{1,2}),?\s+(\d{4})")
+DAY_FIRST_PATTERN = re.compile(r"(\d{1,2})\s+([a-z]+)\.?,?\s+(\d{4})")
+
+
+def _days_until(today: date, weekday: int, include_today: bool) -> date:
+    days_ahead = (weekday - today.weekday()) % 7
+    if days_ahead == 0 and not include_today:
+        days_ahead = 7
+    return today + timedelta(days=days_ahead)
+
+
+def _explicit_date(date_str: str):
+    """Parse an explicit calendar date by its shape; None if it has none of the supported shapes."""
+    match = YMD_PATTERN.fullmatch(date_str)
+    if match:
+        candidates = [(match.group(1), match.group(3), match.group(4))]
+    else:
+        match = DMY_PATTERN.fullmatch(date_str)
+        if match:
+            # Day-first wins when both readings are valid, as in 23-02-2025 vs 02-23-2025
+            candidates = [(match.group(4), match.group(3), match.group(1)), (match.group(4), match.group(1), match.group(3))]
+        else:
+            match = MONTH_FIRST_PATTERN.fullmatch(date_str)
+            if match and match.group(1) in MONTHS:
+                candidates = [(match.group(3), MONTHS[match.group(1)], match.group(2))]
+            else:
+                match = DAY_FIRST_PATTERN.fullmatch(date_str)
+                if not match or match.group(2) not in MONTHS:
+                    return None
+                candidates = [(match.group(3), MONTHS[match.group(2)], match.group(1))]
+    for year, month, day in candidates:
+        try:
+            return date(int(year), int(month), int(day))
+        except ValueError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _normalize_date(date_str: str, today: date) -> str:
+    date_str = MISSPELLING_PATTERN.sub(lambda m: MISSPELLINGS[m.group(0)], date_str.lower().strip())
+
+    # Resolve relative dates
+    if date_str in FIXED_OFFSETS:
+        return (today + timedelta(days=FIXED_OFFSETS[date_str])).strftime("%Y-%m-%d")
+    if date_str in FLAGS:
+        return FLAGS[date_str]
+    if date_str and not date_str[0].isdigit():
+        match = NEXT_WEEKDAY_PATTERN.search(date_str)
+        if match:
+            # Handle "next Monday", "next Tuesday", etc.: the next occurrence after today
+            return _days_until(today, WEEKDAYS.index(match.group(1)), include_today=False).strftime("%Y-%m-%d")
+        match = THIS_WEEKDAY_PATTERN.fullmatch(date_str)
+        if match:
+            return _days_until(today, WEEKDAYS.index(match.group(1)), include_today=True).strftime("%Y-%m-%d")
+        match = WEEKEND_PATTERN.fullmatch(date_str)
+        if match:
+            # The coming Saturday, or today if the weekend has started; "next weekend" is always a future one
+            next_weekend = (match.group(1) or "").strip() == "next"
+            if today.weekday() >= 5 and not next_weekend:
+                return today.strftime("%Y-%m-%d")
+            return _days_until(today, 5, include_today=False).strftime("%Y-%m-%d")
+        match = IN_PATTERN.fullmatch(date_str)
+        if match:
+            amount = match.group(1)
+            amount = int(amount) if amount.isdigit() else NUMBER_WORDS[amount]
+            days = amount * 7 if match.group(2).startswith("week") else amount
+            return (today + timedelta(days=days)).strftime("%Y-%m-%d")
+
+    # Validate specific dates
+    parsed_date = _explicit_date(ORDINAL_PATTERN.sub(r"\1", date_str))  # Remove ordinal indicators
+    if parsed_date is None:
+        return "invalid_date"  # Flag for follow-up if no format matches
+    if parsed_date < today:
+        return "invalid_past_date"
+    return parsed_date.strftime("%Y-%m-%d")
+
+
+def normalize_date(date_str: str, current_date: datetime) -> str:
+    """Normalize date strings, validate feasibility, and handle non-English terms.
+
+    Results are memoized per (string, day), so repeated dates cost a dictionary lookup.
+    """
+    return _normalize_date(date_str, current_date.date())
@@ -0,0 +1,164 @@
+import re
+import threading
+from typing import Dict, List, Optional
+
+# Keyword gazetteers; an input must match exactly one category to take the fast path
+CATEGORY_PATTERNS = {
+    "cab_booking": re.compile(r"\b(cab|cabs|taxi|taxis|uber|ola|ride)\b"),
+    "travel": re.compile(r"\b(flight|flights|fly|train|trains|bus ticket|trip|travel|vacation|holiday)\b"),
+    "dining": re.compile(r"\b(restaurant|restaurants|table|dinner|lunch|breakfast|brunch|dine|dining|meal)\b"),
+    "gifting": re.compile(r"\b(gift|gifts|present)\b"),
+}
+
+# Signals that the LLM should decide: possible multiple intents, negation, or "other" topics
+AMBIGUITY_PATTERN = re.compile(
+    r"[;,&+]|\b(and|also|then|plus|but|or|not|don't|dont|cancel|instead|hotel|hostel|accommodation|stay|"
+    r"aadhar|passport|visa|dress|clothes|update|cheap|luxury)\b"
+)
+SUGGESTION_PATTERN = re.compile(r"\b(suggest|recommend)\b")
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+}
+_NUMBER = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+PARTY_SIZE_PATTERNS = [
+    re.compile(r"\b(?:table|reservation|booking|seats?|tickets?) for " + _NUMBER + r"\b"),
+    re.compile(r"\bfor " + _NUMBER + r" (?:people|persons|guests|adults|of us|pax)\b"),
+    re.compile(r"\bparty of " + _NUMBER + r"\b"),
+]
+TIME_PATTERN = re.compile(r"\b(?:at )?(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b|\b(noon|midnight)\b")
+# The relative dates normalize_date understands, including its misspelling corrections
+_WEEKDAY = r"(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
+DATE_PATTERN = re.compile(
+    r"\b((?:the )?day after tomorrow|today|tonight|tonite|tomorrow|tmrw|tommorow|yesterday|a week from now|"
+    r"next week|(?:this |next )?weekend|in (?:\d+|a|an|one|two|three|four|five|six|seven) (?:days?|weeks?)|"
+    r"(?:next|this) " + _WEEKDAY + r")\b"
+)
+BUDGET_PATTERN = re.compile(r"(?:\bunder|\bbelow|\baround|\bbudget(?: of)?|\bwithin)?\s*([$₹€£])\s?(\d[\d,]*)|\b(\d[\d,]*)\s?(rupees|rs|dollars|usd|inr)\b")
+CUISINE_PATTERN = re.compile(
+    r"\b(italian|chinese|indian|mexican|thai|japanese|korean|french|continental|mediterranean|"
+    r"south indian|north indian|sushi|pizza)\b"
+)
+DIETARY_PATTERN = re.compile(r"\b(gluten[- ]free|vegan|vegetarian|veg|non[- ]veg|halal|kosher|jain)\b")
+OCCASION_PATTERN = re.compile(
+    r"\b(birthday|anniversary|wedding|graduation|christmas|diwali|valentine'?s(?: day)?|farewell|housewarming|baby shower)\b"
+)
+RECIPIENT_PATTERN = re.compile(r"\bfor (?:my |our )?(wife|husband|mom|mother|dad|father|friend|sister|brother|"
+                               r"son|daughter|boss|colleague|girlfriend|boyfriend|partner|teacher|grandma|grandpa)(?:'s)?\b")
+_PLACE_STOP = r"(?=\s+(?:from|to|at|on|in|for|by|today|tonight|tomorrow|day|next|this|weekend)\b|[.!?]|$)"
+DESTINATION_PATTERN = re.compile(r"\bto (?:the )?([a-z][\w .'-]*?)" + _PLACE_STOP)
+PICKUP_PATTERN = re.compile(r"\bfrom (?:the )?([a-z][\w .'-]*?)" + _PLACE_STOP)
+LOCATION_PATTERN = re.compile(r"\b(?:in|near) (?:the )?([a-z][\w .'-]*?)" + _PLACE_STOP)
+
+
+def _number(value: str) -> int:
+    return int(value) if value.isdigit() else NUMBER_WORDS[value]
+
+
+def extract_local_entities(text: str, category: str) -> Dict:
+    """Extract the entities the rules can read reliably from lower-cased `text`."""
+    entities = {}
+    for pattern in PARTY_SIZE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            entities["party_size"] = _number(match.group(1))
+            break
+    match = TIME_PATTERN.search(text)
+    if match:
+        if match.group(4):
+            entities["time"] = "12:00" if match.group(4) == "noon" else "00:00"
+        else:
+            hour = int(match.group(1)) % 12 + (12 if match.group(3) == "pm" else 0)
+            entities["time"] = f"{hour:02d}:{match.group(2) or '00'}"
+    match = DATE_PATTERN.search(text)
+    if match:
+        entities["date"] = match.group(1)  # Resolved by normalize_date during validation
+    match = BUDGET_PATTERN.search(text)
+    if match:
+        entities["budget"] = f"{match.group(1)}{match.group(2)}" if match.group(1) else f"{match.group(3)} {match.group(4)}"
+
+    if category == "dining":
+        match = CUISINE_PATTERN.search(text)
+        if match:
+            entities["cuisine"] = match.group(1)
+        match = DIETARY_PATTERN.search(text)
+        if match:
+            entities["dietary"] = match.group(1)
+        match = LOCATION_PATTERN.search(text)
+        if match:
+            entities["location"] = match.group(1).strip()
+    elif category in ("travel", "cab_booking"):
+        match = DESTINATION_PATTERN.search(text)
+        if match:
+            entities["destination"] = match.group(1).strip()
+        match = PICKUP_PATTERN.search(text)
+        if match:
+            key = "pickup_location" if category == "cab_booking" else "location"
+            entities[key] = match.group(1).strip()
+    elif category == "gifting":
+        match = OCCASION_PATTERN.search(text)
+        if match:
+            entities["occasion"] = match.group(1)
+        match = RECIPIENT_PATTERN.search(text)
+        if match:
+            entities["recipient"] = match.group(1)
+    return entities
+
+
+class FastPathClassifier:
+    """Answers short, unambiguous inputs from keyword rules so the graph can skip the LLM nodes.
+
+    classify() returns intents in the same shape as the LLM path, or None to fall through to it.
+    """
+
+    def __init__(self, max_words: int = 12, confidence: float = 0.9):
+        self.max_words = max_words
+        self.confidence = confidence
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.hits = 0
+
+    def _match(self, text: str) -> Optional[str]:
+        if len(text.split()) > self.max_words or AMBIGUITY_PATTERN.search(text):
+            return None
+        categories = [category for category, pattern in CATEGORY_PATTERNS.items() if pattern.search(text)]
+        if len(categories) != 1:
+            return None
+        if SUGGESTION_PATTERN.search(text) and categories[0] != "gifting":
+            return None  # Suggestions are "other" unless they are about a gift
+        return categories[0]
+
+    def classify(self, user_input: str) -> Optional[List[Dict]]:
+        if not isinstance(user_input, str):
+            return None
+        text = " ".join(user_input.lower().split())
+        category = self._match(text)
+        with self._lock:
+            self.attempts += 1
+            if category is not None:
+                self.hits += 1
+        if category is None:
+            return None
+        return [{
+            "category": category,
+            "confidence": self.confidence,
+            "conflict": "",
+            "key_entities": extract_local_entities(text, category),
+            "contradictions": [],
+            "validation_errors": [],
+            "follow_up_questions": [],
+        }]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.attempts if self.attempts else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.attempts = 0
+            self.hits = 0
@@ -0,0 +1,325 @@
+"""Follow-up questions as a declarative table, compiled once into a per-category dispatcher.
+
+Each category maps to an ordered list of rules. A rule asks its question when all of its conditions hold:
+    missing: entity or [entities]       none of them has a value
+    present: entity or [entities]       all of them have a value
+    equals: {entity: value}             the entity equals the value
+    one_of: {entity: [values]}          the entity is one of the values
+    lower_in: {entity: [values]}        the entity, lower-cased, is one of the values
+    not_in: {entity: [values]}          the entity is not one of the values
+    same: [entity, entity]              both entities are equal
+    any: [conditions]                   at least one of the nested condition dicts holds
+A rule without conditions always asks. {"first": [rules]} asks only the first matching rule, like an
+if/elif chain. {"topic": true} asks the rules of the category's first matching topic (checked in table
+order against the "topic" entity); otherwise the questions the fused call suggested, the LLM-written
+ones, or a generic question. Questions are format strings over the entities, plus "<entity>_lower".
+A rule's "entity" names the entity its question asks for, so an answer can be matched to it; it defaults
+to the entity in "missing", else the one in equals/one_of/lower_in, and is null for open questions.
+
+FOLLOW_UP_RULES_PATH can point to a JSON file in the same format, so new categories need no code
+changes: its categories add to or replace the built-in ones, and its topics are checked before them.
+"""
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+
+from services.cache import ResponseCache, make_cache_key
+from utils.similarity_cache import canonicalize
+from utils.term_matcher import TermMatcher
+
+GENERIC_QUESTION = "Could you provide more details about your request?"
+RELATIVE_DATES = ["today", "tonight", "tomorrow", "a week from now"]
+
+FOLLOW_UP_RULES = {
+    # Validation errors containing any of the substrings, and the question each one asks
+    "validation_errors": [
+        {"contains": ["Party size"], "entity": "party_size",
+         "ask": "Could you confirm the party size? It seems unusually large."},
+        {"contains": ["Invalid date", "past date"], "entity": "date",
+         "ask": "Could you specify a valid future date for your request?"},
+        {"contains": ["Invalid location"], "entity": "location", "ask": "Could you specify a real location or destination?"},
+        {"contains": ["Invalid destination"], "entity": "destination",
+         "ask": "Could you specify a real location or destination?"},
+        {"contains": ["Invalid pickup_location"], "entity": "pickup_location",
+         "ask": "Could you specify a real location or destination?"},
+    ],
+    "categories": {
+        "dining": [
+            {"missing": "party_size", "ask": "How many people are dining?"},
+            {"missing": "location", "ask": "Could you specify the city or location for the restaurant?"},
+            {"missing": "cuisine", "ask": "Do you have a preferred cuisine type?"},
+            {"missing": "budget", "ask": "What is your budget for the meal?"},
+            {"first": [
+                {"missing": "date", "ask": "What date would you like to make the reservation for?"},
+                {"equals": {"date": "ambiguous_next_week"}, "ask": "Which day next week would you like to dine?"},
+                {"present": "date", "missing": "time", "ask": "What time would you like to dine?"},
+            ]},
+            {"one_of": {"date": RELATIVE_DATES}, "ask": "Could you confirm the specific date and time for your reservation?"},
+        ],
+        "travel": [
+            {"first": [
+                {"missing": "destination", "ask": "Where are you planning to travel?"},
+                {"lower_in": {"destination": ["airport", "station"]}, "ask": "Which {destination_lower} are you referring to?"},
+            ]},
+            {"missing": "party_size", "ask": "How many people are traveling?"},
+            {"missing": "budget", "ask": "What is your budget for the trip?"},
+            {"first": [
+                {"missing": "date", "ask": "When are you planning to travel?"},
+                {"equals": {"date": "ambiguous_next_week"}, "ask": "Which day next week would you like to travel?"},
+                {"present": "date", "missing": "time", "ask": "What time would you like to travel?"},
+            ]},
+            {"one_of": {"date": RELATIVE_DATES}, "ask": "Could you confirm the specific date and time for your travel?"},
+        ],
+        "cab_booking": [
+            {"first": [
+                {"missing": "pickup_location", "lower_in": {"destination": ["airport"]},
+                 "ask": "Which airport are you departing from?"},
+                {"missing": "pickup_location", "ask": "What is your pickup location?"},
+                {"any": [{"lower_in": {"pickup_location": ["airport"]}}, {"same": ["pickup_location", "destination"]}],
+                 "entity": "pickup_location", "ask": "Which airport or location are you departing from?"},
+            ]},
+            {"first": [
+                {"missing": "destination", "ask": "What is your destination?"},
+                {"any": [{"lower_in": {"destination": ["airport"]}}, {"same": ["pickup_location", "destination"]}],
+                 "entity": "destination", "ask": "Which airport or location are you going to?"},
+            ]},
+            {"first": [
+                {"missing": "time", "ask": "When do you need the cab?"},
+                {"present": "date", "missing": "time", "ask": "What time do you need the cab?"},
+            ]},
+            {"one_of": {"date": RELATIVE_DATES}, "ask": "Could you confirm the specific date and time for your cab?"},
+            {"missing": "budget", "ask": "Do you have a preferred cab type or budget?"},
+        ],
+        "gifting": [
+            {"missing": "budget", "ask": "What is your budget for the gift?"},
+            {"missing": "occasion", "ask": "What is the occasion for the gift?"},
+            {"first": [
+                {"present": "recipient", "not_in": {"recipient": ["unknown"]},
+                 "ask": "What are some interests or preferences of your {recipient}?"},
+                {"missing": "recipient", "ask": "Who is the gift for (e.g., friend, family, colleague)?"},
+            ]},
+        ],
+        "other": [
+            {"topic": True},
+            {"missing": "location", "ask": "Do you need information for a specific region or state?"},
+        ],
+    },
+    # Per category: topics by keyword (substring of the "topic" entity), the first listed match wins
+    "topics": {
+        "other": [
+            {"keywords": ["hotel", "accommodation"], "rules": [
+                {"missing": "destination", "ask": "Where are you planning to book a hotel?"},
+                {"missing": "party_size", "ask": "How many people will be staying?"},
+                {"missing": "budget", "ask": "What is your budget for the hotel?"},
+                {"first": [
+                    {"missing": "date", "ask": "When are you planning to check in?"},
+                    {"equals": {"date": "ambiguous_next_week"}, "ask": "Which day next week would you like to check in?"},
+                    {"present": "date", "missing": "time", "ask": "What time will you check in?"},
+                ]},
+                {"one_of": {"date": RELATIVE_DATES}, "ask": "Could you confirm the specific check-in date and time?"},
+            ]},
+            {"keywords": ["aadhar"], "rules": [
+                {"ask": "Do you have your Aadhar number ready?"},
+                {"ask": "Are you updating your address online or at a physical center?"},
+            ]},
+            {"keywords": ["book", "reading"], "rules": [
+                {"ask": "What type of book are you looking for (e.g., genre, fiction/non-fiction)?"},
+                {"ask": "Are you looking for physical books or e-books?"},
+                {"missing": "budget", "ask": "What is your budget for the book?"},
+            ]},
+            {"keywords": ["dress", "clothing"], "rules": [
+                {"ask": "What's the occasion for the dress (e.g., casual, formal)?"},
+                {"ask": "Do you have a preferred style or color?"},
+                {"missing": "budget", "ask": "What is your budget for the dress?"},
+            ]},
+        ],
+    },
+}
+
+
+def _names(value) -> List[str]:
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _lower(value) -> Optional[str]:
+    return str(value).lower() if value else None
+
+
+def _compile_condition(spec: Dict) -> Callable[[Dict], bool]:
+    """One predicate over the entities for all the conditions in `spec`."""
+    checks = []
+    if "missing" in spec:
+        checks.append(lambda e, names=_names(spec["missing"]): not any(e.get(name) for name in names))
+    if "present" in spec:
+        checks.append(lambda e, names=_names(spec["present"]): all(e.get(name) for name in names))
+    for name, value in spec.get("equals", {}).items():
+        checks.append(lambda e, name=name, value=value: e.get(name) == value)
+    for name, values in spec.get("one_of", {}).items():
+        checks.append(lambda e, name=name, values=frozenset(values): e.get(name) in values)
+    for name, values in spec.get("lower_in", {}).items():
+        checks.append(lambda e, name=name, values=frozenset(values): _lower(e.get(name)) in values)
+    for name, values in spec.get("not_in", {}).items():
+        checks.append(lambda e, name=name, values=frozenset(values): e.get(name) not in values)
+    if "same" in spec:
+        first, second = spec["same"]
+        checks.append(lambda e: e.get(first) == e.get(second))
+    if "any" in spec:
+        alternatives = [_compile_condition(alternative) for alternative in spec["any"]]
+        checks.append(lambda e: any(check(e) for check in alternatives))
+    if len(checks) == 1:
+        return checks[0]
+    return lambda e: all(check(e) for check in checks)
+
+
+class _FormatFields(dict):
+    """Entities for str.format_map, with "<entity>_lower" for lower-cased values."""
+
+    def __missing__(self, key):
+        if key.endswith("_lower"):
+            return str(self.get(key[:-len("_lower")], "")).lower()
+        return ""
+
+
+def _target_entity(spec: Dict) -> Optional[str]:
+    if "entity" in spec:
+        return spec["entity"]
+    if "missing" in spec and len(_names(spec["missing"])) == 1:
+        return _names(spec["missing"])[0]
+    for condition in ("equals", "one_of", "lower_in"):
+        if spec.get(condition):
+            return next(iter(spec[condition]))
+    return None
+
+
+class _Rule:
+    __slots__ = ("condition", "question", "entity", "first", "topic")
+
+    def __init__(self, spec: Dict):
+        self.condition = _compile_condition(spec)
+        self.question = spec.get("ask")
+        self.entity = _target_entity(spec)
+        self.first = [_Rule(rule) for rule in spec["first"]] if "first" in spec else None
+        self.topic = bool(spec.get("topic"))
+
+
+class FollowUpRules:
+    """Compiled FOLLOW_UP_RULES: rules indexed by category and a keyword automaton per category's topics."""
+
+    def __init__(self, table: Dict = FOLLOW_UP_RULES):
+        self.validation_errors = [(list(spec["contains"]), spec["ask"], spec.get("entity"))
+                                  for spec in table.get("validation_errors", [])]
+        self.categories = {category: [_Rule(spec) for spec in rules] for category, rules in table.get("categories", {}).items()}
+        self.topics = {}
+        for category, topics in table.get("topics", {}).items():
+            rules = [[_Rule(spec) for spec in topic["rules"]] for topic in topics]
+            # Keyword -> position of its topic; when several match, the topic listed first wins
+            keyword_topics = {}
+            for position, topic in enumerate(topics):
+                for keyword in topic["keywords"]:
+                    keyword_topics.setdefault(keyword.lower(), position)
+            matcher = TermMatcher(list(keyword_topics), word_boundaries=False)
+            self.topics[category] = (matcher, keyword_topics, rules)
+
+    @classmethod
+    def load(cls, path: str = None) -> "FollowUpRules":
+        """The built-in table, with the categories, topics and validation questions in `path` (JSON) merged in."""
+        if not path:
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            extra = json.load(f)
+        table = {
+            "validation_errors": FOLLOW_UP_RULES["validation_errors"] + extra.get("validation_errors", []),
+            "categories": {**FOLLOW_UP_RULES["categories"], **extra.get("categories", {})},
+            "topics": {
+                category: extra.get("topics", {}).get(category, []) + FOLLOW_UP_RULES["topics"].get(category, [])
+                for category in {**FOLLOW_UP_RULES["topics"], **extra.get("topics", {})}
+            },
+        }
+        return cls(table)
+
+    def _topic_rules(self, category: str, topic: str) -> Optional[List[_Rule]]:
+        if category not in self.topics or not topic:
+            return None
+        matcher, keyword_topics, rules = self.topics[category]
+        positions = [keyword_topics[term] for _, _, term in matcher.find_all(topic)]
+        return rules[min(positions)] if positions else None
+
+    def _has_topic_rule(self, category: str) -> bool:
+        return any(rule.topic for rule in self.categories.get(category, ()))
+
+    def needs_dynamic(self, intent: Dict) -> bool:
+        """Whether an intent's topic questions have to come from the LLM: no topic in the table matches."""
+        if intent.get("suggested_follow_ups") or not self._has_topic_rule(intent["category"]):
+            return False
+        topic = str(intent["key_entities"].get("topic") or "").lower()
+        return self._topic_rules(intent["category"], topic) is None
+
+    def _ask(self, rules: List[_Rule], intent: Dict, entities: Dict, fields: _FormatFields, dynamic_questions,
+             follow_ups: List[Tuple[str, Optional[str]]]):
+        for rule in rules:
+            if rule.topic:
+                topic_rules = self._topic_rules(intent["category"], str(entities.get("topic") or "").lower())
+                if topic_rules is not None:
+                    self._ask(topic_rules, intent, entities, fields, dynamic_questions, follow_ups)
+                elif intent.get("suggested_follow_ups"):
+                    # Questions already generated by the fused classify + extract call
+                    follow_ups.extend((question, None) for question in intent["suggested_follow_ups"][:3])
+                else:
+                    # Dynamic questions are generated by the LLM before the rules are applied
+                    follow_ups.extend((question, None) for question in dynamic_questions or [GENERIC_QUESTION])
+            elif rule.first is not None:
+                for option in rule.first:
+                    if option.condition(entities):
+                        follow_ups.append((option.question.format_map(fields), option.entity))
+                        break
+            elif rule.condition(entities):
+                follow_ups.append((rule.question.format_map(fields), rule.entity))
+
+    def asked(self, intent: Dict, dynamic_questions: List[str] = None) -> List[Tuple[str, Optional[str]]]:
+        """The questions of `questions`, each with the entity it asks for (None for open questions)."""
+        entities = intent["key_entities"]
+        follow_ups = []
+        contradictions = intent.get("contradictions", [])
+        if contradictions:
+            follow_ups.append((f"Could you clarify your request regarding {', '.join(contradictions)}?", None))
+        if intent.get("conflict"):
+            follow_ups.append((f"Could you clarify your request? {intent['conflict']}", None))
+        for error in intent.get("validation_errors", []):
+            for substrings, question, entity in self.validation_errors:
+                if any(substring in error for substring in substrings):
+                    follow_ups.append((question, entity))
+                    break
+        rules = self.categories.get(intent["category"])
+        if rules:
+            self._ask(rules, intent, entities, _FormatFields(entities), dynamic_questions, follow_ups)
+        return follow_ups
+
+    def questions(self, intent: Dict, dynamic_questions: List[str] = None) -> List[str]:
+        """Follow-up questions for one intent from its entities, validation results and conflicts."""
+        return [question for question, _ in self.asked(intent, dynamic_questions)]
+
+
+class TopicQuestionCache:
+    """LLM-written follow-up questions by topic, so a recurring topic costs one LLM call rather than one per request."""
+
+    def __init__(self, max_size: int = 4096, ttl: float = 30 * 24 * 60 * 60, path: str = None):
+        self.cache = ResponseCache(max_size=max_size, ttl=ttl, path=path)
+
+    @staticmethod
+    def _key(topic: str) -> Optional[str]:
+        canonical = canonicalize(topic or "")[0]
+        return make_cache_key("follow_up_questions", canonical) if canonical and canonical != "unknown" else None
+
+    def get(self, topic: str) -> Optional[List[str]]:
+        key = self._key(topic)
+        return self.cache.get(key) if key is not None else None
+
+    def set(self, topic: str, questions: List[str]):
+        key = self._key(topic)
+        if key is not None and questions:
+            self.cache.set(key, list(questions))
+
+    def stats(self) -> Dict:
+        return self.cache.stats()
+
+    def clear(self):
+        self.cache.clear()
@@ -0,0 +1,175 @@
+"""Local naive Bayes intent classifier that can stand in for the parse_intent LLM call.
+
+Train from logged (input, LLM-labelled intents) pairs, one JSON object per line, holding
+"user_input" plus either "intents" ([{"category": ...}]) or "result" (process_input output):
+    python -m utils.intent_classifier train labelled.jsonl models/intent_classifier.json
+"""
+import argparse
+import gzip
+import json
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+# Inputs that may hold several intents are left to the LLM, which can split them
+MULTI_INTENT_PATTERN = re.compile(r"[;&+]|\b(and|also|then|plus|as well as)\b")
+MODEL_VERSION = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Unigrams plus bigrams of the lower-cased input."""
+    words = TOKEN_PATTERN.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _open(path: str, mode: str):
+    return gzip.open(path, mode + "t", encoding="utf-8") if path.endswith(".gz") else open(path, mode, encoding="utf-8")
+
+
+class IntentClassifier:
+    """Multinomial naive Bayes over unigram and bigram counts with Laplace smoothing."""
+
+    def __init__(self, class_counts: Dict[str, int], token_counts: Dict[str, Dict[str, int]], alpha: float = 1.0):
+        self.classes = sorted(class_counts)
+        self.class_counts = class_counts
+        self.token_counts = token_counts
+        self.alpha = alpha
+        vocabulary = set()
+        for counts in token_counts.values():
+            vocabulary.update(counts)
+        vocab_size = max(1, len(vocabulary))
+        total_docs = sum(class_counts.values())
+        # Precompute log-probabilities so prediction is a handful of dict lookups
+        self._log_prior = {c: math.log(class_counts[c] / total_docs) for c in self.classes}
+        self._log_likelihood = {}
+        self._log_unseen = {}
+        for c in self.classes:
+            total = sum(token_counts.get(c, {}).values()) + alpha * vocab_size
+            self._log_likelihood[c] = {t: math.log((n + alpha) / total) for t, n in token_counts.get(c, {}).items()}
+            self._log_unseen[c] = math.log(alpha / total)
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.hits = 0
+
+    @classmethod
+    def train(cls, examples: Iterable[Tuple[str, str]], min_count: int = 1, alpha: float = 1.0) -> "IntentClassifier":
+        """Fit on (input, category) pairs, dropping tokens seen fewer than `min_count` times overall."""
+        class_counts = Counter()
+        token_counts = defaultdict(Counter)
+        totals = Counter()
+        for text, category in examples:
+            class_counts[category] += 1
+            tokens = tokenize(text)
+            token_counts[category].update(tokens)
+            totals.update(tokens)
+        pruned = {
+            c: {t: n for t, n in counts.items() if totals[t] >= min_count}
+            for c, counts in token_counts.items()
+        }
+        return cls(dict(class_counts), pruned, alpha=alpha)
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        tokens = tokenize(text)
+        scores = {}
+        for c in self.classes:
+            likelihood = self._log_likelihood[c]
+            unseen = self._log_unseen[c]
+            scores[c] = self._log_prior[c] + sum(likelihood.get(t, unseen) for t in tokens)
+        top = max(scores.values())
+        exp = {c: math.exp(s - top) for c, s in scores.items()}
+        norm = sum(exp.values())
+        return {c: v / norm for c, v in exp.items()}
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        proba = self.predict_proba(text)
+        category = max(proba, key=proba.get)
+        return category, proba[category]
+
+    def classify(self, user_input: str, threshold: float) -> Optional[List[Dict]]:
+        """Intents in the parse_intent shape when the model is confident, otherwise None."""
+        category = None
+        confidence = 0.0
+        if isinstance(user_input, str) and not MULTI_INTENT_PATTERN.search(user_input.lower()):
+            category, confidence = self.predict(user_input)
+        confident = category is not None and confidence >= threshold
+        with self._lock:
+            self.attempts += 1
+            if confident:
+                self.hits += 1
+        if not confident:
+            return None
+        return [{"category": category, "confidence": round(confidence, 2), "conflict": "", "follow_up_questions": []}]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.attempts if self.attempts else 0.0,
+            }
+
+    def save(self, path: str):
+        with _open(path, "w") as f:
+            json.dump({
+                "version": MODEL_VERSION,
+                "alpha": self.alpha,
+                "class_counts": self.class_counts,
+                "token_counts": self.token_counts,
+            }, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with _open(path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != MODEL_VERSION:
+            raise ValueError(f"Unsupported intent classifier version: {data.get('version')}")
+        return cls(data["class_counts"], data["token_counts"], alpha=data["alpha"])
+
+
+def load_examples(path: str) -> List[Tuple[str, str]]:
+    """Read single-intent (input, category) pairs from a labelled JSONL log."""
+    examples = []
+    with _open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = record.get("user_input")
+            if "intents" in record:
+                categories = [intent.get("category") for intent in record["intents"]]
+            else:
+                categories = [intent.get("intent_category") for intent in record.get("result") or []]
+            # Multi-intent inputs are always sent to the LLM, so only single-intent ones are useful here
+            if isinstance(text, str) and len(categories) == 1 and categories[0]:
+                examples.append((text, categories[0]))
+    return examples
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Train the local intent classifier.")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    train = commands.add_parser("train", help="Train from a labelled JSONL log")
+    train.add_argument("input", help="Labelled JSONL log")
+    train.add_argument("output", help="Model file to write (.json or .json.gz)")
+    train.add_argument("--min-count", type=int, default=2, help="Drop tokens seen fewer times than this")
+    train.add_argument("--alpha", type=float, default=1.0, help="Laplace smoothing")
+    args = arg_parser.parse_args(argv)
+
+    examples = load_examples(args.input)
+    if not examples:
+        raise SystemExit(f"No single-intent examples found in {args.input}")
+    model = IntentClassifier.train(examples, min_count=args.min_count, alpha=args.alpha)
+    model.save(args.output)
+    correct = sum(model.predict(text)[0] == category for text, category in examples)
+    print(json.dumps({
+        "examples": len(examples),
+        "classes": model.class_counts,
+        "training_accuracy": round(correct / len(examples), 4),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,129 +1,292 @@
-from langgraph.graph import StateGraph, END
-from typing import TypedDict, Dict, List
+from typing import Any, TypedDict, Dict, List, Iterable, Iterator, AsyncIterator, Optional
 from services.llm_service import LLMService
 from services.search_service import SearchService
-from datetime import datetime, timedelta
-import re
-import json
+from services.model_tiers import TieredLLMService
+from config.settings import (
+    CONCURRENT_ENTITY_EXTRACTION, ENTITY_EXTRACTION_MAX_WORKERS, PIPELINE_MODE, BATCH_CONCURRENCY,
+    FAST_PATH_ENABLED, FAST_PATH_MAX_WORDS, INTENT_CLASSIFIER_PATH, INTENT_CLASSIFIER_THRESHOLD,
+    OFFENSIVE_TERMS_PATHS, INVALID_LOCATIONS_PATHS, LLM_STREAMING, TRACING_ENABLED,
+    REQUEST_COALESCING, REQUEST_DEADLINE_SECONDS, SIMILARITY_CACHE_ENABLED, SIMILARITY_CACHE_THRESHOLD,
+    SIMILARITY_CACHE_MAX_SIZE, SIMILARITY_CACHE_TTL_SECONDS, LLM_MODEL_TIERS, LLM_NODE_TIERS, LLM_ESCALATION_CONFIDENCE,
+    FOLLOW_UP_RULES_PATH, FOLLOW_UP_CACHE_ENABLED, FOLLOW_UP_CACHE_MAX_SIZE, FOLLOW_UP_CACHE_TTL_SECONDS,
+    FOLLOW_UP_CACHE_PATH,
+)
+from utils.fast_path import FastPathClassifier, DATE_PATTERN
+from utils.intent_classifier import IntentClassifier
+from utils.term_matcher import TermMatcher
+from utils.date_utils import normalize_date
+from utils.json_extract import extract_json, IncrementalJSONParser
+from utils.tracing import Tracer
+from utils.singleflight import SingleFlight, AsyncSingleFlight
+from utils.similarity_cache import SimilarityCache
+from utils.follow_up_rules import FollowUpRules, TopicQuestionCache
+from services.cache import make_cache_key
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from contextlib import nullcontext
+from datetime import datetime
+import asyncio
+import contextvars
+import copy
+import os
+import threading
+import time
+
+PIPELINE_MODES = ("multi_call", "fused")
+INTENT_CATEGORIES = ("dining", "travel", "gifting", "cab_booking", "other")
+
+# Graph nodes and the parser methods behind them: (sync, async)
+NODE_METHODS = {
+    "fast_path": ("_fast_path", "_afast_path"),
+    "fused_parse": ("_fused_parse", "_afused_parse"),
+    "parse_intent": ("_parse_intent", "_aparse_intent"),
+    "extract_entities": ("_extract_entities", "_aextract_entities"),
+    "generate_follow_ups": ("_generate_follow_ups", "_agenerate_follow_ups"),
+    "start_search": ("_start_search", "_astart_search"),
+    "handle_non_standard": ("_handle_non_standard", "_ahandle_non_standard"),
+}
 
 class State(TypedDict):
     user_input: str
     intents: List[Dict]  # List of intents with category, confidence, key_entities, follow_up_questions
     web_search_results: List[Dict]
-
-def normalize_date(date_str: str, current_date: datetime) -> str:
-    """Normalize date strings, validate feasibility, and handle non-English terms."""
-    date_str = date_str.lower().strip()
-    # Correct common misspellings
-    misspellings = {
-        "tonite": "tonight",
-        "tmrw": "tomorrow",
-        "tommorow": "tomorrow",
-        "restraunt": "restaurant",
-        "itlian": "Italian",
-        "febuary": "february"
-    }
-    for misspelled, correct in misspellings.items():
-        date_str = date_str.replace(misspelled, correct)
-
-    # Resolve relative dates
-    today = current_date.replace(hour=0, minute=0, second=0, microsecond=0)
-    if date_str in ["today", "tonight"]:
-        return today.strftime("%Y-%m-%d")
-    elif date_str == "tomorrow":
-        return (today + timedelta(days=1)).strftime("%Y-%m-%d")
-    elif date_str == "a week from now":
-        return (today + timedelta(days=7)).strftime("%Y-%m-%d")
-    elif date_str == "next week":
-        return "ambiguous_next_week"  # Flag for follow-up
-    elif date_str == "yesterday":
-        return "invalid_past_date"  # Flag for follow-up
-    elif "next" in date_str:
-        # Handle "next Monday", "next Tuesday", etc.
-        days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-        for day in days:
-            if f"next {day}" in date_str:
-                current_dow = today.weekday()
-                target_dow = days.index(day)
-                days_ahead = (target_dow - current_dow + 7) % 7 or 7
-                return (today + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
-    
-    # Validate specific dates
-    try:
-        # Clean up the date string
-        date_str = re.sub(r'(\d+)(st|nd|rd|th)', r'\1', date_str)  # Remove ordinal indicators
-        
-        # Try parsing common date formats
-        date_formats = [
-            "%B %d %Y",  # February 23 2025
-            "%d %B %Y",  # 23 February 2025
-            "%B %d, %Y",  # February 23, 2025
-            "%d %B, %Y",  # 23 February, 2025
-            "%Y-%m-%d",  # 2025-02-23
-            "%d-%m-%Y",  # 23-02-2025
-            "%m-%d-%Y",  # 02-23-2025
-            "%d/%m/%Y",  # 23/02/2025
-            "%m/%d/%Y",  # 02/23/2025
-            "%Y/%m/%d"   # 2025/02/23
-        ]
-        
-        for fmt in date_formats:
-            try:
-                parsed_date = datetime.strptime(date_str, fmt)
-                if parsed_date < today:
-                    return "invalid_past_date"
-                return parsed_date.strftime("%Y-%m-%d")
-            except ValueError:
-                continue
-                
-        return "invalid_date"  # Flag for follow-up if no format matches
-    except Exception:
-        return "invalid_date"  # Flag for follow-up if any other error occurs
+    prefetched_entities: Dict  # Intent index -> (category, pending extraction) started while parse_intent streamed
+    pending_search: Any  # Web search started right after classification; joined by handle_non_standard
+    deadline: Optional[float]  # time.monotonic() by which the request has to finish; None for no limit
+    current_date: datetime  # When the request started; relative dates are resolved against it
 
 class IntentParser:
-    def __init__(self):
-        self.llm_service = LLMService()
-        self.search_service = SearchService()
-        self.graph = self._build_graph()
-        self.current_date = datetime.now()  # Current date: May 22, 2025, 05:36 PM IST
+    def __init__(self, concurrent_extraction: bool = CONCURRENT_ENTITY_EXTRACTION,
+                 max_workers: int = ENTITY_EXTRACTION_MAX_WORKERS, mode: str = PIPELINE_MODE,
+                 fast_path: bool = FAST_PATH_ENABLED, classifier_path: str = INTENT_CLASSIFIER_PATH,
+                 classifier_threshold: float = INTENT_CLASSIFIER_THRESHOLD, streaming: bool = LLM_STREAMING,
+                 llm_service: LLMService = None, search_service: SearchService = None, tracer: Tracer = None,
+                 coalesce: bool = REQUEST_COALESCING, similarity_cache: bool = SIMILARITY_CACHE_ENABLED,
+                 node_tiers: Dict[str, int] = LLM_NODE_TIERS, follow_up_cache: bool = FOLLOW_UP_CACHE_ENABLED):
+        if mode not in PIPELINE_MODES:
+            raise ValueError(f"Unknown pipeline mode '{mode}', expected one of {PIPELINE_MODES}")
+        self.mode = mode
+        # Rule-based classifier that answers obvious inputs without calling the LLM
+        self.fast_path = FastPathClassifier(max_words=FAST_PATH_MAX_WORDS) if fast_path else None
+        # Trained local model consulted before the parse_intent LLM call; below the threshold the LLM decides
+        self.intent_classifier = IntentClassifier.load(classifier_path) \
+            if classifier_path and os.path.exists(classifier_path) else None
+        self.classifier_threshold = classifier_threshold
+        # Node, LLM and search timings; None (the default unless TRACING_ENABLED) skips every hook
+        self.tracer = tracer or (Tracer() if TRACING_ENABLED else None)
+        # Default services are created on first use, so inputs that never reach the LLM or a search never build them
+        self._llm_service = self._with_tracer(llm_service)
+        self._search_service = self._with_tracer(search_service)
+        self._services_lock = threading.Lock()
+        # With a TieredLLMService, the model tier each node's calls start on
+        self.node_tiers = dict(node_tiers or {})
+        # Stream the parse_intent response and start entity extraction as each intent object completes
+        self.streaming = streaming
+        # Per-intent entity extraction runs on a bounded pool; max_workers caps LLM calls in flight
+        self.concurrent_extraction = concurrent_extraction
+        self.max_workers = max(1, max_workers)
+        self._executor = None
+        self._search_executor = None
+        self._executor_lock = threading.Lock()  # The parser is shared by threads; each pool must be created once
+        # Identical concurrent inputs share one pipeline run
+        self._singleflight = SingleFlight() if coalesce else None
+        self._asingleflight = AsyncSingleFlight() if coalesce else None
+        # Results of recent inputs, reused for later inputs that only differ in wording
+        self.similarity_cache = SimilarityCache(
+            max_size=SIMILARITY_CACHE_MAX_SIZE, threshold=SIMILARITY_CACHE_THRESHOLD, ttl=SIMILARITY_CACHE_TTL_SECONDS,
+        ) if similarity_cache else None
+        # Follow-up rules are compiled once per process; LLM-written questions are cached by topic
+        self.follow_up_rules = follow_up_rules(FOLLOW_UP_RULES_PATH)
+        self.follow_up_cache_enabled = follow_up_cache
+        self._topic_questions = None
         # Define offensive keywords for filtering
         self.offensive_keywords = [
         ]#please include offensive words here.
         # Define impossible/fictional locations
         self.invalid_locations = [
         ]#please add invalid locations here, like Moon, Mars, Narnia, etc
+        # Both lists, plus any term files from settings, are compiled into one automaton each
+        self.offensive_matcher = TermMatcher(self.offensive_keywords, paths=OFFENSIVE_TERMS_PATHS)
+        self.invalid_location_matcher = TermMatcher(self.invalid_locations, paths=INVALID_LOCATIONS_PATHS)
 
-    def _build_graph(self):
-        graph = StateGraph(State)
-        graph.add_node("parse_intent", self._parse_intent)
-        graph.add_node("extract_entities", self._extract_entities)
-        graph.add_node("generate_follow_ups", self._generate_follow_ups)
-        graph.add_node("handle_non_standard", self._handle_non_standard)
-        graph.add_edge("parse_intent", "extract_entities")
-        graph.add_edge("extract_entities", "generate_follow_ups")
-        graph.add_conditional_edges(
-            "generate_follow_ups",
-            lambda state: "handle_non_standard" if any(intent["category"] == "other" for intent in state["intents"]) else END,
-            {"handle_non_standard": "handle_non_standard", END: END}
-        )
-        graph.set_entry_point("parse_intent")
-        return graph.compile()
+    def _with_tracer(self, service):
+        if service is not None and getattr(service, "tracer", None) is None and self.tracer is not None:
+            service.tracer = self.tracer
+        return service
+
+    @property
+    def llm_service(self) -> LLMService:
+        if self._llm_service is None:
+            with self._services_lock:
+                if self._llm_service is None:
+                    self._llm_service = TieredLLMService.from_model_names(LLM_MODEL_TIERS, tracer=self.tracer) \
+                        if LLM_MODEL_TIERS else LLMService(tracer=self.tracer)
+        return self._llm_service
+
+    @llm_service.setter
+    def llm_service(self, service: LLMService):
+        self._llm_service = self._with_tracer(service)
+
+    @property
+    def search_service(self) -> SearchService:
+        if self._search_service is None:
+            with self._services_lock:
+                if self._search_service is None:
+                    self._search_service = SearchService(tracer=self.tracer)
+        return self._search_service
+
+    @search_service.setter
+    def search_service(self, service: SearchService):
+        self._search_service = self._with_tracer(service)
+
+    @property
+    def graph(self):
+        """The compiled graph for this parser's mode; shared with every other parser built the same way."""
+        return compiled_graph(self.mode, self.fast_path is not None)
+
+    def warm_up(self) -> "IntentParser":
+        """Do the lazy setup now (graph, services and their clients) so the first request does not pay for it."""
+        self.graph
+        for service in getattr(self.llm_service, "tiers", [self.llm_service]):
+            service.model
+        self.search_service.ddgs
+        return self
+
+    def _run_config(self) -> Dict:
+        # The shared graph finds the parser to run each node on here
+        return {"configurable": {"parser": self}}
+
+    def _run_node(self, name: str, state: State):
+        func = getattr(self, NODE_METHODS[name][0])
+        if self.tracer is not None:
+            func = self.tracer.wrap(name, func)
+        return func(state)
+
+    async def _arun_node(self, name: str, state: State):
+        afunc = getattr(self, NODE_METHODS[name][1])
+        if self.tracer is not None:
+            afunc = self.tracer.awrap(name, afunc)
+        return await afunc(state)
+
+    def _submit(self, executor: ThreadPoolExecutor, func, *args):
+        # Run in a copy of the caller's context so spans recorded in the worker reach the right request
+        return executor.submit(contextvars.copy_context().run, func, *args)
+
+    def _trace_parse(self, node: str, fell_back: bool):
+        """Count a JSON parse of an LLM response, and whether the node had to use its default instead."""
+        if self.tracer is not None:
+            self.tracer.count("json_parses")
+            if fell_back:
+                self.tracer.event("json_fallbacks", node=node)
+
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        """Seconds left before `deadline`, or None when the request has no deadline."""
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    def _degrade(self, intent: Dict, step: str):
+        """Note that `step` was skipped or failed for this intent, so its result is partial or a local default."""
+        degraded = intent.setdefault("degraded", [])
+        if step not in degraded:
+            degraded.append(step)
+        if self.tracer is not None:
+            self.tracer.event("degraded_steps", node=step)
+
+    def _tier_options(self, node: str) -> Dict:
+        """Keyword arguments that start an LLM call for `node` on its model tier, with escalation; {} for a single model."""
+        if getattr(self.llm_service, "tiers", None) is None:
+            return {}
+        return {"tier": self.node_tiers.get(node, 0), "node": node, "check": lambda text: self._escalation_reason(node, text)}
+
+    def _escalation_reason(self, node: str, response: str) -> Optional[str]:
+        """Why an answer for `node` should be retried on a larger model, or None to keep it."""
+        try:
+            parsed = extract_json(response)
+        except ValueError:
+            return "malformed"
+        if node == "generate_follow_ups":
+            return None if isinstance(parsed, list) and parsed else "malformed"
+        if node == "extract_entities":
+            if not isinstance(parsed, dict) or not isinstance(parsed.get("entities"), dict):
+                return "malformed"
+            return "contradictions" if parsed.get("contradictions") else None
+        items = [parsed] if isinstance(parsed, dict) else parsed
+        if not isinstance(items, list) or not items or \
+                not all(isinstance(item, dict) and item.get("category") in INTENT_CATEGORIES for item in items):
+            return "malformed"
+        if node == "fused_parse" and not all(isinstance(item.get("entities"), dict) for item in items):
+            return "malformed"
+        for item in items:
+            try:
+                if float(item.get("confidence", 0.5)) < LLM_ESCALATION_CONFIDENCE:
+                    return "low_confidence"
+            except (TypeError, ValueError):
+                return "malformed"
+        if any(item.get("conflict") for item in items):
+            return "conflict"
+        if any(item.get("contradictions") for item in items):
+            return "contradictions"
+        return None
+
+    def _escalate_streamed(self, node: str, prompt: str, response: str, deadline: Optional[float]) -> str:
+        """A streamed answer can only be checked once complete; a rejected one is replaced by a larger model's."""
+        options = self._tier_options(node)
+        if not options:
+            return response
+        return self.llm_service.escalate_streamed(prompt, response, timeout=self._remaining(deadline), **options)
+
+    async def _aescalate_streamed(self, node: str, prompt: str, response: str, deadline: Optional[float]) -> str:
+        options = self._tier_options(node)
+        if not options:
+            return response
+        return await self.llm_service.aescalate_streamed(prompt, response, timeout=self._remaining(deadline), **options)
+
+    def model_tier_stats(self) -> Dict:
+        """Per-tier call counts and escalation rates when the LLM service is tiered."""
+        llm = self.llm_service
+        return llm.tier_stats() if hasattr(llm, "tier_stats") else {}
+
+    def _fan_out(self, state: State, next_node: str) -> List[str]:
+        """Branches to run once intents are classified; the search branch only when there is something to search."""
+        return [next_node, "start_search"] if self._search_queries(state) else [next_node]
 
     def _is_offensive(self, user_input: str) -> bool:
         """Check if input contains offensive language."""
         if not isinstance(user_input, str):
             return False  # Avoid type errors
-        input_lower = user_input.lower()
-        return any(keyword in input_lower for keyword in self.offensive_keywords)
+        return self.offensive_matcher.contains_any(user_input)
 
-    def _parse_intent(self, state: State) -> State:
-        user_input = state["user_input"]
-        if not isinstance(user_input, str):
-            return {
-                **state,
-                "intents": [{"category": "other", "confidence": 0.5, "follow_up_questions": ["Could you provide a valid request?"]}]
-            }
-        prompt = f"""
+    def reload_terms(self, force: bool = False) -> bool:
+        """Pick up edits to the term lists or term files without rebuilding the parser."""
+        offensive = self.offensive_matcher.reload(self.offensive_keywords, force=force)
+        locations = self.invalid_location_matcher.reload(self.invalid_locations, force=force)
+        return offensive or locations
+
+    def _fast_path(self, state: State) -> State:
+        intents = self.fast_path.classify(state["user_input"]) or []
+        for intent in intents:
+            result = self._validate_entities({
+                "entities": intent["key_entities"],
+                "contradictions": intent["contradictions"],
+                "validation_errors": intent["validation_errors"],
+            }, state["current_date"])
+            intent["key_entities"] = result["entities"]
+        return {**state, "intents": intents}
+
+    async def _afast_path(self, state: State) -> State:
+        return self._fast_path(state)  # Local rules only, nothing to await
+
+    def fast_path_stats(self) -> Dict:
+        """Fast-path attempts, hits and hit rate since the parser was created."""
+        return self.fast_path.stats() if self.fast_path is not None else {}
+
+    def classifier_stats(self) -> Dict:
+        """Local intent classifier attempts, confident hits and hit rate since the parser was created."""
+        return self.intent_classifier.stats() if self.intent_classifier is not None else {}
+
+    # Each node is split into a prompt builder and a response handler shared by its sync and async variants.
+
+    def _intent_prompt(self, user_input: str) -> str:
+        return f"""
         Identify the primary intent in the following user input, focusing on the main action (e.g., 'book', 'find', 'suggest'). Possible categories: dining, travel, gifting, cab_booking, other.
         Only identify multiple intents if distinct actions are mentioned (e.g., 'book a flight and a dinner'). Any action not related to dining, travel, gifting, or cab_booking (e.g., hotel booking, suggestions like 'suggest a dress' or 'suggest a book', or 'update Aadhar') should be classified as 'other'.
         For suggestion requests (e.g., 'suggest a dress', 'suggest a book'), classify as 'other' unless explicitly tied to gift-giving (e.g., 'suggest a gift for my wife'). If the suggestion is for personal use (e.g., 'for me') or unspecified, use 'other'.
@@ -134,231 +297,586 @@ class IntentParser:
         [{{"category": "<category>", "confidence": <score>, "conflict": "<optional conflict message>"}}, ...]
         ```
         """
+
+    def _intents_from_response(self, response: str) -> List[Dict]:
         try:
-            response = self.llm_service.generate_response(prompt)
-            intents = json.loads(response.strip("```json\n").strip("```"))
-        except (json.JSONDecodeError, ValueError):
+            intents = extract_json(response)
+        except ValueError:
+            intents = None
+        if isinstance(intents, dict):
+            intents = [intents]  # A single intent returned without the surrounding list
+        if isinstance(intents, list):
+            intents = [intent for intent in intents if isinstance(intent, dict) and intent.get("category")]
+        self._trace_parse("parse_intent", not intents)
+        if not intents:
             # Handle malformed LLM response
             intents = [{"category": "other", "confidence": 0.5}]
         # Initialize follow_up_questions for each intent
         for intent in intents:
             intent["follow_up_questions"] = []
+            intent.setdefault("confidence", 0.5)  # Missing when the response was cut off mid-object
             intent.setdefault("conflict", "")
+        return intents
+
+    def _unclassified(self, state: State) -> State:
+        """Classification failed or ran out of time: carry on with a single "other" intent."""
+        intent = {"category": "other", "confidence": 0.0, "follow_up_questions": [], "conflict": ""}
+        self._degrade(intent, "parse_intent")
+        return {**state, "intents": [intent]}
+
+    def _invalid_input_intents(self) -> List[Dict]:
+        return [{"category": "other", "confidence": 0.5, "follow_up_questions": ["Could you provide a valid request?"]}]
+
+    def _classify_locally(self, user_input: str) -> List[Dict]:
+        if self.intent_classifier is None:
+            return None
+        return self.intent_classifier.classify(user_input, self.classifier_threshold)
+
+    def _parse_intent(self, state: State) -> State:
+        user_input = state["user_input"]
+        if not isinstance(user_input, str):
+            return {**state, "intents": self._invalid_input_intents()}
+        intents = self._classify_locally(user_input)
+        if intents:
+            return {**state, "intents": intents}
+        remaining = self._remaining(state.get("deadline"))
+        if remaining == 0:
+            return self._unclassified(state)
+        try:
+            if self.streaming:
+                response, prefetched = self._stream_intents(user_input, state.get("deadline"), state["current_date"])
+                response = self._escalate_streamed("parse_intent", self._intent_prompt(user_input), response, state.get("deadline"))
+                return {**state, "intents": self._intents_from_response(response), "prefetched_entities": prefetched}
+            response = self.llm_service.generate_response(self._intent_prompt(user_input), timeout=remaining,
+                                                          **self._tier_options("parse_intent"))
+        except Exception:
+            # Retries are exhausted or the deadline passed; the request still gets an answer
+            return self._unclassified(state)
+        return {**state, "intents": self._intents_from_response(response)}
+
+    async def _aparse_intent(self, state: State) -> State:
+        user_input = state["user_input"]
+        if not isinstance(user_input, str):
+            return {**state, "intents": self._invalid_input_intents()}
+        intents = self._classify_locally(user_input)
+        if intents:
+            return {**state, "intents": intents}
+        remaining = self._remaining(state.get("deadline"))
+        if remaining == 0:
+            return self._unclassified(state)
+        try:
+            if self.streaming:
+                response, prefetched = await self._astream_intents(user_input, state.get("deadline"), state["current_date"])
+                response = await self._aescalate_streamed("parse_intent", self._intent_prompt(user_input), response,
+                                                          state.get("deadline"))
+                return {**state, "intents": self._intents_from_response(response), "prefetched_entities": prefetched}
+            response = await self.llm_service.agenerate_response(self._intent_prompt(user_input), timeout=remaining,
+                                                                 **self._tier_options("parse_intent"))
+        except Exception:
+            return self._unclassified(state)
+        return {**state, "intents": self._intents_from_response(response)}
+
+    def _stream_intents(self, user_input: str, deadline: Optional[float] = None, current_date: datetime = None):
+        """Stream the parse_intent response, starting entity extraction for each intent as soon as it is complete.
+
+        Returns the full response text and {index: (category, future)} for the extractions already started.
+        """
+        stream = IncrementalJSONParser()
+        prefetched = {}
+        try:
+            for chunk in self.llm_service.stream_response(self._intent_prompt(user_input), timeout=self._remaining(deadline),
+                                                          **self._tier_options("parse_intent")):
+                for index, item in stream.feed(chunk):
+                    if isinstance(item, dict) and item.get("category") in INTENT_CATEGORIES and len(prefetched) < self.max_workers:
+                        future = self._submit(self._get_executor(), self._extract_intent_entities, user_input,
+                                              item["category"], deadline, current_date)
+                        prefetched[index] = (item["category"], future)
+        except Exception:
+            self._discard_prefetched({"prefetched_entities": prefetched}, ())
+            raise
+        return stream.buffer, prefetched
+
+    async def _astream_intents(self, user_input: str, deadline: Optional[float] = None, current_date: datetime = None):
+        stream = IncrementalJSONParser()
+        prefetched = {}
+        try:
+            async for chunk in self.llm_service.astream_response(self._intent_prompt(user_input), timeout=self._remaining(deadline),
+                                                                 **self._tier_options("parse_intent")):
+                for index, item in stream.feed(chunk):
+                    if isinstance(item, dict) and item.get("category") in INTENT_CATEGORIES and len(prefetched) < self.max_workers:
+                        task = asyncio.ensure_future(
+                            self._aextract_intent_entities(user_input, item["category"], deadline, current_date))
+                        prefetched[index] = (item["category"], task)
+        except Exception:
+            self._discard_prefetched({"prefetched_entities": prefetched}, ())
+            raise
+        return stream.buffer, prefetched
+
+    def _take_prefetched(self, state: State, index: int, intent: Dict):
+        """The extraction started for this intent while parse_intent streamed, if it matches the final intent."""
+        entry = (state.get("prefetched_entities") or {}).get(index)
+        if entry is not None and entry[0] == intent["category"]:
+            return entry[1]
+        return None
+
+    def _discard_prefetched(self, state: State, used) -> Dict:
+        for _, pending in (state.get("prefetched_entities") or {}).values():
+            if pending not in used:
+                pending.cancel()  # The final response disagreed with the streamed intent
+        return {}
+
+    def _fused_prompt(self, user_input: str) -> str:
+        return f"""
+        Identify the intents in the following user input and extract their key entities, focusing on the main action (e.g., 'book', 'find', 'suggest'). Possible categories: dining, travel, gifting, cab_booking, other.
+        Only identify multiple intents if distinct actions are mentioned (e.g., 'book a flight and a dinner'). Any action not related to dining, travel, gifting, or cab_booking (e.g., hotel booking, suggestions like 'suggest a dress' or 'suggest a book', or 'update Aadhar') should be classified as 'other'.
+        For suggestion requests (e.g., 'suggest a dress', 'suggest a book'), classify as 'other' unless explicitly tied to gift-giving (e.g., 'suggest a gift for my wife'). If the suggestion is for personal use (e.g., 'for me') or unspecified, use 'other'.
+        If multiple travel intents are mentioned (e.g., 'book a flight to Paris and a flight to London'), flag as conflicting.
+        For each intent, provide a confidence score (0.0 to 1.0).
+        For each intent, extract key entities (if applicable): date, time, location, cuisine, dietary, preference, party_size, budget, destination, pickup_location, occasion, recipient, topic.
+        Check for contradictions (e.g., 'cheap' and 'luxury') and flag them.
+        Validate party_size (flag if > 100) and locations (flag if fictional/impossible like 'moon', 'Narnia').
+        For intents in the 'other' category, also suggest 2-3 relevant follow-up questions tailored to the context.
+        Input: {user_input}
+        Output format: ```json
+        [{{"category": "<category>", "confidence": <score>, "conflict": "<optional conflict message>", "entities": {{}}, "contradictions": [], "validation_errors": [], "follow_up_questions": []}}, ...]
+        ```
+        """
+
+    def _fused_intents_from_response(self, response: str, current_date: datetime) -> List[Dict]:
+        """Turn a fused classify + extract response into intents, or [] if it cannot be used."""
+        try:
+            parsed = extract_json(response)
+        except ValueError:
+            return []
+        if not isinstance(parsed, list) or not parsed:
+            return []
+        intents = []
+        for item in parsed:
+            if not isinstance(item, dict) or item.get("category") not in INTENT_CATEGORIES \
+                    or not isinstance(item.get("entities"), dict):
+                return []
+            result = self._validate_entities({
+                "entities": item["entities"],
+                "contradictions": list(item.get("contradictions") or []),
+                "validation_errors": list(item.get("validation_errors") or []),
+            }, current_date)
+            intent = {
+                "category": item["category"],
+                "confidence": item.get("confidence", 0.5),
+                "conflict": item.get("conflict") or "",
+                "key_entities": result["entities"],
+                "contradictions": result["contradictions"],
+                "validation_errors": result["validation_errors"],
+                "follow_up_questions": [],
+            }
+            if item["category"] == "other" and isinstance(item.get("follow_up_questions"), list):
+                # Used by _generate_follow_ups instead of a separate LLM call for unknown topics
+                intent["suggested_follow_ups"] = item["follow_up_questions"]
+            intents.append(intent)
+        return intents
+
+    def _fused_parse(self, state: State) -> State:
+        """Classify intents and extract their entities in a single LLM call.
+
+        Returns an empty intent list when the response cannot be used, which routes to the multi-call path.
+        """
+        user_input = state["user_input"]
+        if not isinstance(user_input, str):
+            return {**state, "intents": []}
+        try:
+            response = self.llm_service.generate_response(self._fused_prompt(user_input),
+                                                          timeout=self._remaining(state.get("deadline")),
+                                                          **self._tier_options("fused_parse"))
+        except Exception:
+            return {**state, "intents": []}
+        intents = self._fused_intents_from_response(response, state["current_date"])
+        self._trace_parse("fused_parse", not intents)  # A fallback here means a second pass through parse_intent
+        return {**state, "intents": intents}
+
+    async def _afused_parse(self, state: State) -> State:
+        user_input = state["user_input"]
+        if not isinstance(user_input, str):
+            return {**state, "intents": []}
+        try:
+            response = await self.llm_service.agenerate_response(self._fused_prompt(user_input),
+                                                                 timeout=self._remaining(state.get("deadline")),
+                                                                 **self._tier_options("fused_parse"))
+        except Exception:
+            return {**state, "intents": []}
+        intents = self._fused_intents_from_response(response, state["current_date"])
+        self._trace_parse("fused_parse", not intents)  # A fallback here means a second pass through parse_intent
         return {**state, "intents": intents}
 
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="entity-extraction")
+        return self._executor
+
+    def _apply_entities(self, intents: List[Dict], index: int, result: Dict, writer):
+        intent = intents[index]
+        intent["key_entities"] = result["entities"]
+        intent["contradictions"] = result["contradictions"]
+        intent["validation_errors"] = result.get("validation_errors", [])
+        if result.get("degraded"):
+            self._degrade(intent, "extract_entities")
+        # Lets stream_input report each intent as soon as its extraction finishes
+        writer(self._entities_event(index, intent))
+
+    def _apply_missing_entities(self, intents: List[Dict], applied, pending, writer):
+        """Give the intents whose extraction did not finish in time empty entities, and stop their calls."""
+        for future in pending:
+            future.cancel()
+        for index in range(len(intents)):
+            if index not in applied:
+                self._apply_entities(intents, index, self._entities_unavailable(), writer)
+
     def _extract_entities(self, state: State) -> State:
         user_input = state["user_input"]
         intents = state["intents"]
-        for intent in intents:
-            category = intent["category"]
-            prompt = f"""
-            Extract key entities from the following user input for the intent category '{category}'.
-            Entities to extract (if applicable): date, time, location, cuisine, dietary, preference, party_size, budget, destination, pickup_location, occasion, recipient, topic.
-            Check for contradictions (e.g., 'cheap' and 'luxury') and flag them.
-            Validate party_size (flag if > 100) and locations (flag if fictional/impossible like 'moon', 'Narnia').
-            Input: {user_input}
-            Output format: ```json
-            {{"entities": {{}}, "contradictions": [], "validation_errors": []}}
-            ```
-            """
+        deadline = state.get("deadline")
+        writer = _stream_writer()
+        prefetched = [self._take_prefetched(state, index, intent) for index, intent in enumerate(intents)]
+        applied = set()
+        if self.concurrent_extraction and len(intents) > 1:
+            # Results are written back by index, so the original intent order is kept
+            futures = {
+                (prefetched[index] or self._submit(self._get_executor(), self._extract_intent_entities, user_input,
+                                                   intent["category"], deadline, state["current_date"])): index
+                for index, intent in enumerate(intents)
+            }
             try:
-                response = self.llm_service.generate_response(prompt)
-                result = json.loads(response.strip("```json\n").strip("```"))
-            except (json.JSONDecodeError, ValueError):
-                result = {"entities": {"topic": "unknown"}, "contradictions": [], "validation_errors": ["Invalid response from LLM"]}
-            
-            # Normalize date entities
-            if "date" in result["entities"]:
-                result["entities"]["date"] = normalize_date(result["entities"]["date"], self.current_date)
-            
-            # Validate party_size
-            if "party_size" in result["entities"]:
-                try:
-                    party_size = int(result["entities"]["party_size"])
-                    if party_size > 100:
-                        result["validation_errors"].append("Party size seems unusually large")
-                except ValueError:
-                    result["validation_errors"].append("Invalid party size format")
-            
-            # Validate locations
-            for loc_key in ["location", "destination", "pickup_location"]:
-                if loc_key in result["entities"]:
-                    loc = str(result["entities"][loc_key]).lower()
-                    if any(invalid in loc for invalid in self.invalid_locations):
-                        result["validation_errors"].append(f"Invalid {loc_key}: {loc}")
-            
-            intent["key_entities"] = result["entities"]
-            intent["contradictions"] = result["contradictions"]
-            intent["validation_errors"] = result.get("validation_errors", [])
-        return state
+                for future in as_completed(futures, timeout=self._remaining(deadline)):
+                    self._apply_entities(intents, futures[future], future.result(), writer)
+                    applied.add(futures[future])
+            except FuturesTimeoutError:
+                pass  # Out of time; what finished is kept
+            self._apply_missing_entities(intents, applied, futures, writer)
+        else:
+            for index, intent in enumerate(intents):
+                if prefetched[index] is None:
+                    result = self._extract_intent_entities(user_input, intent["category"], deadline, state["current_date"])
+                else:
+                    try:
+                        result = prefetched[index].result(timeout=self._remaining(deadline))
+                    except FuturesTimeoutError:
+                        result = self._entities_unavailable()
+                self._apply_entities(intents, index, result, writer)
+        # Only the keys this node owns, since start_search may be updating the state in the same step
+        return {"intents": intents, "prefetched_entities": self._discard_prefetched(state, prefetched)}
+
+    async def _aextract_entities(self, state: State) -> State:
+        user_input = state["user_input"]
+        intents = state["intents"]
+        deadline = state.get("deadline")
+        writer = _stream_writer()
+        # The semaphore plays the role of the thread pool: at most max_workers calls in flight
+        limit = asyncio.Semaphore(self.max_workers if self.concurrent_extraction else 1)
+
+        prefetched = [self._take_prefetched(state, index, intent) for index, intent in enumerate(intents)]
+
+        async def extract(index, category):
+            if prefetched[index] is not None:
+                return index, await prefetched[index]
+            async with limit:
+                return index, await self._aextract_intent_entities(user_input, category, deadline, state["current_date"])
+
+        tasks = [asyncio.ensure_future(extract(index, intent["category"])) for index, intent in enumerate(intents)]
+        applied = set()
+        try:
+            for done in asyncio.as_completed(tasks, timeout=self._remaining(deadline)):
+                index, result = await done
+                self._apply_entities(intents, index, result, writer)
+                applied.add(index)
+        except asyncio.TimeoutError:
+            pass
+        self._apply_missing_entities(intents, applied, tasks, writer)
+        # Only the keys this node owns, since start_search may be updating the state in the same step
+        return {"intents": intents, "prefetched_entities": self._discard_prefetched(state, prefetched)}
+
+    def _entity_prompt(self, user_input: str, category: str) -> str:
+        return f"""
+        Extract key entities from the following user input for the intent category '{category}'.
+        Entities to extract (if applicable): date, time, location, cuisine, dietary, preference, party_size, budget, destination, pickup_location, occasion, recipient, topic.
+        Check for contradictions (e.g., 'cheap' and 'luxury') and flag them.
+        Validate party_size (flag if > 100) and locations (flag if fictional/impossible like 'moon', 'Narnia').
+        Input: {user_input}
+        Output format: ```json
+        {{"entities": {{}}, "contradictions": [], "validation_errors": []}}
+        ```
+        """
+
+    def _entities_from_response(self, response: str, current_date: datetime) -> Dict:
+        try:
+            result = extract_json(response)
+        except ValueError:
+            result = None
+        fell_back = not isinstance(result, dict) or not isinstance(result.get("entities"), dict)
+        self._trace_parse("extract_entities", fell_back)
+        if fell_back:
+            result = {"entities": {"topic": "unknown"}, "contradictions": [], "validation_errors": ["Invalid response from LLM"]}
+        return self._validate_entities(result, current_date)
+
+    def _extraction_failed(self, error: Exception) -> Dict:
+        # An LLM error for one intent must not fail the others
+        return {"entities": {"topic": "unknown"}, "contradictions": [], "validation_errors": [f"Entity extraction failed: {error}"],
+                "degraded": True}
+
+    def _entities_unavailable(self) -> Dict:
+        # The deadline passed before extraction finished; the follow-up questions ask for what is missing
+        return {"entities": {}, "contradictions": [], "validation_errors": [], "degraded": True}
+
+    def _extract_intent_entities(self, user_input: str, category: str, deadline: Optional[float] = None,
+                                 current_date: datetime = None) -> Dict:
+        """Extract and validate entities for a single intent. Failures never propagate to other intents."""
+        remaining = self._remaining(deadline)
+        if remaining == 0:
+            return self._entities_unavailable()
+        try:
+            response = self.llm_service.generate_response(self._entity_prompt(user_input, category), timeout=remaining,
+                                                          **self._tier_options("extract_entities"))
+        except Exception as e:
+            return self._entities_unavailable() if self._remaining(deadline) == 0 else self._extraction_failed(e)
+        return self._entities_from_response(response, current_date)
+
+    async def _aextract_intent_entities(self, user_input: str, category: str, deadline: Optional[float] = None,
+                                        current_date: datetime = None) -> Dict:
+        remaining = self._remaining(deadline)
+        if remaining == 0:
+            return self._entities_unavailable()
+        try:
+            response = await self.llm_service.agenerate_response(self._entity_prompt(user_input, category), timeout=remaining,
+                                                                 **self._tier_options("extract_entities"))
+        except Exception as e:
+            return self._entities_unavailable() if self._remaining(deadline) == 0 else self._extraction_failed(e)
+        return self._entities_from_response(response, current_date)
+
+    def _validate_entities(self, result: Dict, current_date: datetime = None) -> Dict:
+        """Normalize dates against `current_date` (now by default) and flag invalid party sizes and locations."""
+        result.setdefault("contradictions", [])
+        result.setdefault("validation_errors", [])
+
+        # Normalize date entities
+        if "date" in result["entities"]:
+            result["entities"]["date"] = normalize_date(str(result["entities"]["date"]),
+                                                      current_date or datetime.now())
+
+        # Validate party_size
+        if "party_size" in result["entities"]:
+            try:
+                party_size = int(result["entities"]["party_size"])
+                if party_size > 100:
+                    result["validation_errors"].append("Party size seems unusually large")
+            except (TypeError, ValueError):
+                result["validation_errors"].append("Invalid party size format")
+
+        # Validate locations
+        for loc_key in ["location", "destination", "pickup_location"]:
+            if loc_key in result["entities"]:
+                loc = str(result["entities"][loc_key]).lower()
+                if self.invalid_location_matcher.contains_any(loc):
+                    result["validation_errors"].append(f"Invalid {loc_key}: {loc}")
+        return result
+
+    def _needs_dynamic_follow_ups(self, intent: Dict) -> bool:
+        """Whether an intent's follow-ups come from the LLM (or the topic cache) rather than the rules."""
+        return self.follow_up_rules.needs_dynamic(intent)
+
+    @property
+    def topic_questions(self) -> Optional[TopicQuestionCache]:
+        # Opened on first use, so parsers that never see an unfamiliar topic do not touch the disk
+        if self._topic_questions is None and self.follow_up_cache_enabled:
+            with self._services_lock:
+                if self._topic_questions is None:
+                    self._topic_questions = TopicQuestionCache(
+                        max_size=FOLLOW_UP_CACHE_MAX_SIZE, ttl=FOLLOW_UP_CACHE_TTL_SECONDS, path=FOLLOW_UP_CACHE_PATH)
+        return self._topic_questions
+
+    def _cached_topic_questions(self, intent: Dict) -> Optional[List[str]]:
+        if self.topic_questions is None:
+            return None
+        questions = self.topic_questions.get(intent["key_entities"].get("topic", ""))
+        if questions is not None and self.tracer is not None:
+            self.tracer.event("follow_up_cache_hits")
+        return questions
+
+    def _remember_topic_questions(self, intent: Dict, questions: Optional[List[str]]):
+        if questions and self.topic_questions is not None:
+            self.topic_questions.set(intent["key_entities"].get("topic", ""), questions)
+
+    def follow_up_cache_stats(self) -> Dict:
+        """Hits and misses of the topic -> LLM-written questions cache."""
+        return self.topic_questions.stats() if self.topic_questions is not None else {}
+
+    def _dynamic_follow_up_prompt(self, user_input: str, intent: Dict) -> str:
+        topic = intent["key_entities"].get("topic", "").lower()
+        return f"""
+        Generate 2-3 relevant follow-up questions for the following user input and topic, tailored to the context.
+        Input: {user_input}
+        Topic: {topic or 'unknown'}
+        Output format: ```json
+        ["question 1", "question 2", "question 3"]
+        ```
+        """
+
+    def _questions_from_response(self, response: str) -> List[str]:
+        try:
+            dynamic_questions = extract_json(response)
+        except ValueError:
+            dynamic_questions = None
+        self._trace_parse("generate_follow_ups", not isinstance(dynamic_questions, list))
+        if not isinstance(dynamic_questions, list):
+            return None  # The rules fall back to a generic question
+        return dynamic_questions[:3]  # Limit to 3 questions
+
+    def _dynamic_follow_ups(self, state: State, intent: Dict) -> Optional[List[str]]:
+        """LLM-written questions for an unfamiliar topic; None, so the generic question is used, if the call fails."""
+        cached = self._cached_topic_questions(intent)
+        if cached is not None:
+            return cached
+        remaining = self._remaining(state.get("deadline"))
+        try:
+            if remaining == 0:
+                raise TimeoutError("deadline exceeded")
+            response = self.llm_service.generate_response(self._dynamic_follow_up_prompt(state["user_input"], intent),
+                                                          timeout=remaining, **self._tier_options("generate_follow_ups"))
+        except Exception:
+            self._degrade(intent, "generate_follow_ups")
+            return None
+        questions = self._questions_from_response(response)
+        self._remember_topic_questions(intent, questions)
+        return questions
+
+    async def _adynamic_follow_ups(self, state: State, intent: Dict) -> Optional[List[str]]:
+        cached = self._cached_topic_questions(intent)
+        if cached is not None:
+            return cached
+        remaining = self._remaining(state.get("deadline"))
+        try:
+            if remaining == 0:
+                raise TimeoutError("deadline exceeded")
+            response = await self.llm_service.agenerate_response(
+                self._dynamic_follow_up_prompt(state["user_input"], intent), timeout=remaining,
+                **self._tier_options("generate_follow_ups"))
+        except Exception:
+            self._degrade(intent, "generate_follow_ups")
+            return None
+        questions = self._questions_from_response(response)
+        self._remember_topic_questions(intent, questions)
+        return questions
 
     def _generate_follow_ups(self, state: State) -> State:
         for intent in state["intents"]:
-            category = intent["category"]
-            entities = intent["key_entities"]
-            contradictions = intent.get("contradictions", [])
-            validation_errors = intent.get("validation_errors", [])
-            conflict = intent.get("conflict", "")
-            follow_ups = []
-
-            # Handle contradictions
-            if contradictions:
-                follow_ups.append(f"Could you clarify your request regarding {', '.join(contradictions)}?")
-
-            # Handle conflicts
-            if conflict:
-                follow_ups.append(f"Could you clarify your request? {conflict}")
-
-            # Handle validation errors
-            for error in validation_errors:
-                if "Party size" in error:
-                    follow_ups.append("Could you confirm the party size? It seems unusually large.")
-                elif "Invalid date" in error or "past date" in error:
-                    follow_ups.append("Could you specify a valid future date for your request?")
-                elif "Invalid location" in error or "Invalid destination" in error or "Invalid pickup_location" in error:
-                    follow_ups.append("Could you specify a real location or destination?")
-
-            if category == "dining":
-                if not entities.get("party_size"):
-                    follow_ups.append("How many people are dining?")
-                if not entities.get("location"):
-                    follow_ups.append("Could you specify the city or location for the restaurant?")
-                if not entities.get("cuisine"):
-                    follow_ups.append("Do you have a preferred cuisine type?")
-                if not entities.get("budget"):
-                    follow_ups.append("What is your budget for the meal?")
-                if not entities.get("date"):
-                    follow_ups.append("What date would you like to make the reservation for?")
-                elif entities.get("date") == "ambiguous_next_week":
-                    follow_ups.append("Which day next week would you like to dine?")
-                elif entities.get("date") and not entities.get("time"):
-                    follow_ups.append("What time would you like to dine?")
-                if entities.get("date") in ["today", "tonight", "tomorrow", "a week from now"]:
-                    follow_ups.append("Could you confirm the specific date and time for your reservation?")
-            elif category == "travel":
-                if not entities.get("destination"):
-                    follow_ups.append("Where are you planning to travel?")
-                else:
-                    if entities.get("destination").lower() in ["airport", "station"]:
-                        follow_ups.append(f"Which {entities['destination'].lower()} are you referring to?")
-                if not entities.get("party_size"):
-                    follow_ups.append("How many people are traveling?")
-                if not entities.get("budget"):
-                    follow_ups.append("What is your budget for the trip?")
-                if not entities.get("date"):
-                    follow_ups.append("When are you planning to travel?")
-                elif entities.get("date") == "ambiguous_next_week":
-                    follow_ups.append("Which day next week would you like to travel?")
-                elif entities.get("date") and not entities.get("time"):
-                    follow_ups.append("What time would you like to travel?")
-                if entities.get("date") in ["today", "tonight", "tomorrow", "a week from now"]:
-                    follow_ups.append("Could you confirm the specific date and time for your travel?")
-            elif category == "cab_booking":
-                if not entities.get("pickup_location"):
-                    if entities.get("destination", "").lower() == "airport":
-                        follow_ups.append("Which airport are you departing from?")
-                    else:
-                        follow_ups.append("What is your pickup location?")
-                elif entities.get("pickup_location").lower() in ["airport"] or (
-                    entities.get("pickup_location") == entities.get("destination")
-                ):
-                    follow_ups.append("Which airport or location are you departing from?")
-                if not entities.get("destination"):
-                    follow_ups.append("What is your destination?")
-                elif entities.get("destination").lower() in ["airport"] or (
-                    entities.get("pickup_location") == entities.get("destination")
-                ):
-                    follow_ups.append("Which airport or location are you going to?")
-                if not entities.get("time"):
-                    follow_ups.append("When do you need the cab?")
-                elif entities.get("date") and not entities.get("time"):
-                    follow_ups.append("What time do you need the cab?")
-                if entities.get("date") in ["today", "tonight", "tomorrow", "a week from now"]:
-                    follow_ups.append("Could you confirm the specific date and time for your cab?")
-                if not entities.get("budget"):
-                    follow_ups.append("Do you have a preferred cab type or budget?")
-            elif category == "gifting":
-                if not entities.get("budget"):
-                    follow_ups.append("What is your budget for the gift?")
-                if not entities.get("occasion"):
-                    follow_ups.append("What is the occasion for the gift?")
-                if entities.get("recipient") and entities["recipient"] not in ["unknown", ""]:
-                    follow_ups.append(f"What are some interests or preferences of your {entities['recipient']}?")
-                elif not entities.get("recipient"):
-                    follow_ups.append("Who is the gift for (e.g., friend, family, colleague)?")
-            elif category == "other":
-                topic = entities.get("topic", "").lower()
-                if "hotel" in topic or "accommodation" in topic:
-                    if not entities.get("destination"):
-                        follow_ups.append("Where are you planning to book a hotel?")
-                    if not entities.get("party_size"):
-                        follow_ups.append("How many people will be staying?")
-                    if not entities.get("budget"):
-                        follow_ups.append("What is your budget for the hotel?")
-                    if not entities.get("date"):
-                        follow_ups.append("When are you planning to check in?")
-                    elif entities.get("date") == "ambiguous_next_week":
-                        follow_ups.append("Which day next week would you like to check in?")
-                    elif entities.get("date") and not entities.get("time"):
-                        follow_ups.append("What time will you check in?")
-                    if entities.get("date") in ["today", "tonight", "tomorrow", "a week from now"]:
-                        follow_ups.append("Could you confirm the specific check-in date and time?")
-                elif "aadhar" in topic:
-                    follow_ups.append("Do you have your Aadhar number ready?")
-                    follow_ups.append("Are you updating your address online or at a physical center?")
-                elif "book" in topic or "reading" in topic:
-                    follow_ups.append("What type of book are you looking for (e.g., genre, fiction/non-fiction)?")
-                    follow_ups.append("Are you looking for physical books or e-books?")
-                    if not entities.get("budget"):
-                        follow_ups.append("What is your budget for the book?")
-                elif "dress" in topic or "clothing" in topic:
-                    follow_ups.append("What's the occasion for the dress (e.g., casual, formal)?")
-                    follow_ups.append("Do you have a preferred style or color?")
-                    if not entities.get("budget"):
-                        follow_ups.append("What is your budget for the dress?")
-                else:
-                    # Dynamic follow-up questions using LLM
-                    prompt = f"""
-                    Generate 2-3 relevant follow-up questions for the following user input and topic, tailored to the context.
-                    Input: {state['user_input']}
-                    Topic: {topic or 'unknown'}
-                    Output format: ```json
-                    ["question 1", "question 2", "question 3"]
-                    ```
-                    """
-                    try:
-                        response = self.llm_service.generate_response(prompt)
-                        dynamic_questions = json.loads(response.strip("```json\n").strip("```"))
-                        follow_ups.extend(dynamic_questions[:3])  # Limit to 3 questions
-                    except (json.JSONDecodeError, ValueError):
-                        follow_ups.append("Could you provide more details about your request?")
-                if not entities.get("location"):
-                    follow_ups.append("Do you need information for a specific region or state?")
-            intent["follow_up_questions"] = follow_ups
-        return state
+            dynamic_questions = None
+            if self._needs_dynamic_follow_ups(intent):
+                dynamic_questions = self._dynamic_follow_ups(state, intent)
+            intent["follow_up_questions"] = self._follow_ups_for_intent(intent, dynamic_questions)
+        # Only the key this node owns: after fused_parse or fast_path, start_search runs in the same step
+        return {"intents": state["intents"]}
 
-    def _handle_non_standard(self, state: State) -> State:
-        web_results = []
+    async def _agenerate_follow_ups(self, state: State) -> State:
+        intents = state["intents"]
+        pending = [intent for intent in intents if self._needs_dynamic_follow_ups(intent)]
+        questions = await asyncio.gather(*(self._adynamic_follow_ups(state, intent) for intent in pending))
+        dynamic = {id(intent): dynamic_questions for intent, dynamic_questions in zip(pending, questions)}
+        for intent in intents:
+            intent["follow_up_questions"] = self._follow_ups_for_intent(intent, dynamic.get(id(intent)))
+        return {"intents": intents}
+
+    def _follow_ups_for_intent(self, intent: Dict, dynamic_questions: List[str] = None) -> List[str]:
+        """Build the follow-up questions for one intent from its entities and validation results."""
+        return self.follow_up_rules.questions(intent, dynamic_questions)
+
+    def _search_queries(self, state: State) -> List[str]:
+        """Distinct search queries for the "other" intents, in first-seen order."""
+        queries = []
         for intent in state["intents"]:
             if intent["category"] == "other":
                 query = state["user_input"]
-                if isinstance(query, str):
-                    web_results = self.search_service.search_web(query)
-        return {**state, "web_search_results": web_results}
+                if isinstance(query, str) and query not in queries:
+                    queries.append(query)
+        return queries
+
+    def _search_all(self, queries: List[str]) -> List[Dict]:
+        web_results = []
+        # One search per distinct query, however many "other" intents share it
+        for query in queries:
+            web_results = self.search_service.search_web(query)
+        return web_results
+
+    def _get_search_executor(self) -> ThreadPoolExecutor:
+        # Separate from the extraction pool so a slow search never holds up an LLM call
+        if self._search_executor is None:
+            with self._executor_lock:
+                if self._search_executor is None:
+                    self._search_executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                               thread_name_prefix="web-search")
+        return self._search_executor
 
-    def process_input(self, user_input: str) -> List[Dict]:
-        # Validate input
+    def _start_search(self, state: State) -> Dict:
+        return {"pending_search": self._submit(self._get_search_executor(), self._search_all, self._search_queries(state))}
+
+    async def _astart_search(self, state: State) -> Dict:
+        # The parser's pool rather than asyncio.to_thread: asyncio.run joins the default executor on exit, so a
+        # search the deadline abandoned would hold up process_batch until it finished
+        future = self._submit(self._get_search_executor(), self._search_all, self._search_queries(state))
+        return {"pending_search": asyncio.wrap_future(future)}
+
+    def _search_timed_out(self, state: State) -> List[Dict]:
+        for intent in state["intents"]:
+            if intent["category"] == "other":
+                self._degrade(intent, "web_search")
+        return []
+
+    def _handle_non_standard(self, state: State) -> State:
+        pending = state.get("pending_search")
+        if pending is None:
+            pending = self._start_search(state)["pending_search"]
+        try:
+            web_results = pending.result(timeout=self._remaining(state.get("deadline")))
+        except FuturesTimeoutError:
+            pending.cancel()  # Only helps if it has not started; a running search is left to finish on its own
+            web_results = self._search_timed_out(state)
+        return {**state, "web_search_results": web_results, "pending_search": None}
+
+    async def _ahandle_non_standard(self, state: State) -> State:
+        pending = state.get("pending_search")
+        if pending is None:
+            pending = (await self._astart_search(state))["pending_search"]
+        try:
+            web_results = await asyncio.wait_for(pending, self._remaining(state.get("deadline")))
+        except asyncio.TimeoutError:
+            web_results = self._search_timed_out(state)
+        return {**state, "web_search_results": web_results, "pending_search": None}
+
+    def _validate_input(self, user_input: str) -> List[Dict]:
+        """Return an error result for unusable input, or None if it can be processed."""
         if not user_input or user_input.isspace():
             return [{"error": "Please provide a valid input."}]
         if not isinstance(user_input, str):
             return [{"error": "Invalid input type. Please provide a text input."}]
         if self._is_offensive(user_input):
             return [{"error": "I'm sorry, but I can't assist with that request. Please provide a different query."}]
-        state = self.graph.invoke({
+        return None
+
+    def _initial_state(self, user_input: str, deadline: float = None, current_date: datetime = None) -> State:
+        return {
             "user_input": user_input,
             "intents": [],
-            "web_search_results": []
-        })
+            "web_search_results": [],
+            "prefetched_entities": {},
+            "pending_search": None,
+            "deadline": time.monotonic() + deadline if deadline is not None else None,
+            # Taken per request: a parser kept warm across midnight must not resolve "tomorrow" to today
+            "current_date": current_date or datetime.now(),
+        }
+
+    def _format_results(self, state: State) -> List[Dict]:
+        # Partial results are only a timeout when the budget is actually spent; otherwise a step failed
+        remaining = self._remaining(state.get("deadline"))
+        timed_out = remaining == 0 and any(intent.get("degraded") for intent in state["intents"])
         return [
             {
                 "intent_category": intent["category"],
@@ -367,6 +885,333 @@ class IntentParser:
                 "follow_up_questions": intent["follow_up_questions"],
                 "web_search_results": state["web_search_results"] if intent["category"] == "other" else [],
                 "validation_errors": intent.get("validation_errors", []),
-                "conflict": intent.get("conflict", "")
+                "conflict": intent.get("conflict", ""),
+                "degraded": intent.get("degraded", []),
+                "timed_out": timed_out
             } for intent in state["intents"]
         ]
+
+    def _entities_event(self, index: int, intent: Dict) -> Dict:
+        return {
+            "event": "entities",
+            "index": index,
+            "intent_category": intent["category"],
+            "key_entities": intent["key_entities"],
+            "validation_errors": intent.get("validation_errors", []),
+            "contradictions": intent.get("contradictions", []),
+        }
+
+    def _events_from_update(self, node: str, update: Dict) -> List[Dict]:
+        """Translate a finished graph node's state update into stream events."""
+        intents = update.get("intents") or []
+        if node in ("fast_path", "fused_parse", "parse_intent") and intents:
+            events = [{
+                "event": "intents",
+                "intents": [
+                    {"intent_category": intent["category"], "confidence_score": intent["confidence"],
+                     "conflict": intent.get("conflict", "")} for intent in intents
+                ],
+            }]
+            if node != "parse_intent":
+                # These nodes extract entities themselves, so there is no extract_entities step to wait for
+                events.extend(self._entities_event(index, intent) for index, intent in enumerate(intents))
+            return events
+        if node == "generate_follow_ups":
+            return [
+                {"event": "follow_ups", "index": index, "follow_up_questions": intent["follow_up_questions"]}
+                for index, intent in enumerate(intents)
+            ]
+        if node == "handle_non_standard":
+            return [{"event": "web_search_results", "web_search_results": update.get("web_search_results", [])}]
+        return []
+
+    def _stream_event(self, mode: str, chunk, state: Dict) -> List[Dict]:
+        if mode == "custom":
+            return [copy.deepcopy(chunk)]
+        events = []
+        for node, update in chunk.items():
+            state.update(update or {})
+            # Deep copies, because later nodes keep mutating the same intent dicts
+            events.extend(copy.deepcopy(self._events_from_update(node, update or {})))
+        return events
+
+    def _request_trace(self, user_input):
+        """Group the spans of one request into a trace record when tracing is on."""
+        return self.tracer.request(user_input) if self.tracer is not None else nullcontext()
+
+    def stream_input(self, user_input: str, deadline: float = REQUEST_DEADLINE_SECONDS) -> Iterator[Dict]:
+        """Yield events as the graph progresses, ending with {"event": "done", "results": ...}.
+
+        Events: "intents" once intents are classified, "entities" per intent as its extraction finishes,
+        "follow_ups" per intent, and "web_search_results" for "other" intents. Invalid input yields a
+        single "error" event before "done".
+        """
+        with self._request_trace(user_input):
+            error = self._validate_input(user_input)
+            if error:
+                yield {"event": "error", "error": error[0]["error"]}
+                yield {"event": "done", "results": error}
+                return
+            graph = self.graph  # Compiled (on first use) before the deadline starts counting
+            state = self._initial_state(user_input, deadline)
+            for mode, chunk in graph.stream(state, self._run_config(), stream_mode=["updates", "custom"]):
+                yield from self._stream_event(mode, chunk, state)
+            yield {"event": "done", "results": self._format_results(state)}
+
+    async def astream_input(self, user_input: str, deadline: float = REQUEST_DEADLINE_SECONDS) -> AsyncIterator[Dict]:
+        """Async counterpart of stream_input."""
+        with self._request_trace(user_input):
+            error = self._validate_input(user_input)
+            if error:
+                yield {"event": "error", "error": error[0]["error"]}
+                yield {"event": "done", "results": error}
+                return
+            graph = self.graph
+            state = self._initial_state(user_input, deadline)
+            async for mode, chunk in graph.astream(state, self._run_config(), stream_mode=["updates", "custom"]):
+                for event in self._stream_event(mode, chunk, state):
+                    yield event
+            yield {"event": "done", "results": self._format_results(state)}
+
+    def _coalesce_key(self, user_input: str, deadline: float = None, current_date: datetime = None) -> str:
+        """Inputs with the same key produce the same result, so concurrent runs for it can be shared."""
+        return make_cache_key(
+            user_input, (current_date or datetime.now()).date().isoformat(), self.mode, self.fast_path is not None,
+            self.intent_classifier is not None, self.classifier_threshold,
+            # The raw attribute: building the default service here would load the config on every request
+            getattr(self._llm_service, "model_name", ""),
+            deadline,  # A caller with a tighter budget must not wait on a run with a looser one
+        )
+
+    def _refresh_similar(self, user_input: str, value: Dict, day, current_date: datetime) -> Optional[List[Dict]]:
+        """Results for `user_input` from a cached run of a similar input, or None if they cannot be reused.
+
+        Dates were resolved against the day the entry was stored; on a later day relative dates are
+        re-resolved from the new input's date phrase, and follow-ups rebuilt for the new dates.
+        """
+        intents = copy.deepcopy(value["intents"])
+        if day != current_date.date():
+            dated = [intent for intent in intents if intent["key_entities"].get("date")]
+            if dated:
+                phrases = set(DATE_PATTERN.findall(user_input.lower()))
+                if len(phrases) != 1:
+                    return None  # No phrase to re-resolve from (e.g. an absolute date), or no way to tell whose date is whose
+                phrase = phrases.pop()
+                for intent in dated:
+                    intent["key_entities"]["date"] = normalize_date(phrase, current_date)
+                    if intent["category"] != "other":
+                        intent["follow_up_questions"] = self._follow_ups_for_intent(intent)
+        return self._format_results({"intents": intents, "web_search_results": copy.deepcopy(value["web_search_results"])})
+
+    def _cached_similar(self, user_input: str, current_date: datetime) -> Optional[List[Dict]]:
+        if self.similarity_cache is None:
+            return None
+        results = self.similarity_cache.get(
+            user_input, refresh=lambda value, day: self._refresh_similar(user_input, value, day, current_date))
+        if results is not None and self.tracer is not None:
+            self.tracer.event("similarity_cache_hits")
+        return results
+
+    def _finish_run(self, user_input: str, state: State) -> List[Dict]:
+        """Format a finished graph run, remembering it for similar inputs unless any step was cut short."""
+        if self.similarity_cache is not None and not any(intent.get("degraded") for intent in state["intents"]):
+            value = {"intents": state["intents"], "web_search_results": state["web_search_results"]}
+            self.similarity_cache.set(user_input, copy.deepcopy(value), state["current_date"].date())
+        return self._format_results(state)
+
+    def similarity_cache_stats(self) -> Dict:
+        """Exact and near-duplicate hits, misses, stale entries and hit rate of the near-duplicate cache."""
+        return self.similarity_cache.stats() if self.similarity_cache is not None else {}
+
+    def _coalesced(self, shared: bool):
+        if shared and self.tracer is not None:
+            self.tracer.event("coalesced_requests")
+
+    def process_input(self, user_input: str, deadline: float = REQUEST_DEADLINE_SECONDS) -> List[Dict]:
+        """Parse one input into intents, entities, follow-up questions and web results.
+
+        With a `deadline` (seconds) the request returns within it, with whatever is ready by then; results
+        list the steps that were cut short in "degraded" and set "timed_out". It does not raise on timeouts.
+        """
+        with self._request_trace(user_input):
+            error = self._validate_input(user_input)
+            if error:
+                return error
+            current_date = datetime.now()
+            cached = self._cached_similar(user_input, current_date)
+            if cached is not None:
+                return cached
+            run = lambda: self._finish_run(user_input, self.graph.invoke(self._initial_state(user_input, deadline, current_date),
+                                                                         self._run_config()))
+            if self._singleflight is None:
+                return run()
+            results, shared = self._singleflight.do(self._coalesce_key(user_input, deadline, current_date), run)
+            self._coalesced(shared)
+            return results
+
+    async def aprocess_input(self, user_input: str, deadline: float = REQUEST_DEADLINE_SECONDS) -> List[Dict]:
+        """Async counterpart of process_input; LLM and search calls run on the event loop."""
+        with self._request_trace(user_input):
+            error = self._validate_input(user_input)
+            if error:
+                return error
+            current_date = datetime.now()
+            cached = self._cached_similar(user_input, current_date)
+            if cached is not None:
+                return cached
+            run = lambda: self._arun(user_input, deadline, current_date)
+            if self._asingleflight is None:
+                return await run()
+            results, shared = await self._asingleflight.do(self._coalesce_key(user_input, deadline, current_date), run)
+            self._coalesced(shared)
+            return results
+
+    async def _arun(self, user_input: str, deadline: float = None, current_date: datetime = None) -> List[Dict]:
+        state = self._initial_state(user_input, deadline, current_date)
+        return self._finish_run(user_input, await self.graph.ainvoke(state, self._run_config()))
+
+    def coalescing_stats(self) -> Dict:
+        """Pipeline runs started and requests that shared another's run, for the sync and async paths."""
+        if self._singleflight is None:
+            return {}
+        return {"sync": self._singleflight.stats(), "async": self._asingleflight.stats()}
+
+    async def aprocess_isolated(self, user_input: str, limit: asyncio.Semaphore = None,
+                                deadline: float = REQUEST_DEADLINE_SECONDS) -> List[Dict]:
+        """aprocess_input for one input of a batch: waits for `limit` if given, and returns an error result
+        instead of raising, so one failing input does not abort the rest."""
+        if limit is None:
+            return await self._aprocess_isolated(user_input, deadline)
+        async with limit:
+            return await self._aprocess_isolated(user_input, deadline)
+
+    async def _aprocess_isolated(self, user_input: str, deadline: float) -> List[Dict]:
+        try:
+            return await self.aprocess_input(user_input, deadline)
+        except Exception as e:
+            return [{"error": f"Error processing request: {e}"}]
+
+    async def aprocess_batch(self, inputs: Iterable[str], concurrency: int = BATCH_CONCURRENCY,
+                             deadline: float = REQUEST_DEADLINE_SECONDS) -> List[List[Dict]]:
+        """Process many inputs with at most `concurrency` in flight; results keep the input order.
+
+        `deadline` applies to each input from the moment it starts processing.
+        """
+        limit = asyncio.Semaphore(max(1, concurrency))
+        return list(await asyncio.gather(*(self.aprocess_isolated(user_input, limit, deadline) for user_input in inputs)))
+
+    def process_batch(self, inputs: Iterable[str], concurrency: int = BATCH_CONCURRENCY,
+                      deadline: float = REQUEST_DEADLINE_SECONDS) -> List[List[Dict]]:
+        """Sync wrapper around aprocess_batch. Must not be called from a running event loop."""
+        return asyncio.run(self.aprocess_batch(inputs, concurrency, deadline))
+
+    def metrics(self, format: str = "json"):
+        """Aggregate timings and counters: a dict for "json", exposition text for "prometheus".
+
+        Empty unless tracing is on (TRACING_ENABLED or a tracer passed to the constructor).
+        """
+        if format not in ("json", "prometheus"):
+            raise ValueError(f"Unknown metrics format '{format}', expected 'json' or 'prometheus'")
+        if self.tracer is None:
+            return {} if format == "json" else ""
+        return self.tracer.summary() if format == "json" else self.tracer.prometheus()
+
+    def traces(self, limit: int = None) -> List[Dict]:
+        """The most recent per-request span records, oldest first."""
+        return self.tracer.records(limit) if self.tracer is not None else []
+
+
+def _stream_writer():
+    from langgraph.config import get_stream_writer
+    return get_stream_writer()
+
+
+def _parser(config) -> IntentParser:
+    return config["configurable"]["parser"]
+
+
+def _graph_node(name: str):
+    """A node that runs step `name` on the parser passed in the run config, so one graph serves every parser."""
+    from langchain_core.runnables import RunnableLambda
+
+    def func(state, config):
+        return _parser(config)._run_node(name, state)
+
+    async def afunc(state, config):
+        return await _parser(config)._arun_node(name, state)
+
+    return RunnableLambda(func, afunc=afunc, name=name)
+
+
+def _build_graph(mode: str, fast_path: bool):
+    # langgraph takes about a second to import, so it is only loaded once a graph is first needed
+    from langgraph.graph import StateGraph, END
+
+    graph = StateGraph(State)
+    graph.add_node("parse_intent", _graph_node("parse_intent"))
+    graph.add_node("extract_entities", _graph_node("extract_entities"))
+    graph.add_node("generate_follow_ups", _graph_node("generate_follow_ups"))
+    graph.add_node("handle_non_standard", _graph_node("handle_non_standard"))
+    # The web search only needs the input and the categories, so it starts as soon as intents are known
+    # and runs alongside extraction and follow-ups; handle_non_standard joins it at the end
+    graph.add_node("start_search", _graph_node("start_search"))
+    graph.add_edge("start_search", END)
+    graph.add_conditional_edges(
+        "parse_intent",
+        lambda state, config: _parser(config)._fan_out(state, "extract_entities"),
+        ["extract_entities", "start_search"]
+    )
+    graph.add_edge("extract_entities", "generate_follow_ups")
+    graph.add_conditional_edges(
+        "generate_follow_ups",
+        lambda state: "handle_non_standard" if any(intent["category"] == "other" for intent in state["intents"]) else END,
+        {"handle_non_standard": "handle_non_standard", END: END}
+    )
+    llm_entry = "parse_intent"
+    if mode == "fused":
+        # One LLM call classifies and extracts; fall back to the multi-call path if its output is unusable
+        graph.add_node("fused_parse", _graph_node("fused_parse"))
+        graph.add_conditional_edges(
+            "fused_parse",
+            lambda state, config: _parser(config)._fan_out(state, "generate_follow_ups") if state["intents"] else "parse_intent",
+            ["generate_follow_ups", "start_search", "parse_intent"]
+        )
+        llm_entry = "fused_parse"
+    if fast_path:
+        # Confident rule matches skip the LLM nodes; everything else falls through to them
+        graph.add_node("fast_path", _graph_node("fast_path"))
+        graph.add_conditional_edges(
+            "fast_path",
+            lambda state, config: _parser(config)._fan_out(state, "generate_follow_ups") if state["intents"] else llm_entry,
+            ["generate_follow_ups", "start_search", llm_entry]
+        )
+        graph.set_entry_point("fast_path")
+    else:
+        graph.set_entry_point(llm_entry)
+    return graph.compile()
+
+
+# Compiled graphs by (mode, fast path on), built once per process and shared by all parsers
+_graphs = {}
+_graphs_lock = threading.Lock()
+
+
+def compiled_graph(mode: str, fast_path: bool):
+    key = (mode, fast_path)
+    if key not in _graphs:
+        with _graphs_lock:
+            if key not in _graphs:
+                _graphs[key] = _build_graph(mode, fast_path)
+    return _graphs[key]
+
+
+# Compiled follow-up rules by table path, built once per process and shared by all parsers
+_follow_up_rules = {}
+
+
+def follow_up_rules(path: str = None) -> FollowUpRules:
+    if path not in _follow_up_rules:
+        with _graphs_lock:
+            if path not in _follow_up_rules:
+                _follow_up_rules[path] = FollowUpRules.load(path)
+    return _follow_up_rules[path]
@@ -0,0 +1,208 @@
+"""Tolerant JSON extraction for LLM responses.
+
+Models wrap JSON in code fences, add prose around it, leave trailing commas, or get cut off
+mid-object. extract_json recovers the value in all of those cases, and IncrementalJSONParser
+does the same over a token stream, reporting each top-level array item as soon as it closes.
+"""
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_CLOSERS = {"{": "}", "[": "]"}
+_MAX_REPAIR_ATTEMPTS = 64
+
+
+def strip_trailing_commas(text: str) -> str:
+    """Drop commas directly before a closing bracket, leaving string contents untouched."""
+    out = []
+    in_string = escape = False
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char in "}]":
+            # Remove a pending comma (and the whitespace after it)
+            index = len(out) - 1
+            while index >= 0 and out[index].isspace():
+                index -= 1
+            if index >= 0 and out[index] == ",":
+                del out[index]
+        elif char == '"':
+            in_string = True
+        out.append(char)
+    return "".join(out)
+
+
+def _loads(text: str):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(strip_trailing_commas(text))
+
+
+def _scan(text: str, start: int):
+    """Scan from the opening bracket at `start`.
+
+    Returns (end, cuts, tail): `end` is the index just past the matching closing bracket (None if the text is
+    truncated), `cuts` lists (position, closers) pairs where the text can be cut and closed to form valid JSON,
+    and `tail` is what closes the text as it stands.
+    """
+    stack = []
+    cuts = []
+    in_string = escape = False
+    string_is_key = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+                if not string_is_key:
+                    cuts.append((index + 1, "".join(_CLOSERS[c] for c in reversed(stack))))
+            continue
+        if char == '"':
+            in_string = True
+            # A string directly inside an object and not after a colon is a key; cutting after it is invalid
+            string_is_key = bool(stack) and stack[-1] == "{" and _previous_token(text, index) in "{,"
+        elif char in "{[":
+            stack.append(char)
+        elif char in "}]":
+            if not stack:
+                return None, cuts, ""
+            stack.pop()
+            if not stack:
+                return index + 1, cuts, ""
+            cuts.append((index + 1, "".join(_CLOSERS[c] for c in reversed(stack))))
+        elif char == "," and stack:
+            cuts.append((index, "".join(_CLOSERS[c] for c in reversed(stack))))
+    tail = ('"' if in_string else "") + "".join(_CLOSERS[c] for c in reversed(stack))
+    return None, cuts, tail
+
+
+def _previous_token(text: str, index: int) -> str:
+    index -= 1
+    while index >= 0 and text[index].isspace():
+        index -= 1
+    return text[index] if index >= 0 else ""
+
+
+def _repair_truncated(text: str, start: int, cuts, tail: str) -> Any:
+    """Close a truncated value at the latest cut point that yields valid JSON."""
+    attempts = cuts[-_MAX_REPAIR_ATTEMPTS:] + [(len(text), tail)]
+    for position, closers in reversed(attempts):
+        try:
+            return _loads(text[start:position] + closers)
+        except json.JSONDecodeError:
+            continue
+    opener = text[start]
+    return {} if opener == "{" else []
+
+
+def extract_json(text: str) -> Any:
+    """Return the first JSON object or array in `text`, repairing what a model typically breaks.
+
+    Raises ValueError if the text contains no usable JSON.
+    """
+    if not isinstance(text, str):
+        raise ValueError("LLM response is not text")
+    fence = FENCE_PATTERN.search(text)
+    candidates = [fence.group(1), text] if fence else [text]
+    for candidate in candidates:
+        for start in (i for i, c in enumerate(candidate) if c in "[{"):
+            end, cuts, tail = _scan(candidate, start)
+            try:
+                if end is not None:
+                    return _loads(candidate[start:end])
+                return _repair_truncated(candidate, start, cuts, tail)
+            except json.JSONDecodeError:
+                continue  # A bracket inside prose; try the next one
+    try:
+        return json.loads(text.strip())
+    except json.JSONDecodeError as e:
+        raise ValueError(f"No JSON found in LLM response: {e}")
+
+
+class IncrementalJSONParser:
+    """Feed a streamed response chunk by chunk and get top-level array items as soon as they close."""
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+        self.item_count = 0
+        self.complete = False
+
+    def feed(self, chunk: str) -> List[Tuple[int, Any]]:
+        """Add a chunk; returns (index, value) for each top-level array item it completed, in order.
+
+        Items that close but do not parse are skipped, so indexes always match the final array.
+        """
+        self.buffer += chunk
+        items = []
+        text = self.buffer
+        for index in range(self._pos, len(text)):
+            if self.complete:
+                break
+            char = text[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._stack == ["["] and self._item_start is not None:
+                        items.extend(self._emit(text[self._item_start:index + 1]))
+                continue
+            if not self._stack and char not in "[{":
+                continue  # Fence or prose before the JSON starts
+            if char == '"':
+                self._in_string = True
+                if self._stack == ["["]:
+                    self._item_start = index
+            elif char in "[{":
+                self._stack.append(char)
+                if len(self._stack) == 2 and self._stack[0] == "[":
+                    self._item_start = index
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if len(self._stack) == 1 and self._stack[0] == "[" and self._item_start is not None:
+                    items.extend(self._emit(text[self._item_start:index + 1]))
+                elif not self._stack:
+                    self.complete = True
+        self._pos = len(text)
+        return items
+
+    def _emit(self, fragment: str) -> List[Tuple[int, Any]]:
+        self._item_start = None
+        index = self.item_count
+        self.item_count += 1
+        try:
+            return [(index, _loads(fragment))]
+        except json.JSONDecodeError:
+            return []
+
+    def partial(self) -> Optional[Any]:
+        """Best-effort value of everything received so far, with truncated parts closed off."""
+        try:
+            return extract_json(self.buffer)
+        except ValueError:
+            return None
+
+    def result(self) -> Any:
+        """Final value of the complete response. Raises ValueError if it holds no usable JSON."""
+        return extract_json(self.buffer)
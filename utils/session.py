@@ -0,0 +1,238 @@
+"""Multi-turn conversations over IntentParser.
+
+The first turn runs the full graph. Each follow-up answer after that only fills in the entities
+the affected intent is still missing, had flagged or is still asked about, first with the local
+extractors and then, if they find nothing, with one small LLM call; follow-up questions are
+recomputed locally.
+"""
+import copy
+import json
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from utils.fast_path import NUMBER_WORDS, extract_local_entities
+from utils.date_utils import normalize_date
+from utils.json_extract import extract_json
+
+# Entities each category asks about, in the order _follow_ups_for_intent asks for them
+REQUIRED_ENTITIES = {
+    "dining": ["party_size", "location", "cuisine", "budget", "date", "time"],
+    "travel": ["destination", "party_size", "budget", "date", "time"],
+    "cab_booking": ["pickup_location", "destination", "time", "budget"],
+    "gifting": ["budget", "occasion", "recipient"],
+    "other": ["location"],
+}
+# Validation error prefixes and the entity each one flags
+ERROR_ENTITIES = [
+    ("party size", "party_size"),
+    ("invalid date", "date"),
+    ("past date", "date"),
+    ("invalid pickup_location", "pickup_location"),
+    ("invalid destination", "destination"),
+    ("invalid location", "location"),
+]
+DATE_FLAGS = ("ambiguous_next_week", "invalid_past_date", "invalid_date")
+# Answers that decline a question; free-text entities are then marked so the question is not repeated
+NO_PREFERENCE_PATTERN = re.compile(r"^(no preference|any|anything|whatever|doesn't matter|does not matter|not sure|no idea)\W*$")
+BARE_ANSWER_MAX_WORDS = 4
+FREE_TEXT_ENTITIES = ("location", "cuisine", "budget", "destination", "pickup_location", "occasion", "recipient")
+
+
+def _error_entity(error: str) -> Optional[str]:
+    lowered = error.lower()
+    for prefix, key in ERROR_ENTITIES:
+        if prefix in lowered:
+            return key
+    return None
+
+
+class ConversationSession:
+    """Keeps the intents of one conversation so follow-up answers update them in place.
+
+        session = ConversationSession(parser)
+        session.start("Book a table for dinner tomorrow")
+        session.answer("four")  # Fills party_size locally, no LLM call
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.intents: List[Dict] = []
+        self.web_search_results: List[Dict] = []
+        self.history: List[Dict] = []  # One entry per turn: input, target intent, entities filled, LLM calls
+        self._answered: Dict[int, List[str]] = {}  # Intent index -> questions already answered
+        self._topic_questions: Dict[int, List[str]] = {}  # Intent index -> LLM-written questions from the first turn
+
+    def start(self, user_input: str) -> List[Dict]:
+        """Run the full graph on the opening message; returns the same results as process_input."""
+        error = self.parser._validate_input(user_input)
+        if error:
+            return error
+        with self.parser._request_trace(user_input):
+            state = self.parser.graph.invoke(self.parser._initial_state(user_input), self.parser._run_config())
+        return self._begin(user_input, state)
+
+    async def astart(self, user_input: str) -> List[Dict]:
+        error = self.parser._validate_input(user_input)
+        if error:
+            return error
+        with self.parser._request_trace(user_input):
+            state = await self.parser.graph.ainvoke(self.parser._initial_state(user_input), self.parser._run_config())
+        return self._begin(user_input, state)
+
+    def _begin(self, user_input: str, state: Dict) -> List[Dict]:
+        self.intents = state["intents"]
+        self.web_search_results = state["web_search_results"]
+        self._answered = {}
+        # The questions the rules did not ask are the LLM-written topic questions. Only those are kept, since
+        # rule questions are recomputed on every answer and must go once their entity is filled
+        self._topic_questions = {}
+        for index, intent in enumerate(self.intents):
+            ruled = {q for q, _ in self.parser.follow_up_rules.asked(intent)}
+            self._topic_questions[index] = [q for q in intent.get("follow_up_questions") or [] if q not in ruled]
+        self.history = [{"input": user_input, "intent_index": None, "filled": {}, "llm_calls": None}]
+        return self.results()
+
+    def results(self) -> List[Dict]:
+        return self.parser._format_results({"intents": self.intents, "web_search_results": self.web_search_results})
+
+    def pending_index(self) -> Optional[int]:
+        """Index of the first intent that still has follow-up questions, or None."""
+        for index, intent in enumerate(self.intents):
+            if intent.get("follow_up_questions"):
+                return index
+        return None
+
+    def wanted_entities(self, intent: Dict) -> List[str]:
+        """Flagged entities first, then the ones the follow-up questions ask for, then any other missing ones."""
+        entities = intent.get("key_entities", {})
+        wanted = []
+        for error in intent.get("validation_errors", []):
+            key = _error_entity(error)
+            if key and key not in wanted:
+                wanted.append(key)
+        if entities.get("date") in DATE_FLAGS and "date" not in wanted:
+            wanted.append("date")
+        # Includes entities that are present but still asked about, e.g. a cab destination of just "airport"
+        for _, key in self.parser.follow_up_rules.asked(intent):
+            if key and key not in wanted:
+                wanted.append(key)
+        for key in REQUIRED_ENTITIES.get(intent["category"], []):
+            if not entities.get(key) and key not in wanted:
+                wanted.append(key)
+        return wanted
+
+    def _local_values(self, answer: str, category: str, wanted: List[str], asked: Optional[str],
+                      current_date: datetime) -> Dict:
+        text = " ".join(answer.lower().split())
+        values = {key: value for key, value in extract_local_entities(text, category).items() if key in wanted}
+        if values or asked not in wanted:
+            return values
+        # A bare answer ("four", "Bangalore", "next friday") is taken as the value of the entity the question asked for
+        if len(text.split()) > BARE_ANSWER_MAX_WORDS:
+            return values
+        if asked in FREE_TEXT_ENTITIES and NO_PREFERENCE_PATTERN.match(text):
+            values[asked] = "no preference"
+        elif asked == "party_size":
+            word = text.rstrip(".!? ")
+            if word.isdigit():
+                values[asked] = int(word)
+            elif word in NUMBER_WORDS:
+                values[asked] = NUMBER_WORDS[word]
+        elif asked == "date":
+            if normalize_date(text, current_date) != "invalid_date":
+                values[asked] = text
+        elif asked in FREE_TEXT_ENTITIES:
+            values[asked] = answer.strip().rstrip(".!?")
+        return {key: value for key, value in values.items() if key in wanted}
+
+    def _answer_prompt(self, intent: Dict, wanted: List[str], question: str, answer: str) -> str:
+        return f"""
+        A user is completing a '{intent["category"]}' request. Known details: {json.dumps(intent["key_entities"])}.
+        They were asked: {question or 'for more details'}
+        Their answer: {answer}
+        Extract only these entities from the answer, leaving out any it does not give: {", ".join(wanted)}.
+        Output format: ```json
+        {{"entities": {{}}}}
+        ```
+        """
+
+    def _values_from_response(self, response: str, wanted: List[str]) -> Dict:
+        try:
+            result = extract_json(response)
+        except ValueError:
+            return {}
+        entities = result.get("entities") if isinstance(result, dict) else None
+        if not isinstance(entities, dict):
+            return {}
+        return {key: value for key, value in entities.items() if key in wanted and value not in (None, "", [])}
+
+    def _asked_entity(self, intent: Dict, question: Optional[str]) -> Optional[str]:
+        """The entity `question` asks for, or None for a question that fills no single entity."""
+        for asked, entity in self.parser.follow_up_rules.asked(intent):
+            if asked == question:
+                return entity
+        return None
+
+    def _target(self, intent_index: Optional[int]):
+        index = self.pending_index() if intent_index is None else intent_index
+        if index is None or not 0 <= index < len(self.intents):
+            return None, None, [], None, None
+        intent = self.intents[index]
+        questions = intent.get("follow_up_questions") or []
+        question = questions[0] if questions else None
+        return index, intent, self.wanted_entities(intent), question, self._asked_entity(intent, question)
+
+    def answer(self, answer: str, intent_index: int = None) -> List[Dict]:
+        """Apply an answer to `intent_index`, or to the first intent with open questions."""
+        index, intent, wanted, question, asked = self._target(intent_index)
+        if intent is None or not isinstance(answer, str) or not answer.strip():
+            return self.results()
+        current_date = datetime.now()  # Each answer is a request of its own, possibly on a later day
+        values = self._local_values(answer, intent["category"], wanted, asked, current_date)
+        llm_calls = 0
+        if not values and wanted:
+            llm_calls = 1
+            try:
+                response = self.parser.llm_service.generate_response(self._answer_prompt(intent, wanted, question, answer))
+                values = self._values_from_response(response, wanted)
+            except Exception:
+                values = {}  # Leave the entities missing; the same question is asked again
+        return self._apply(index, intent, question, answer, values, llm_calls, current_date)
+
+    async def aanswer(self, answer: str, intent_index: int = None) -> List[Dict]:
+        index, intent, wanted, question, asked = self._target(intent_index)
+        if intent is None or not isinstance(answer, str) or not answer.strip():
+            return self.results()
+        current_date = datetime.now()  # Each answer is a request of its own, possibly on a later day
+        values = self._local_values(answer, intent["category"], wanted, asked, current_date)
+        llm_calls = 0
+        if not values and wanted:
+            llm_calls = 1
+            try:
+                response = await self.parser.llm_service.agenerate_response(self._answer_prompt(intent, wanted, question, answer))
+                values = self._values_from_response(response, wanted)
+            except Exception:
+                values = {}
+        return self._apply(index, intent, question, answer, values, llm_calls, current_date)
+
+    def _apply(self, index: int, intent: Dict, question: str, answer: str, values: Dict, llm_calls: int,
+               current_date: datetime) -> List[Dict]:
+        # Only the new values go through validation, so already normalized dates are not normalized twice
+        result = self.parser._validate_entities({"entities": dict(values), "contradictions": [], "validation_errors": []},
+                                                current_date)
+        intent["key_entities"].update(result["entities"])
+        intent["validation_errors"] = [
+            error for error in intent.get("validation_errors", []) if _error_entity(error) not in values
+        ] + result["validation_errors"]
+        if question:
+            self._answered.setdefault(index, []).append(question)
+        answered = self._answered.get(index, [])
+        # Questions tied to an entity stop once it is filled; the others (topic questions, "any preferences?")
+        # would otherwise be asked forever, so the ones answered are dropped
+        # Answered topic questions still go in, so they are not replaced by the generic question
+        asked = self.parser.follow_up_rules.asked(intent, self._topic_questions.get(index))
+        follow_ups = [q for q, entity in asked if entity is not None or q not in answered]
+        intent["follow_up_questions"] = list(dict.fromkeys(follow_ups))
+        self.history.append({"input": answer, "intent_index": index, "filled": copy.deepcopy(values), "llm_calls": llm_calls})
+        return self.results()
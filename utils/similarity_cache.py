@@ -0,0 +1,251 @@
+"""Cache of recent results keyed by what an input says rather than how it is typed.
+
+Inputs are canonicalized (lower-cased, punctuation and filler words such as "a", "the" and
+"please" dropped), so "Book a cab to the airport!!" and "book cab to airport please" share one
+entry. Inputs that still differ are matched by MinHash/LSH over character trigrams and accepted
+only if:
+- their trigram Jaccard similarity reaches the threshold;
+- they have the same numbers, dates and negations;
+- word for word, in order, each pair is the same word or a near spelling of a known word
+  (cab/cabs, airport/airpot). Other words, such as place names, must match exactly, since rome/nome
+  or paris/parks are different places rather than typos; and "from home to the airport" never
+  answers "from the airport to home".
+"""
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Optional, Sequence, Tuple
+
+TOKEN_PATTERN = re.compile(r"[$₹€£]?\d+(?:[:.,/]\d+)*(?:st|nd|rd|th|am|pm)?|[a-z]+(?:'[a-z]+)?")
+# Dropped before comparing; none of them changes what is being asked for
+FILLER_WORDS = frozenset((
+    "a", "an", "the", "please", "pls", "plz", "kindly", "just", "hey", "hi", "hello", "can", "could", "would",
+    "will", "you", "u",
+))
+# Words that must match exactly, since one of them changes the answer ("for 4" vs "for 5", "not")
+SALIENT_WORDS = frozenset((
+    "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven", "twelve",
+    "today", "tonight", "tonite", "tomorrow", "tmrw", "tommorow", "yesterday", "day", "days", "week", "weeks",
+    "weekend", "month", "year", "next", "this", "after", "ago", "am", "pm", "noon", "midnight", "morning",
+    "afternoon", "evening", "night", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "january", "february", "march", "april", "may", "june", "july", "august", "september", "october",
+    "november", "december", "not", "no", "never", "without", "cancel", "instead", "don't", "dont", "can't",
+    "cannot", "won't", "isn't",
+))
+# Words a near spelling may stand in for: category keywords and the common words of a request
+VOCABULARY_WORDS = frozenset((
+    "cab", "cabs", "taxi", "taxis", "uber", "ride", "rides", "flight", "flights", "fly", "train", "trains", "bus",
+    "ticket", "tickets", "trip", "travel", "vacation", "holiday", "restaurant", "restaurants", "table", "tables",
+    "dinner", "lunch", "breakfast", "brunch", "dine", "dining", "meal", "gift", "gifts", "present", "presents",
+    "book", "booking", "reserve", "reservation", "order", "find", "need", "want", "get", "looking", "search",
+    "suggest", "recommend", "airport", "station", "hotel", "hotels", "hostel", "accommodation", "people",
+    "persons", "guests", "adults", "seat", "seats", "budget", "cheap", "luxury", "italian", "chinese", "indian",
+    "mexican", "japanese", "korean", "french", "continental", "vegetarian", "vegan", "birthday", "anniversary",
+    "wedding", "wife", "husband", "mom", "mother", "dad", "father", "friend", "sister", "brother", "daughter",
+    "colleague", "girlfriend", "boyfriend", "partner", "update", "renew", "passport", "aadhar", "visa", "dress",
+    "clothes", "pickup", "home", "office", "work",
+))
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def canonicalize(text: str) -> Tuple[str, Tuple[str, ...]]:
+    """Canonical form of `text` and its words, in order."""
+    tokens = tuple(token for token in TOKEN_PATTERN.findall(text.lower()) if token not in FILLER_WORDS)
+    return " ".join(tokens), tokens
+
+
+def _salient(tokens: Sequence[str]) -> FrozenSet[str]:
+    return frozenset(token for token in tokens if token in SALIENT_WORDS or any(c.isdigit() for c in token))
+
+
+def _shingles(canonical: str) -> FrozenSet[str]:
+    padded = f" {canonical} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _close(a: str, b: str) -> bool:
+    """Same word up to an inflection or a one-letter typo."""
+    if min(len(a), len(b)) < 3:
+        return False
+    if (a.startswith(b) or b.startswith(a)) and abs(len(a) - len(b)) <= 2:
+        return True
+    if min(len(a), len(b)) < 4 or abs(len(a) - len(b)) > 1:
+        return False
+    # Edit distance of at most one
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i + 1:] == b[i + 1:] if len(a) == len(b) else a[i:] == b[i + 1:]
+
+
+def _words_align(a: Sequence[str], b: Sequence[str], vocabulary: FrozenSet[str] = VOCABULARY_WORDS) -> bool:
+    """Same words in the same order, except for near spellings where one side is a known word."""
+    return len(a) == len(b) and all(
+        x == y or ((x in vocabulary or y in vocabulary) and _close(x, y)) for x, y in zip(a, b)
+    )
+
+
+class MinHasher:
+    """MinHash signatures: the share of equal positions in two signatures estimates their sets' Jaccard similarity."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(_MERSENNE_PRIME)) for _ in range(num_perm)]
+
+    def signature(self, items) -> Tuple[int, ...]:
+        hashes = [int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big") for item in items]
+        return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms)
+
+
+class _Entry:
+    __slots__ = ("canonical", "tokens", "salient", "shingles", "bands", "value", "day", "expires_at")
+
+    def __init__(self, canonical, tokens, shingles, bands, value, day, expires_at):
+        self.canonical = canonical
+        self.tokens = tokens
+        self.salient = _salient(tokens)
+        self.shingles = shingles
+        self.bands = bands
+        self.value = value
+        self.day = day
+        self.expires_at = expires_at
+
+
+class SimilarityCache:
+    """LRU cache of values for recent inputs, found by exact canonical form or by near-duplicate lookup.
+
+    `threshold` is the minimum trigram Jaccard similarity for a near-duplicate. The LSH index
+    splits each signature into `bands` bands of `rows` values; inputs that agree on a whole band
+    become candidates for the exact comparison. Words that differ must be near spellings of a
+    word in `vocabulary`.
+    """
+
+    def __init__(self, max_size: int = 1024, threshold: float = 0.8, ttl: float = 3600, bands: int = 16, rows: int = 4,
+                 vocabulary: FrozenSet[str] = VOCABULARY_WORDS):
+        self.max_size = max(1, max_size)
+        self.threshold = threshold
+        self.ttl = ttl
+        self.bands = bands
+        self.rows = rows
+        self.vocabulary = frozenset(vocabulary)
+        self._hasher = MinHasher(bands * rows)
+        self._entries = OrderedDict()  # canonical -> _Entry, least recently used first
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], set] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _band_keys(self, shingles) -> list:
+        signature = self._hasher.signature(shingles)
+        return [(band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def _remove(self, entry: _Entry):
+        self._entries.pop(entry.canonical, None)
+        for key in entry.bands:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry.canonical)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _live(self, entry: Optional[_Entry], now: float) -> Optional[_Entry]:
+        if entry is not None and entry.expires_at < now:
+            self._remove(entry)
+            return None
+        return entry
+
+    def _nearest(self, tokens, shingles, band_keys, now) -> Optional[_Entry]:
+        candidates = set()
+        for key in band_keys:
+            candidates.update(self._buckets.get(key, ()))
+        salient = _salient(tokens)
+        best, best_score = None, self.threshold
+        for canonical in candidates:
+            entry = self._live(self._entries.get(canonical), now)
+            if entry is None or entry.salient != salient:
+                continue
+            score = len(shingles & entry.shingles) / len(shingles | entry.shingles)
+            if score >= best_score and _words_align(tokens, entry.tokens, self.vocabulary):
+                best, best_score = entry, score
+        return best
+
+    def get(self, text: str, refresh: Callable = None):
+        """The value cached for `text` or a near-duplicate of it, or None.
+
+        `refresh(value, day)` adapts a hit to the current input (e.g. re-resolving relative dates);
+        when it returns None the entry is dropped as stale and the lookup counts as a miss.
+        """
+        canonical, tokens = canonicalize(text)
+        if not canonical:
+            return None
+        shingles = _shingles(canonical)
+        band_keys = None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live(self._entries.get(canonical), now)
+        if entry is None:
+            band_keys = self._band_keys(shingles)  # Only hashed when there is no exact match
+            with self._lock:
+                entry = self._nearest(tokens, shingles, band_keys, now)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        value = refresh(entry.value, entry.day) if refresh is not None else entry.value
+        with self._lock:
+            if value is None:
+                self.stale += 1
+                self.misses += 1
+                self._remove(entry)
+                return None
+            if entry.canonical in self._entries:
+                self._entries.move_to_end(entry.canonical)
+            if band_keys is None:
+                self.exact_hits += 1
+            else:
+                self.near_hits += 1
+        return value
+
+    def set(self, text: str, value, day=None):
+        """Cache `value` for `text`; `day` is handed back to `refresh` on later hits."""
+        canonical, tokens = canonicalize(text)
+        if not canonical:
+            return
+        shingles = _shingles(canonical)
+        entry = _Entry(canonical, tokens, shingles, self._band_keys(shingles), value, day, time.monotonic() + self.ttl)
+        with self._lock:
+            previous = self._entries.get(canonical)
+            if previous is not None:
+                self._remove(previous)
+            self._entries[canonical] = entry
+            for key in entry.bands:
+                self._buckets.setdefault(key, set()).add(canonical)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries.values())))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.exact_hits + self.near_hits
+            lookups = hits + self.misses
+            return {
+                "lookups": lookups, "exact_hits": self.exact_hits, "near_hits": self.near_hits, "stale": self.stale,
+                "misses": self.misses, "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._entries), "evictions": self.evictions,
+            }
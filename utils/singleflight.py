@@ -0,0 +1,84 @@
+"""Coalesce identical concurrent calls into one.
+
+While a call for a key is in flight, later callers with the same key wait for it instead of
+starting their own, and each gets its own deep copy of the result (or the same exception).
+Nothing is cached: once the call finishes, the next caller starts a fresh one.
+"""
+import asyncio
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class _Flight:
+    def __init__(self, future):
+        self.future = future
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Single-flight group for blocking calls made from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Any, _Flight] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run `func` unless a call for `key` is already in flight; returns (result, whether it was shared)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(Future())
+                self.calls += 1
+            else:
+                flight.waiters += 1
+                self.shared += 1
+        if not leader:
+            return copy.deepcopy(flight.future.result()), True
+        try:
+            result = func()
+        except BaseException as e:
+            flight.future.set_exception(e)
+            raise
+        else:
+            flight.future.set_result(result)
+        finally:
+            with self._lock:
+                del self._flights[key]
+                waiters = flight.waiters
+        # Once waiters share the result, the caller gets a copy too so nobody mutates another's data
+        return (copy.deepcopy(result) if waiters else result), False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._flights)}
+
+
+class AsyncSingleFlight:
+    """Single-flight group for coroutines; the shared work survives any one caller being cancelled."""
+
+    def __init__(self):
+        self._flights: Dict[Any, _Flight] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        # Futures belong to one event loop, so flights are never shared across loops
+        key = (id(asyncio.get_running_loop()), key)
+        flight = self._flights.get(key)
+        if flight is not None:
+            flight.waiters += 1
+            self.shared += 1
+            return copy.deepcopy(await asyncio.shield(flight.future)), True
+        flight = self._flights[key] = _Flight(asyncio.ensure_future(func()))
+        self.calls += 1
+        flight.future.add_done_callback(lambda _: self._flights.pop(key, None))
+        result = await asyncio.shield(flight.future)
+        return (copy.deepcopy(result) if flight.waiters else result), False
+
+    def stats(self) -> Dict:
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._flights)}
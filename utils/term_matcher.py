@@ -0,0 +1,119 @@
+import os
+import threading
+from collections import deque
+from typing import Iterable, List, Tuple
+
+
+def load_terms(path: str) -> List[str]:
+    """Read one term per line, skipping blank lines and '#' comments."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class _Automaton:
+    """Aho-Corasick automaton over lower-cased terms; matching is linear in the text length."""
+
+    def __init__(self, terms: Iterable[str]):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]  # Lengths of the terms ending at each state
+        for term in {t.lower() for t in terms if t and t.strip()}:
+            state = 0
+            for char in term:
+                nxt = self.goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                state = nxt
+            self.output[state] = self.output[state] + (len(term),)
+        # Breadth-first pass to fill failure links and merge outputs along them
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(char, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+        self.empty = len(self.goto) == 1
+
+    def iter_matches(self, text: str):
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length in output[state]:
+                yield end - length, end
+
+
+class TermMatcher:
+    """Multi-pattern matcher for screening text against large term lists.
+
+    Terms come from an inline list and/or term files; reload() rebuilds the automaton
+    in place when the files change, so the owning parser does not need rebuilding.
+    """
+
+    def __init__(self, terms: Iterable[str] = (), paths: Iterable[str] = (), word_boundaries: bool = True):
+        self.word_boundaries = word_boundaries
+        self.paths = list(paths)
+        self._terms = list(terms)
+        self._mtimes = {}
+        self._lock = threading.Lock()
+        self._automaton = self._build()
+
+    def _build(self) -> _Automaton:
+        terms = list(self._terms)
+        for path in self.paths:
+            self._mtimes[path] = self._mtime(path)
+            if self._mtimes[path] is not None:
+                terms.extend(load_terms(path))
+        return _Automaton(terms)
+
+    @staticmethod
+    def _mtime(path: str):
+        return os.path.getmtime(path) if os.path.exists(path) else None
+
+    def reload(self, terms: Iterable[str] = None, force: bool = False) -> bool:
+        """Rebuild if the inline terms differ, a term file changed, or `force`. Returns whether it rebuilt."""
+        with self._lock:
+            changed = force or (terms is not None and list(terms) != self._terms) or any(
+                self._mtime(path) != self._mtimes.get(path) for path in self.paths
+            )
+            if not changed:
+                return False
+            if terms is not None:
+                self._terms = list(terms)
+            # Readers keep using the old automaton until the new one is swapped in
+            self._automaton = self._build()
+            return True
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """All (start, end, matched term) occurrences in the lower-cased text, respecting word boundaries if enabled."""
+        return list(self._iter_matches(text))
+
+    def contains_any(self, text: str) -> bool:
+        return next(self._iter_matches(text), None) is not None
+
+    def _iter_matches(self, text: str):
+        automaton = self._automaton
+        if automaton.empty or not isinstance(text, str):
+            return
+        lowered = text.lower()
+        for start, end in automaton.iter_matches(lowered):
+            if self.word_boundaries and (
+                (start > 0 and _is_word_char(lowered[start - 1]) and _is_word_char(lowered[start]))
+                or (end < len(lowered) and _is_word_char(lowered[end]) and _is_word_char(lowered[end - 1]))
+            ):
+                continue
+            yield start, end, lowered[start:end]
@@ -0,0 +1,222 @@
+"""Per-request span records and aggregate metrics for the intent pipeline.
+
+A Tracer is only created when tracing is enabled; every hook checks for None first,
+so a parser without one pays a single attribute test per node or service call.
+"""
+import contextvars
+import json
+import math
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List
+
+from config.settings import TRACE_MAX_RECORDS, TRACE_MAX_SAMPLES, TRACE_LOG_PATH
+
+QUANTILES = (0.5, 0.95, 0.99)
+# The request record spans are attached to; copied into worker threads with contextvars.copy_context()
+_current_request = contextvars.ContextVar("intent_parser_request", default=None)
+
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, math.ceil(q * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Tracer:
+    """Collects spans for graph nodes, LLM calls and searches.
+
+    Each request handled inside request() gets a record of its spans and events; the last
+    `max_records` records are kept (and appended to `log_path` as JSONL if set). Durations are
+    also kept per span, up to `max_samples` each, for the percentile summary.
+    """
+
+    def __init__(self, max_records: int = TRACE_MAX_RECORDS, max_samples: int = TRACE_MAX_SAMPLES,
+                 log_path: str = TRACE_LOG_PATH):
+        self.max_samples = max_samples
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=max_records)
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._totals = Counter()  # (kind, name) -> total seconds
+        self._span_counts = Counter()  # (kind, name) -> spans recorded
+        self._counters = Counter()
+
+    @contextmanager
+    def request(self, user_input=None):
+        """Attach every span recorded inside the block, including in copied contexts, to one request record."""
+        record = {
+            "request_id": uuid.uuid4().hex,
+            "started_at": time.time(),
+            "input_chars": len(user_input) if isinstance(user_input, str) else 0,
+            "spans": [],
+            "events": [],
+        }
+        started = time.perf_counter()
+        token = _current_request.set((record, started))
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            try:
+                _current_request.reset(token)
+            except ValueError:
+                pass  # A stream generator closed from another context (e.g. by the garbage collector)
+            record["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            self._finish(record)
+
+    def _finish(self, record: Dict):
+        llm_calls = sum(1 for span in record["spans"] if span["kind"] == "llm" and not span.get("cached"))
+        record["llm_calls"] = llm_calls
+        with self._lock:
+            self._records.append(record)
+            self._counters["requests"] += 1
+            self._counters["request_llm_calls"] += llm_calls
+            self._samples[("request", "total")].append(record["duration_ms"] / 1000)
+            self._totals[("request", "total")] += record["duration_ms"] / 1000
+            self._span_counts[("request", "total")] += 1
+            if "error" in record:
+                self._counters["request_errors"] += 1
+        if self.log_path:
+            with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+    def record(self, name: str, kind: str, started: float, **attrs):
+        """Record a span that began at perf_counter() value `started` and ends now.
+
+        Numeric `*_chars` attributes are summed into counters, and `cached`/`error` attributes are counted.
+        """
+        duration = time.perf_counter() - started
+        with self._lock:
+            self._samples[(kind, name)].append(duration)
+            self._totals[(kind, name)] += duration
+            self._span_counts[(kind, name)] += 1
+            self._counters[f"{kind}_calls"] += 1
+            if attrs.get("cached"):
+                self._counters[f"{kind}_cache_hits"] += 1
+            if attrs.get("error"):
+                self._counters[f"{kind}_errors"] += 1
+            for key, value in attrs.items():
+                if key.endswith("_chars") and isinstance(value, int):
+                    self._counters[f"{kind}_{key}"] += value
+        current = _current_request.get()
+        if current is not None:
+            request, request_started = current
+            request["spans"].append({
+                "name": name,
+                "kind": kind,
+                "offset_ms": round((started - request_started) * 1000, 3),
+                "duration_ms": round(duration * 1000, 3),
+                **attrs,
+            })
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def event(self, name: str, **attrs):
+        """Count `name` and note it, with `attrs`, in the current request record."""
+        self.count(name)
+        current = _current_request.get()
+        if current is not None:
+            current[0]["events"].append({"event": name, **attrs})
+
+    def wrap(self, name: str, func):
+        """Time a sync graph node as a "node" span."""
+        @wraps(func)
+        def traced(state):
+            started = time.perf_counter()
+            try:
+                result = func(state)
+            except Exception as e:
+                self.record(name, "node", started, error=str(e))
+                raise
+            self.record(name, "node", started)
+            return result
+        return traced
+
+    def awrap(self, name: str, afunc):
+        """Time an async graph node as a "node" span."""
+        @wraps(afunc)
+        async def traced(state):
+            started = time.perf_counter()
+            try:
+                result = await afunc(state)
+            except Exception as e:
+                self.record(name, "node", started, error=str(e))
+                raise
+            self.record(name, "node", started)
+            return result
+        return traced
+
+    def records(self, limit: int = None) -> List[Dict]:
+        """The most recent request records, oldest first."""
+        with self._lock:
+            records = list(self._records)
+        return records[-limit:] if limit else records
+
+    def summary(self) -> Dict:
+        """Aggregates as JSON-friendly data: percentiles per span, counters and derived rates."""
+        with self._lock:
+            samples = {key: sorted(values) for key, values in self._samples.items()}
+            totals = dict(self._totals)
+            span_counts = dict(self._span_counts)
+            counters = dict(self._counters)
+        spans = {}
+        for (kind, name), values in sorted(samples.items()):
+            spans.setdefault(kind, {})[name] = {
+                "count": span_counts[(kind, name)],
+                "total_seconds": round(totals[(kind, name)], 6),
+                **{f"p{int(q * 100)}_ms": round(percentile(values, q) * 1000, 3) for q in QUANTILES},
+            }
+        requests = counters.get("requests", 0)
+        parses = counters.get("json_parses", 0)
+        return {
+            "spans": spans,
+            "counters": counters,
+            "llm_calls_per_request": round(counters.get("request_llm_calls", 0) / requests, 3) if requests else 0.0,
+            "json_fallback_rate": round(counters.get("json_fallbacks", 0) / parses, 4) if parses else 0.0,
+        }
+
+    def prometheus(self, prefix: str = "intent_parser") -> str:
+        """The summary in the Prometheus text exposition format."""
+        summary = self.summary()
+        lines = [
+            f"# HELP {prefix}_span_duration_seconds Duration of pipeline nodes, LLM calls and searches.",
+            f"# TYPE {prefix}_span_duration_seconds summary",
+        ]
+        for kind, names in summary["spans"].items():
+            for name, stats in names.items():
+                labels = f'kind="{_escape_label(kind)}",name="{_escape_label(name)}"'
+                for q in QUANTILES:
+                    value = round(stats[f"p{int(q * 100)}_ms"] / 1000, 6)
+                    lines.append(f'{prefix}_span_duration_seconds{{{labels},quantile="{q}"}} {value}')
+                lines.append(f"{prefix}_span_duration_seconds_sum{{{labels}}} {stats['total_seconds']}")
+                lines.append(f"{prefix}_span_duration_seconds_count{{{labels}}} {stats['count']}")
+        for name, value in sorted(summary["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name in ("llm_calls_per_request", "json_fallback_rate"):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {summary[name]}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._records.clear()
+            self._samples.clear()
+            self._totals.clear()
+            self._span_counts.clear()
+            self._counters.clear()